@@ -3,14 +3,32 @@ ASGI config for campustrack project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Production serves the site through WSGI sync workers (Procfile,
+render.yaml), and every view is sync: on the "manage.py benchmark_ajax" run
+ASGI reached about half the throughput of WSGI under Django 4.2, and under
+WSGI an async view would pay for an event-loop hop per request. The
+middleware stack is async-capable, so the site can be moved over with
+
+    gunicorn campustrack.asgi:application -k uvicorn_worker.UvicornWorker
+
+once a benchmark shows a throughput or latency win.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'campustrack.settings')
+# Lets settings pick ASGI-appropriate defaults for this process only (see CONN_MAX_AGE).
+os.environ.setdefault('CAMPUSTRACK_ASGI', '1')
 
 application = get_asgi_application()
+
+if settings.WARMUP_ON_START:
+    from core.startup import warm_up
+
+    warm_up()
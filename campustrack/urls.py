@@ -1,8 +1,10 @@
+import re
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
-from django.conf.urls.static import static
 from core import views as core_views
+from core.media import serve_media
+from core.metrics import metrics_view
 from django.contrib.auth import views as auth_views
 
 urlpatterns = [
@@ -18,7 +20,7 @@ urlpatterns = [
     path('password-reset/confirm/<uidb64>/<token>/', auth_views.PasswordResetConfirmView.as_view(template_name='registration/password_reset_confirm.html'), name='password_reset_confirm'),
     path('password-reset/complete/', auth_views.PasswordResetCompleteView.as_view(template_name='registration/password_reset_complete.html'), name='password_reset_complete'),
     path('core/', include('core.urls', namespace='core')),
+    path('metrics', metrics_view, name='metrics'),
+    # Uploaded media, in production too: access is checked per file (core.media)
+    re_path(r'^%s(?P<path>.+)$' % re.escape(settings.MEDIA_URL.lstrip('/')), serve_media, name='media'),
 ]
-
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
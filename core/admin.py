@@ -2,6 +2,7 @@ from django.contrib import admin
 from .models import User, StudentProfile, TeacherProfile, Post, Comment, Certificate, Event, Marks, Notification
 from .models import Department
 from .models import News
+from .models import StudentIdSequence
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 
 class UserAdmin(BaseUserAdmin):
@@ -14,10 +15,11 @@ class StudentProfileAdmin(admin.ModelAdmin):
     list_filter = ('user__department', 'user__year')
     search_fields = ('user__email', 'user__username', 'user__first_name', 'user__last_name')
     raw_id_fields = ('user',)
+    list_select_related = ('user__department',)
 
     def get_department(self, obj):
-        return getattr(obj.user, 'department', '')
-    get_department.admin_order_field = 'user__department'
+        return obj.user.department or ''
+    get_department.admin_order_field = 'user__department__name'
     get_department.short_description = 'Department'
 
     def get_year(self, obj):
@@ -29,7 +31,12 @@ admin.site.register(Post)
 admin.site.register(Comment)
 admin.site.register(Certificate)
 admin.site.register(Event)
-admin.site.register(Department)
+@admin.register(Department)
+class DepartmentAdmin(admin.ModelAdmin):
+    list_display = ('name', 'listed')
+    list_filter = ('listed',)
+    search_fields = ('name',)
+admin.site.register(StudentIdSequence)
 @admin.register(Marks)
 class MarksAdmin(admin.ModelAdmin):
     list_display = ('student', 'subject', 'marks_obtained', 'total_marks', 'created_at')
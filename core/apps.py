@@ -5,3 +5,6 @@ class CoreConfig(AppConfig):
     name = 'core'
     def ready(self):
         import core.signals  # register signals
+        import core.sqlite  # apply SQLite PRAGMAs on connect
+        import core.routers  # per-alias query counters
+        import core.metrics  # per-request SQL timing
@@ -0,0 +1,106 @@
+"""Cached snapshots of the logged-in user for `request.user`.
+
+`AuthenticationMiddleware` resolves the session's user through the backend's
+``get_user()`` on every authenticated request, notification polls included,
+and most pages then touch ``user.student_profile`` or ``user.teacher_profile``
+as well. `EmailOrUsernameModelBackend.get_user` serves all three from one
+cache entry instead: the user's columns (without the password hash), its
+session auth hash and the columns of whichever profile it has.
+
+Snapshots are turned back into model instances with ``Model.from_db`` and the
+password left deferred, so ``save()`` on ``request.user`` writes only the
+loaded columns and can never blank or roll back a password. The cache key
+includes a digest of the field list, so a deploy that changes the models
+never reads an old snapshot.
+
+The receivers in `core.signals` delete a user's snapshot when the user or one
+of its profiles is saved or deleted, which covers profile edits, password
+changes and `toggle_student_active`. Entries live for
+``settings.AUTH_USER_CACHE_TIMEOUT`` seconds; with the per-process locmem
+cache that is also how long another worker may keep serving a deactivated
+user or an old password's sessions.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.fields.files import FieldFile
+
+from .departments import registry as department_registry
+from .models import StudentProfile, TeacherProfile, User
+
+PROFILES = (('student_profile', StudentProfile), ('teacher_profile', TeacherProfile))
+_USER_FIELDS = [f for f in User._meta.concrete_fields if f.attname != 'password']
+
+
+def _fields(model):
+    return _USER_FIELDS if model is User else model._meta.concrete_fields
+
+
+SNAPSHOT_VERSION = hashlib.sha1('|'.join(
+    f'{model._meta.label}:{",".join(f.attname for f in _fields(model))}'
+    for model in (User, StudentProfile, TeacherProfile)
+).encode()).hexdigest()[:8]
+
+
+def user_cache_key(user_id):
+    return f'auth:user:{SNAPSHOT_VERSION}:{user_id}'
+
+
+def _columns(instance):
+    values = {}
+    for field in _fields(type(instance)):
+        value = getattr(instance, field.attname)
+        values[field.attname] = value.name if isinstance(value, FieldFile) else value
+    return values
+
+
+def _restore(model, columns):
+    fields = _fields(model)
+    return model.from_db(DEFAULT_DB_ALIAS, [f.attname for f in fields], [columns[f.attname] for f in fields])
+
+
+def snapshot(user):
+    profiles = {}
+    for accessor, _model in PROFILES:
+        try:
+            profiles[accessor] = _columns(getattr(user, accessor))
+        except user._meta.get_field(accessor).related_model.DoesNotExist:
+            profiles[accessor] = None
+    return {'user': _columns(user), 'session_auth_hash': user.get_session_auth_hash(), 'profiles': profiles}
+
+
+def restore(data):
+    user = _restore(User, data['user'])
+    user._session_auth_hash = data['session_auth_hash']
+    for accessor, model in PROFILES:
+        columns = data['profiles'][accessor]
+        profile = _restore(model, columns) if columns is not None else None
+        # Reverse one-to-one cache: user.student_profile (or its DoesNotExist) without a query.
+        User._meta.get_field(accessor).set_cached_value(user, profile)
+        if profile is not None:
+            model._meta.get_field('user').set_cached_value(profile, user)
+    # The department (name only, on most pages) comes from the in-process registry.
+    department = department_registry().by_id(user.department_id) if user.department_id else None
+    if department is not None:
+        User._meta.get_field('department').set_cached_value(user, department)
+    return user
+
+
+def get_user(user_id):
+    """The user with `user_id` and its profiles, from the cache or one query; None if missing."""
+    key = user_cache_key(user_id)
+    data = cache.get(key)
+    if data is None:
+        user = User._default_manager.select_related(*(accessor for accessor, _ in PROFILES)).filter(pk=user_id).first()
+        if user is None:
+            return None
+        data = snapshot(user)
+        cache.set(key, data, getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 300))
+    return restore(data)
+
+
+def invalidate_user(user_id):
+    if user_id is not None:
+        cache.delete(user_cache_key(user_id))
@@ -0,0 +1,47 @@
+"""Cached answers for the registration form's availability checks.
+
+`check_username` and `check_email` run on every (debounced) keystroke. Names
+that the per-process Bloom filter (`core.bloom`) has never seen are
+available without touching the cache or the database. For the rest, both
+"taken" and "available" answers are cached for
+``settings.AVAILABILITY_CACHE_TIMEOUT`` seconds, and the receivers in
+`core.signals` delete a user's entries when the user is saved or deleted, so
+a name that was just registered is not reported as available. A lookup that
+misses the cache spends a token from the ``availability-db`` site-wide
+bucket (`core.ratelimit`), which caps the queries these endpoints can send
+to the database however many clients call them.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .bloom import might_exist, record_false_positive
+from .models import User
+from .ratelimit import consume
+
+FIELDS = ('username', 'email')
+
+
+def availability_cache_key(field, value):
+    # Hashed: emails are personal data and may be longer than a memcached key.
+    return f'availability:{field}:{hashlib.sha1(value.lower().encode()).hexdigest()}'
+
+
+def is_taken(field, value, request):
+    """Whether a user already has `value` as username/email (case-insensitive)."""
+    if not might_exist(field, value):
+        return False
+    key = availability_cache_key(field, value)
+    taken = cache.get(key)
+    if taken is None:
+        consume('availability-db', request)
+        taken = User.objects.filter(**{f'{field}__lower': value.lower()}).exists()
+        if not taken:
+            record_false_positive()
+        cache.set(key, taken, getattr(settings, 'AVAILABILITY_CACHE_TIMEOUT', 60))
+    return taken
+
+
+def invalidate_availability(user):
+    cache.delete_many([availability_cache_key(field, getattr(user, field) or '') for field in FIELDS])
@@ -1,7 +1,11 @@
+from django.conf import settings
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth import get_user_model
 from django.db.models import Q
 
+from . import authcache
+from .bloom import might_exist
+
 UserModel = get_user_model()
 
 
@@ -11,6 +15,14 @@ class EmailOrUsernameModelBackend(ModelBackend):
     This backend tries to find a user whose email OR username matches the
     supplied `username` parameter (case-insensitive). If found, it verifies
     the password and returns the user if valid.
+
+    The lookup compares against LOWER(email) / LOWER(username) so it is served
+    by the functional indexes on `User` instead of scanning the table. With
+    ``settings.BLOOM_LOGIN_PREFILTER`` a login that is neither a known
+    username nor a known email (core.bloom) skips the query altogether.
+
+    `get_user`, which resolves request.user from the session on every
+    request, is served from cached snapshots (core.authcache).
     """
 
     def authenticate(self, request, username=None, password=None, **kwargs):
@@ -20,12 +32,33 @@ class EmailOrUsernameModelBackend(ModelBackend):
         if username is None or password is None:
             return None
 
+        login = username.strip().lower()
+        if (getattr(settings, 'BLOOM_LOGIN_PREFILTER', False)
+                and not might_exist('email', login) and not might_exist('username', login)):
+            self._hash_anyway(password)
+            return None
         try:
-            user = UserModel.objects.get(Q(email__iexact=username) | Q(username__iexact=username))
+            user = UserModel.objects.get(Q(email__lower=login) | Q(username__lower=login))
         except UserModel.DoesNotExist:
+            self._hash_anyway(password)
             return None
+        except UserModel.MultipleObjectsReturned:
+            # One account's username equals another's email, or two legacy accounts
+            # differ only by case: try email matches first, then the oldest account.
+            candidates = sorted(UserModel.objects.filter(Q(email__lower=login) | Q(username__lower=login)),
+                                key=lambda u: (u.email.lower() != login, u.pk))
+            return next((u for u in candidates if u.check_password(password) and self.user_can_authenticate(u)), None)
 
         # Use ModelBackend's helper to check active/staff and password
         if user.check_password(password) and self.user_can_authenticate(user):
             return user
         return None
+
+    def get_user(self, user_id):
+        user = authcache.get_user(user_id)
+        return user if user is not None and self.user_can_authenticate(user) else None
+
+    def _hash_anyway(self, password):
+        # As ModelBackend does: run the hasher for unknown users too, so the
+        # response time does not reveal which accounts exist.
+        UserModel().set_password(password)
@@ -0,0 +1,179 @@
+"""Per-process Bloom filter of lowercased usernames and emails.
+
+Most availability probes from the registration form are for names nobody
+has, and most failed logins are for accounts that do not exist. A Bloom
+filter answers "definitely no such user" from memory; only a probable hit
+(a real user, or a false positive at ``settings.BLOOM_FALSE_POSITIVE_RATE``)
+goes on to the database.
+
+Each worker builds its filter with one streaming query: at start-up from
+`core.startup.warm_up`, otherwise on first use. The `User` receivers in
+`core.signals` add new names to this process's filter and, once the
+transaction commits, bump a generation counter in the cache. Other workers
+rebuild when they see a new generation, and at least every
+``settings.BLOOM_MAX_AGE`` seconds in case they cannot see it (the default
+locmem cache is per process). Renamed and deleted users stay in the filter
+until the next rebuild, which only costs a false positive.
+
+Lookup and size counters are exported on /metrics (`core.metrics`).
+"""
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+from .caching import bump_generation, get_generation
+
+GENERATION_KEY = 'bloom:users:generation'
+FIELDS = ('username', 'email')
+# Room for growth before a rebuild is due: a filter past its capacity gets
+# more false positives, never false negatives.
+MIN_CAPACITY = 10000
+HEADROOM = 2
+
+_lock = threading.Lock()
+_build_lock = threading.Lock()
+_filter = None
+_stats = {'absent': 0, 'probable': 0, 'false_positive': 0, 'rebuilds': 0, 'build_seconds': 0.0}
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self.array = bytearray((self.bits + 7) // 8)
+        self.items = 0
+
+    def _positions(self, value):
+        # Double hashing (Kirsch-Mitzenmacher): k positions from one 128-bit digest.
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.array[position >> 3] |= 1 << (position & 7)
+        self.items += 1
+
+    def __contains__(self, value):
+        return all(self.array[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+    @property
+    def memory_bytes(self):
+        return len(self.array)
+
+    def estimated_false_positive_rate(self):
+        """Chance that an absent value is reported present, from the share of bits set."""
+        fill = int.from_bytes(self.array, 'little').bit_count() / self.bits
+        return fill ** self.hashes
+
+
+class _UserFilter:
+    def __init__(self, bloom, generation):
+        self.bloom = bloom
+        self.generation = generation
+        self.built_at = time.monotonic()
+
+
+def _member(field, value):
+    return f'{field}:{value.strip().lower()}'
+
+
+def build():
+    """Build this process's filter from the user table and make it current."""
+    global _filter
+    from .models import User
+
+    start = time.perf_counter()
+    # Read the generation first: a bump during the query makes the next lookup rebuild again.
+    generation = get_generation(GENERATION_KEY)
+    count = User.objects.count()
+    bloom = BloomFilter(max(MIN_CAPACITY, count * len(FIELDS) * HEADROOM),
+                        getattr(settings, 'BLOOM_FALSE_POSITIVE_RATE', 0.01))
+    for row in User.objects.values_list(*FIELDS).iterator(chunk_size=2000):
+        for field, value in zip(FIELDS, row):
+            if value:
+                bloom.add(_member(field, value))
+    _filter = _UserFilter(bloom, generation)
+    elapsed = time.perf_counter() - start
+    with _lock:
+        _stats['rebuilds'] += 1
+        _stats['build_seconds'] += elapsed
+    return _filter
+
+
+def _is_stale(current):
+    return (current is None
+            or current.generation != get_generation(GENERATION_KEY)
+            or time.monotonic() - current.built_at > getattr(settings, 'BLOOM_MAX_AGE', 300)
+            or current.bloom.items > current.bloom.capacity)
+
+
+def _current():
+    current = _filter
+    if _is_stale(current):
+        with _build_lock:
+            # One thread rebuilds; the others use its result.
+            if _filter is current:
+                build()
+        current = _filter
+    return current
+
+
+def might_exist(field, value):
+    """False if no user has `value` as `field` (case-insensitive); True means "ask the database"."""
+    if not getattr(settings, 'BLOOM_FILTER_ENABLED', True):
+        return True
+    found = _member(field, value) in _current().bloom
+    with _lock:
+        _stats['probable' if found else 'absent'] += 1
+    return found
+
+
+def record_false_positive():
+    with _lock:
+        _stats['false_positive'] += 1
+
+
+def add_user(user):
+    """Add a saved user's names here now, and tell other workers to rebuild after commit."""
+    current = _filter
+    if current is not None:
+        for field in FIELDS:
+            value = getattr(user, field, None)
+            if value:
+                current.bloom.add(_member(field, value))
+
+    def bump():
+        previous = get_generation(GENERATION_KEY)
+        bump_generation(GENERATION_KEY)
+        # This process already has the names; no need to rebuild here.
+        if current is not None and current is _filter and current.generation == previous:
+            current.generation = get_generation(GENERATION_KEY)
+
+    transaction.on_commit(bump)
+
+
+def request_rebuild():
+    """Make every worker rebuild its filter on its next lookup."""
+    bump_generation(GENERATION_KEY)
+
+
+def stats():
+    """Lookup counters and the current filter's size, for core.metrics."""
+    with _lock:
+        counters = dict(_stats)
+    current = _filter
+    if current is not None:
+        bloom = current.bloom
+        counters.update({
+            'items': bloom.items, 'capacity': bloom.capacity, 'bits': bloom.bits, 'hashes': bloom.hashes,
+            'memory_bytes': bloom.memory_bytes,
+            'estimated_false_positive_rate': bloom.estimated_false_positive_rate(),
+        })
+    return counters
@@ -0,0 +1,46 @@
+"""Small helpers on top of Django's cache framework."""
+import time
+
+from django.core.cache import cache
+
+
+def get_or_set_locked(key, builder, timeout, lock_timeout=10, wait=2.0):
+    """Return the cached value for `key`, building it at most once when cold.
+
+    On a miss only the caller that wins `cache.add()` on the lock key runs
+    `builder`; concurrent callers poll for the result for up to `wait` seconds
+    instead of all hitting the database at once (cache stampede). If the
+    builder is slow or fails they fall back to building it themselves.
+    """
+    value = cache.get(key)
+    if value is not None:
+        return value
+    lock_key = f'{key}:lock'
+    if cache.add(lock_key, 1, lock_timeout):
+        try:
+            value = builder()
+            cache.set(key, value, timeout)
+            return value
+        finally:
+            cache.delete(lock_key)
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        value = cache.get(key)
+        if value is not None:
+            return value
+    return builder()
+
+
+def get_generation(key):
+    """Current value of a generation counter used to namespace cache keys."""
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, time.time_ns(), None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_generation(key, timeout=None):
+    """Start a new generation so every key built from the old one is unreachable."""
+    cache.set(key, time.time_ns(), timeout)
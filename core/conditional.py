@@ -0,0 +1,155 @@
+"""Conditional GET (ETag / Last-Modified) keyed on per-model version counters.
+
+Each tracked model has a version counter in the cache that the receivers in
+`core.signals` bump on save/delete (optionally scoped, e.g. per user for
+notifications). `conditional_on()` builds a view's validators from the
+counters its output depends on, so an unchanged page is answered with 304
+before the view runs any query or renders a template.
+
+Counters hold the ``time.time_ns()`` of the last bump, which doubles as a
+Last-Modified value. With a per-process cache a bump is invisible to the
+other workers, so counters then expire after
+``settings.CONDITIONAL_VERSION_MAX_AGE`` seconds: a worker serves a stale
+304 for at most that long.
+"""
+import calendar
+import hashlib
+import os
+import time
+from datetime import datetime, timezone as dt_timezone
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+from django.views.decorators.http import condition
+
+from .caching import bump_generation
+
+VERSION_KEY_PREFIX = 'model-version'
+# Changes on deploy so new templates are never answered with a stale 304.
+ETAG_SALT = getattr(settings, 'CONDITIONAL_GET_SALT', os.environ.get('RENDER_GIT_COMMIT', ''))
+
+
+def model_version_key(label, scope=None):
+    return f'{VERSION_KEY_PREFIX}:{label}' if scope is None else f'{VERSION_KEY_PREFIX}:{label}:{scope}'
+
+
+def _max_age():
+    return getattr(settings, 'CONDITIONAL_VERSION_MAX_AGE', None)
+
+
+def bump_model_version(label, scope=None):
+    bump_generation(model_version_key(label, scope), _max_age())
+
+
+def get_model_versions(keys):
+    """Return versions for (label, scope) pairs, initialising missing counters."""
+    cache_keys = [model_version_key(label, scope) for label, scope in keys]
+    found = cache.get_many(cache_keys)
+    missing = [k for k in cache_keys if k not in found]
+    if missing:
+        now = time.time_ns()
+        for key in missing:
+            cache.add(key, now, _max_age())
+        found.update(cache.get_many(missing))
+    return [found.get(k) or 0 for k in cache_keys]
+
+
+def conditional_on(*dependencies, per_user=True, vary_every=None, extra=None):
+    """Decorate a view with ETag/Last-Modified validators from model versions.
+
+    `dependencies` are model labels ("core.News") or callables
+    ``(request, *args, **kwargs) -> [(label, scope), ...]`` for scoped counters.
+    `per_user` mixes the requesting user into the ETag (pages whose navigation
+    or content depend on who is logged in). `vary_every` (seconds) mixes in a
+    time bucket for pages with relative times, and `extra` is a callable
+    returning any further cheap value the output depends on.
+    """
+    def validators(request, *args, **kwargs):
+        cached = getattr(request, '_conditional_validators', None)
+        if cached is not None:
+            return cached
+        if len(messages.get_messages(request)):
+            # Flash messages are rendered once; never answer 304 over them.
+            request._conditional_validators = (None, None)
+            return request._conditional_validators
+        keys = []
+        for dep in dependencies:
+            if callable(dep):
+                keys.extend(dep(request, *args, **kwargs))
+            else:
+                keys.append((dep, None))
+        versions = get_model_versions(keys)
+        parts = [ETAG_SALT, request.get_full_path(), *map(str, versions)]
+        if per_user:
+            parts.append(str(request.user.pk) if request.user.is_authenticated else 'anon')
+        if vary_every:
+            parts.append(str(int(time.time() // vary_every)))
+        if extra is not None:
+            parts.append(str(extra(request, *args, **kwargs)))
+        etag = hashlib.sha1('|'.join(parts).encode()).hexdigest()
+        last_modified = None
+        if versions and not vary_every and extra is None:
+            last_modified = datetime.fromtimestamp(max(versions) / 1e9, tz=dt_timezone.utc).replace(microsecond=0)
+        request._conditional_validators = (etag, last_modified)
+        return request._conditional_validators
+
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            return _async_conditional(view_func, validators, per_user)
+
+        conditional_view = condition(
+            etag_func=lambda request, *a, **kw: validators(request, *a, **kw)[0],
+            last_modified_func=lambda request, *a, **kw: validators(request, *a, **kw)[1],
+        )(view_func)
+
+        @wraps(view_func)
+        def _wrapped(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_func(request, *args, **kwargs)
+            response = conditional_view(request, *args, **kwargs)
+            # Browsers must revalidate, and shared caches must not serve one
+            # user's page to another.
+            if per_user:
+                response.setdefault('Cache-Control', 'private, no-cache')
+            else:
+                response.setdefault('Cache-Control', 'no-cache')
+            return response
+        return _wrapped
+    return decorator
+
+
+def _async_conditional(view_func, validators, per_user):
+    """`condition()` for async views (Django 4.2's decorator is sync only)."""
+    @wraps(view_func)
+    async def _wrapped(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return await view_func(request, *args, **kwargs)
+        # Validators read the session, the user and the cache synchronously.
+        etag, last_modified = await sync_to_async(validators)(request, *args, **kwargs)
+        etag = quote_etag(etag) if etag else None
+        timestamp = calendar.timegm(last_modified.utctimetuple()) if last_modified else None
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = await view_func(request, *args, **kwargs)
+        if timestamp and not response.has_header('Last-Modified'):
+            response.headers['Last-Modified'] = http_date(timestamp)
+        if etag:
+            response.headers.setdefault('ETag', etag)
+        response.setdefault('Cache-Control', 'private, no-cache' if per_user else 'no-cache')
+        return response
+    return _wrapped
+
+
+def user_notifications(request, *args, **kwargs):
+    """Dependency: the requesting user's notifications."""
+    return [('core.Notification', request.user.pk)]
+
+
+def requesting_user(request, *args, **kwargs):
+    """Dependency: the requesting user's own row (navigation, permissions)."""
+    return [('core.User', request.user.pk)]
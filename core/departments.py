@@ -0,0 +1,128 @@
+"""Process-wide registry of the admin-managed departments.
+
+The registration, profile edit and event forms all need the department list
+for their select boxes, and pages that show a user's or an event's
+department only need its name. It changes a few times a year, so each worker keeps
+it in memory and the shared cache keeps a copy under a generation counter.
+The `Department` receivers in `core.signals` (admin edits included) bump the
+counter; a worker whose copy is from another generation reloads it, from
+the shared cache when it can and from the database otherwise. As with the
+user filter (`core.bloom`), a copy is also reloaded after
+``settings.DEPARTMENT_REGISTRY_MAX_AGE`` seconds, since the default locmem
+cache cannot tell other workers about a bump. Queryset ``update()`` sends no
+signals; call `invalidate_departments()` after one.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .caching import bump_generation, get_generation
+
+GENERATION_KEY = 'departments:generation'
+# Copies of old generations are unreachable; let them expire.
+REGISTRY_CACHE_TIMEOUT = 60 * 60 * 24
+
+_lock = threading.Lock()
+_registry = None
+
+
+class DepartmentRegistry:
+    def __init__(self, rows, generation):
+        self.rows = tuple(rows)  # (id, name, listed), ordered by name
+        self.generation = generation
+        self.loaded_at = time.monotonic()
+        self.names = tuple(name for _id, name, listed in self.rows if listed)
+        self._by_id = {row[0]: row for row in self.rows}
+        self._by_name = {row[1].casefold(): row for row in self.rows}
+
+    def choices(self):
+        """(name, name) pairs for the listed departments."""
+        return [(name, name) for name in self.names]
+
+    def canonical(self, name):
+        """The stored spelling of `name` (case-insensitive), or None if it is not a department."""
+        found = self._by_name.get((name or '').strip().casefold())
+        return found[1] if found else None
+
+    def get(self, name):
+        """A `Department` instance for `name` (case-insensitive) without a query, or None."""
+        return _instance(self._by_name.get((name or '').strip().casefold()))
+
+    def by_id(self, pk):
+        return _instance(self._by_id.get(pk))
+
+    def name_of(self, pk):
+        found = self._by_id.get(pk)
+        return found[1] if found else None
+
+    def __contains__(self, name):
+        return self.canonical(name) is not None
+
+
+def _instance(row):
+    if row is None:
+        return None
+    from .models import Department
+
+    return Department(id=row[0], name=row[1], listed=row[2])
+
+
+def _cache_key(generation):
+    return f'departments:rows:{generation}'
+
+
+def _load(generation, refresh=False):
+    rows = None if refresh else cache.get(_cache_key(generation))
+    if rows is None:
+        from .models import Department
+
+        rows = list(Department.objects.order_by('name').values_list('id', 'name', 'listed'))
+        cache.set(_cache_key(generation), rows, REGISTRY_CACHE_TIMEOUT)
+    return DepartmentRegistry(rows, generation)
+
+
+def registry():
+    """This process's department registry, reloaded when another worker or the admin changed it."""
+    global _registry
+    current = _registry
+    generation = get_generation(GENERATION_KEY)
+    expired = current is not None and (
+        time.monotonic() - current.loaded_at > getattr(settings, 'DEPARTMENT_REGISTRY_MAX_AGE', 300))
+    if current is None or current.generation != generation or expired:
+        with _lock:
+            # One thread reloads; the others use its result.
+            if _registry is current:
+                # After max age the shared copy may be this worker's own stale one: go to the database.
+                _registry = _load(generation, refresh=expired)
+            current = _registry
+    return current
+
+
+def department_choices():
+    return registry().choices()
+
+
+def get_or_create(name):
+    """The department called `name` (case-insensitive); a new name is created unlisted."""
+    name = (name or '').strip()
+    if not name:
+        return None
+    department = registry().get(name)
+    if department is None:
+        from .models import Department
+
+        department, _created = Department.objects.get_or_create(name=name, defaults={'listed': False})
+    return department
+
+
+def invalidate_departments():
+    """Make every worker reload the departments once the current transaction commits."""
+    def bump():
+        global _registry
+        _registry = None
+        bump_generation(GENERATION_KEY)
+
+    transaction.on_commit(bump)
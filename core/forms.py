@@ -1,10 +1,32 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from .models import User, Post, Comment, Certificate, Marks, Event, StudentProfile, TeacherProfile, Department
+from .departments import department_choices, get_or_create as get_or_create_department, registry as department_registry
 from django.forms.widgets import DateTimeInput
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 
+
+def _clean_department(cleaned):
+    """Turn the department select (a name, or 'Other' plus a typed name) into a Department."""
+    if 'department' not in cleaned:
+        return
+    choice = cleaned['department']
+    name = (cleaned.get('other_department') if choice == '__other__' else choice) or ''
+    name = name.strip()
+    # A typed name that is an existing department ("cse") is stored as that department ("CSE");
+    # a new one is only created, unlisted, when the form is saved.
+    cleaned['department'] = (department_registry().get(name) or Department(name=name, listed=False)) if name else None
+    if choice == '__other__' and not name:
+        raise ValidationError({'other_department': 'Please enter your department name when selecting Other.'})
+
+
+def _save_typed_department(instance):
+    department = instance._meta.get_field('department').get_cached_value(instance, None)
+    if department is not None and department.pk is None:
+        instance.department = get_or_create_department(department.name)
+
+
 class UserRegisterForm(UserCreationForm):
     # Add placeholders and classes for better UX; keep ajax-email-check on email
     username = forms.CharField(widget=forms.TextInput(attrs={'placeholder': 'Choose a username', 'class': 'form-control'}))
@@ -23,25 +45,20 @@ class UserRegisterForm(UserCreationForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        # Populate department choices from Department model (admin-managed). Keep an empty option.
-        try:
-            deps = [(d.name, d.name) for d in Department.objects.all()]
-        except Exception:
-            deps = []
+        # Department choices come from the cached registry (core.departments). Keep an empty option.
+        deps = department_choices()
         # Add an explicit 'Other' option so users can type their department
         self.fields['department'].choices = [('', '--- Select department ---')] + deps + [('__other__', 'Other')]
 
     def clean(self):
         cleaned = super().clean()
-        dept = cleaned.get('department')
-        other = cleaned.get('other_department')
-        # If user selected 'Other', require & use the typed value
-        if dept == '__other__':
-            if not other or not other.strip():
-                raise ValidationError({'other_department': 'Please enter your department name when selecting Other.'})
-            cleaned['department'] = other.strip()
+        _clean_department(cleaned)
         return cleaned
 
+    def save(self, commit=True):
+        _save_typed_department(self.instance)
+        return super().save(commit)
+
 class PostForm(forms.ModelForm):
     class Meta:
         model = Post
@@ -128,6 +145,7 @@ class MarksForm(forms.ModelForm):
 class EventForm(forms.ModelForm):
     date_from = forms.DateTimeField(widget=DateTimeInput(attrs={'type':'datetime-local'}))
     date_to = forms.DateTimeField(widget=DateTimeInput(attrs={'type':'datetime-local'}))
+    department = forms.ChoiceField(required=False, widget=forms.Select(attrs={'class': 'form-control'}))
     class Meta:
         model = Event
         fields = ['title','description','date_from','date_to','scope','department','registration_link']
@@ -135,10 +153,18 @@ class EventForm(forms.ModelForm):
             'title': forms.TextInput(attrs={'placeholder': 'Event title', 'class': 'form-control'}),
             'description': forms.Textarea(attrs={'placeholder': 'Short description of the event', 'rows': 3}),
             'scope': forms.Select(attrs={'class': 'form-control'}),
-            'department': forms.Select(attrs={'class': 'form-control'}),
             'registration_link': forms.URLInput(attrs={'placeholder': 'Optional registration URL (https://...)', 'class': 'form-control'}),
         }
 
+    def clean_department(self):
+        name = self.cleaned_data.get('department')
+        if not name:
+            return None
+        department = department_registry().get(name)
+        if department is None:
+            raise ValidationError('Select a valid department.')
+        return department
+
     def clean(self):
         cleaned = super().clean()
         date_from = cleaned.get('date_from')
@@ -162,13 +188,15 @@ class EventForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        # Populate department select from Department model
-        try:
-            deps = [(d.name, d.name) for d in Department.objects.all()]
-        except Exception:
-            deps = []
+        # Populate department select from the cached registry (core.departments)
+        deps = department_choices()
+        current = department_registry().name_of(self.instance.department_id) if self.instance.department_id else None
+        if current:
+            self.initial['department'] = current
+            if (current, current) not in deps:
+                deps.append((current, current))
         # If no departments exist, leave choices empty so admin can add them
-        self.fields['department'].widget.choices = [('', '--- Select department ---')] + deps
+        self.fields['department'].choices = [('', '--- Select department ---')] + deps
         # Add client-side min attributes to help prevent selecting past datetimes
         try:
             now_local = timezone.localtime(timezone.now())
@@ -189,55 +217,39 @@ class UserEditForm(forms.ModelForm):
             'first_name': forms.TextInput(attrs={'placeholder': 'First name', 'class': 'form-control'}),
             'last_name': forms.TextInput(attrs={'placeholder': 'Last name', 'class': 'form-control'}),
             'email': forms.EmailInput(attrs={'placeholder': 'you@college.edu', 'class': 'form-control'}),
-            'department': forms.Select(attrs={'class': 'form-control', 'id': 'id_department'}),
             'year': forms.NumberInput(attrs={'placeholder': 'Education year (e.g. 3)', 'class': 'form-control'}),
         }
         labels = {
             'year': 'Education year',
         }
 
+    department = forms.ChoiceField(required=False, widget=forms.Select(attrs={'class': 'form-control', 'id': 'id_department'}))
     # Provide an input for 'Other' departments and server-side handling
     other_department = forms.CharField(required=False, widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'If Other, enter department name', 'id': 'id_other_department'}))
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        try:
-            deps = [(d.name, d.name) for d in Department.objects.all()]
-        except Exception:
-            deps = []
+        deps = department_choices()
         self.fields['department'].choices = [('', '--- Select department ---')] + deps + [('__other__', 'Other')]
-        # If editing an existing user, and their stored department value is not
-        # among the admin-managed options, show 'Other' and prefill the text input
-        try:
-            instance = getattr(self, 'instance', None)
-            existing = None
-            if instance and getattr(instance, 'department', None):
-                existing = instance.department
-            # Also respect initial data passed into the form
-            if not existing and 'initial' in kwargs and kwargs.get('initial'):
-                existing = kwargs.get('initial').get('department')
-            if existing:
-                # If existing value matches one of the choices, set it; else use Other
-                choice_values = [c[0] for c in ([('', '--- Select department ---')] + deps)]
-                if existing in choice_values:
-                    self.initial.setdefault('department', existing)
-                else:
-                    self.initial.setdefault('department', '__other__')
-                    self.initial.setdefault('other_department', existing)
-        except Exception:
-            # Defensive: if anything goes wrong, leave defaults untouched
-            pass
+        # The select holds names. A department that is not among the admin-managed
+        # options is shown as 'Other' with the text input prefilled.
+        if self.instance.department_id and 'department' not in (kwargs.get('initial') or {}):
+            existing = department_registry().name_of(self.instance.department_id) or self.instance.department.name
+            if (existing, existing) in deps:
+                self.initial['department'] = existing
+            else:
+                self.initial['department'] = '__other__'
+                self.initial.setdefault('other_department', existing)
 
     def clean(self):
         cleaned = super().clean()
-        dept = cleaned.get('department')
-        other = cleaned.get('other_department')
-        if dept == '__other__':
-            if not other or not other.strip():
-                raise ValidationError({'other_department': 'Please enter your department name when selecting Other.'})
-            cleaned['department'] = other.strip()
+        _clean_department(cleaned)
         return cleaned
 
+    def save(self, commit=True):
+        _save_typed_department(self.instance)
+        return super().save(commit)
+
 
 class StudentProfileForm(forms.ModelForm):
     # Present skills as a comma-separated list in a textarea
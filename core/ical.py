@@ -0,0 +1,150 @@
+"""iCalendar (.ics) feeds of events for calendar apps.
+
+Three feeds are served: college-wide events, one department's events, and a
+personal feed with the college events plus those of the subscriber's
+department. Events are only shown to signed-in users, so every feed URL
+carries a signed token naming its subscriber and their ``feed_key``
+(`feed_token`); a token stops working when the account is deactivated or the
+user resets their feed, which bumps ``feed_key``.
+
+Feed bodies are cached under the `Event` version counter (`core.conditional`)
+and the department registry's generation, so any event or department change
+produces new bodies, and the same counters make up the feeds' ETags: a
+calendar client polling hourly gets a 304 without a query. Personal feeds are
+cached per department, not per user. With a per-process cache the counters
+expire after ``settings.CONDITIONAL_VERSION_MAX_AGE`` and the bodies after
+``settings.ICS_CACHE_TIMEOUT`` (the same by default), so a worker that did
+not see an event change serves the old feed for at most that long.
+"""
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core import signing
+
+from .authcache import get_user
+from .caching import get_generation, get_or_set_locked
+from .conditional import get_model_versions
+from .departments import GENERATION_KEY as DEPARTMENTS_GENERATION_KEY, registry as department_registry
+from .models import Department, Event
+
+TOKEN_SALT = 'core.ical.feed'
+PRODID = '-//CampusTrack//Events//EN'
+# Content lines longer than this many octets are folded (RFC 5545 3.1).
+LINE_OCTETS = 75
+
+
+def feed_token(user):
+    return signing.Signer(salt=TOKEN_SALT).sign(f'{user.pk}.{user.feed_key}')
+
+
+def subscriber(token):
+    """The active user a feed token was issued to, or None if revoked since."""
+    try:
+        # Tokens issued before feed keys existed carry only the pk; they stay valid until the first reset.
+        user_id, _, key = signing.Signer(salt=TOKEN_SALT).unsign(token).partition('.')
+        user_id, key = int(user_id), int(key or 0)
+    except (signing.BadSignature, ValueError):
+        return None
+    user = get_user(user_id)
+    if user is None or not user.is_active or user.feed_key != key:
+        return None
+    return user
+
+
+def feed_version():
+    """Changes whenever an event or a department changes; part of the cache keys and ETags."""
+    return f'{get_model_versions([("core.Event", None)])[0]}-{get_generation(DEPARTMENTS_GENERATION_KEY)}'
+
+
+def feed(kind, department_id=None):
+    """The .ics body for 'college', 'department' or 'personal' (college plus `department_id`)."""
+    version = feed_version()
+    key = f'ics:{version}:{kind}:{department_id}'
+    timeout = getattr(settings, 'ICS_CACHE_TIMEOUT', 60 * 60 * 24)
+    return get_or_set_locked(key, lambda: _build(kind, department_id, version), timeout)
+
+
+def _build(kind, department_id, version):
+    department = department_registry().name_of(department_id) if department_id else None
+    if department_id and department is None:
+        # Added in another worker, not in this one's registry yet
+        department = Department.objects.filter(pk=department_id).values_list('name', flat=True).first()
+    events = Event.objects.select_related('department').order_by('date_from', 'pk')
+    if kind == 'college':
+        events, name = events.filter(scope='college'), 'CampusTrack: college events'
+    elif kind == 'department':
+        events, name = events.filter(scope='department', department_id=department_id), f'CampusTrack: {department}'
+    else:
+        name = f'CampusTrack: college and {department}' if department else 'CampusTrack: college events'
+        scoped = events.filter(scope='college')
+        if department_id:
+            scoped = scoped | events.filter(scope='department', department_id=department_id)
+        events = scoped
+    # DTSTAMP must not change between builds of the same version, or ETags would lie.
+    stamp = datetime.fromtimestamp(int(version.split('-')[0]) / 1e9, tz=dt_timezone.utc)
+    return render_calendar(name, events, stamp)
+
+
+def render_calendar(name, events, stamp):
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_text(name)}',
+        # Clients that honour these poll hourly; the ETag makes that cheap.
+        'REFRESH-INTERVAL;VALUE=DURATION:PT1H',
+        'X-PUBLISHED-TTL:PT1H',
+    ]
+    for event in events:
+        lines.extend(_vevent(event, stamp))
+    lines.append('END:VCALENDAR')
+    return ''.join(_fold(line) + '\r\n' for line in lines)
+
+
+def _vevent(event, stamp):
+    description = event.description or ''
+    if event.registration_link:
+        description = f'{description}\n\nRegister: {event.registration_link}'.strip()
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:event-{event.pk}@campustrack',
+        f'DTSTAMP:{_utc(stamp)}',
+        f'DTSTART:{_utc(event.date_from)}',
+        f'DTEND:{_utc(event.date_to)}',
+        f'SUMMARY:{_text(event.title)}',
+        f'CATEGORIES:{_text(str(event.department) if event.scope == "department" and event.department else "College")}',
+    ]
+    if description:
+        lines.append(f'DESCRIPTION:{_text(description)}')
+    if event.registration_link:
+        lines.append(f'URL:{event.registration_link}')
+    lines.append('END:VEVENT')
+    return lines
+
+
+def _utc(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _text(value):
+    """Escape a TEXT value (RFC 5545 3.3.11)."""
+    return (value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\n').replace('\r', '\n').replace('\n', '\\n'))
+
+
+def _fold(line):
+    if len(line.encode()) <= LINE_OCTETS:
+        return line
+    parts, current, size, limit = [], '', 0, LINE_OCTETS
+    for char in line:
+        octets = len(char.encode())
+        if size + octets > limit:
+            parts.append(current)
+            # Continuation lines start with a space, which counts towards their length.
+            current, size, limit = '', 0, LINE_OCTETS - 1
+        current += char
+        size += octets
+    parts.append(current)
+    return '\r\n '.join(parts)
@@ -0,0 +1,140 @@
+"""Resized, re-encoded image variants for avatars, news images and post images.
+
+Originals are kept as uploaded. Next to each one, under a ``derived/``
+sub-directory, we store one WebP and one JPEG file per width of its spec, with
+EXIF (including GPS data) stripped and orientation applied. They are built
+when the upload is saved (see `core.signals`) or, for files uploaded before
+this existed, by the ``build_image_derivatives`` command. The
+`responsive_image` template tag in `core.templatetags.images` renders them
+with srcset and ``loading="lazy"``, and the original while they are missing;
+it never builds them during a render.
+"""
+import logging
+import os
+from io import BytesIO
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+
+logger = logging.getLogger(__name__)
+
+# widths in CSS pixels x1/x2 (x4 for hero images); crop=True makes square thumbnails
+SPECS = {
+    'avatar': {'widths': (48, 96, 192), 'crop': True},
+    'attachment': {'widths': (320, 640, 1280), 'crop': False},
+    'news': {'widths': (480, 960, 1600), 'crop': False},
+}
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.webp')
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+
+
+def is_image_name(name):
+    return bool(name) and name.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def derivative_name(name, width, fmt):
+    base, _ = os.path.splitext(name)
+    directory, filename = os.path.split(base)
+    return f'{directory}/derived/{filename}_w{width}.{fmt}' if directory else f'derived/{filename}_w{width}.{fmt}'
+
+
+def _webp_supported():
+    from PIL import features
+    return features.check('webp')
+
+
+def derivative_formats():
+    return ('webp', 'jpg') if _webp_supported() else ('jpg',)
+
+
+def derivative_storage(fieldfile):
+    # Content-addressed storages expose a plain storage for name-addressed files.
+    return getattr(fieldfile.storage, 'plain_storage', fieldfile.storage)
+
+
+def _cache_key(name):
+    return f'img-derivatives:{name}'
+
+
+def build_derivatives(fieldfile, spec_name):
+    """Render every variant of `fieldfile` for `spec_name` into its storage."""
+    from PIL import Image, ImageOps
+
+    spec = SPECS[spec_name]
+    storage = derivative_storage(fieldfile)
+    with fieldfile.storage.open(fieldfile.name, 'rb') as fh:
+        image = Image.open(fh)
+        image.load()
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+
+    for width in spec['widths']:
+        if spec['crop']:
+            variant = ImageOps.fit(image, (width, width), Image.LANCZOS)
+        else:
+            variant = image.copy()
+            if variant.width > width:
+                variant.thumbnail((width, variant.height), Image.LANCZOS)
+        for fmt in derivative_formats():
+            buf = BytesIO()
+            if fmt == 'webp':
+                variant.save(buf, 'WEBP', quality=WEBP_QUALITY, method=4)
+            else:
+                flat = variant
+                if flat.mode == 'RGBA':
+                    flat = Image.new('RGB', variant.size, (255, 255, 255))
+                    flat.paste(variant, mask=variant.split()[-1])
+                flat.save(buf, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+            name = derivative_name(fieldfile.name, width, fmt)
+            if storage.exists(name):
+                storage.delete(name)
+            storage.save(name, ContentFile(buf.getvalue()))
+    cache.set(_cache_key(fieldfile.name), True, None)
+
+
+def derivatives_exist(fieldfile, spec_name):
+    """Return True when the variants of `fieldfile` have been built."""
+    if not fieldfile or not is_image_name(fieldfile.name):
+        return False
+    key = _cache_key(fieldfile.name)
+    if cache.get(key):
+        return True
+    widths = SPECS[spec_name]['widths']
+    if derivative_storage(fieldfile).exists(derivative_name(fieldfile.name, widths[-1], 'jpg')):
+        cache.set(key, True, None)
+        return True
+    return False
+
+
+def ensure_derivatives(fieldfile, spec_name):
+    """Return True when the variants exist, building them if they do not."""
+    if not fieldfile or not is_image_name(fieldfile.name):
+        return False
+    if derivatives_exist(fieldfile, spec_name):
+        return True
+    try:
+        build_derivatives(fieldfile, spec_name)
+    except Exception:
+        # Missing or unreadable original: templates fall back to the file itself.
+        logger.warning('Could not build image derivatives for %s', fieldfile.name, exc_info=True)
+        return False
+    return True
+
+
+def delete_derivatives(storage, name):
+    """Delete every variant of the original `name` from `storage`, whatever its spec."""
+    widths = {w for spec in SPECS.values() for w in spec['widths']}
+    for width in widths:
+        for fmt in ('webp', 'jpg'):
+            derived = derivative_name(name, width, fmt)
+            if storage.exists(derived):
+                storage.delete(derived)
+    cache.delete(_cache_key(name))
+
+
+def derivative_urls(fieldfile, spec_name, fmt):
+    """[(url, width), ...] for one format of an image's variants."""
+    storage = derivative_storage(fieldfile)
+    return [(storage.url(derivative_name(fieldfile.name, w, fmt)), w) for w in SPECS[spec_name]['widths']]
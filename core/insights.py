@@ -0,0 +1,113 @@
+"""Cached per-student numeric summaries used by the teacher insights pages.
+
+A summary holds the figures shown in the insights "Overview" panel (overall
+average, certificate counts, activity counts) plus the per-subject averages.
+Summaries are computed for a whole batch of students at once so that both the
+single-student page and the comparison view cost the same two queries on a
+cold cache, and none at all once the entries are cached. Entries are dropped
+by the receivers in `core.signals` whenever a student's marks, certificates,
+posts or comments change.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, FloatField, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import User, Marks, Certificate, Post, Comment
+
+CACHE_KEY_PREFIX = 'student-summary'
+# Summaries are invalidated explicitly, the timeout only bounds memory use.
+CACHE_TIMEOUT = getattr(settings, 'STUDENT_SUMMARY_CACHE_TIMEOUT', 60 * 60 * 6)
+
+
+def summary_cache_key(student_id):
+    return f'{CACHE_KEY_PREFIX}:{student_id}'
+
+
+def invalidate_student_summary(*student_ids):
+    """Drop cached summaries for the given student ids (None values are ignored)."""
+    keys = [summary_cache_key(sid) for sid in student_ids if sid]
+    if keys:
+        cache.delete_many(keys)
+
+
+def _scalar(qs, owner_field, expr):
+    """Wrap a per-student aggregate over `qs` as a correlated scalar subquery."""
+    return Subquery(qs.values(owner_field).annotate(v=expr).values('v')[:1])
+
+
+def _compute_summaries(student_ids):
+    """Compute summaries for `student_ids` in two queries.
+
+    Marks figures (overall and per-subject averages, counts) all come from one
+    grouped query over the batch's marks. The certificate, post and comment
+    counts are correlated subqueries on one row per student, each served by
+    its table's student/author index. Joining the three tables into a single
+    conditional-aggregate query instead would multiply every student's rows
+    (certificates x posts x comments) before counting them.
+    """
+    pct = F('marks_obtained') * 100.0 / F('total_marks')
+    certs = Certificate.objects.filter(student=OuterRef('pk'))
+    rows = (
+        User.objects.filter(pk__in=student_ids)
+        .annotate(
+            s_total_certs=Coalesce(_scalar(certs, 'student', Count('pk')), Value(0), output_field=IntegerField()),
+            s_verified_certs=Coalesce(_scalar(certs, 'student', Count('pk', filter=Q(verified=True))), Value(0), output_field=IntegerField()),
+            s_post_count=Coalesce(_scalar(Post.objects.filter(author=OuterRef('pk')), 'author', Count('pk')), Value(0), output_field=IntegerField()),
+            s_comment_count=Coalesce(_scalar(Comment.objects.filter(author=OuterRef('pk')), 'author', Count('pk')), Value(0), output_field=IntegerField()),
+        )
+        .values('pk', 's_total_certs', 's_verified_certs', 's_post_count', 's_comment_count')
+    )
+    summaries = {}
+    for row in rows:
+        summaries[row['pk']] = {
+            'overall_avg': 0.0,
+            'marks_count': 0,
+            'total_certs': row['s_total_certs'],
+            'verified_certs': row['s_verified_certs'],
+            'post_count': row['s_post_count'],
+            'comment_count': row['s_comment_count'],
+            'subject_avgs': [],
+        }
+    if summaries:
+        subject_rows = (
+            Marks.objects.filter(student_id__in=list(summaries))
+            .values('student_id', 'subject')
+            # `scored` leaves out rows whose percentage is NULL (total_marks=0), as AVG would
+            .annotate(pct_sum=Sum(pct, output_field=FloatField()), n=Count('pk'), scored=Count(pct))
+            .order_by('student_id', 'subject')
+        )
+        totals = {}
+        for row in subject_rows:
+            avg = (row['pct_sum'] or 0.0) / row['n'] if row['n'] else 0.0
+            summary = summaries[row['student_id']]
+            summary['subject_avgs'].append({'subject': row['subject'], 'avg_marks': avg})
+            summary['marks_count'] += row['n']
+            pct_sum, scored = totals.get(row['student_id'], (0.0, 0))
+            totals[row['student_id']] = (pct_sum + (row['pct_sum'] or 0.0), scored + row['scored'])
+        for student_id, (pct_sum, scored) in totals.items():
+            summaries[student_id]['overall_avg'] = pct_sum / scored if scored else 0.0
+    return summaries
+
+
+def get_student_summaries(student_ids):
+    """Return {student_id: summary} for the given ids, filling cache misses in one batch."""
+    student_ids = [int(sid) for sid in student_ids]
+    keys = {summary_cache_key(sid): sid for sid in student_ids}
+    cached = cache.get_many(list(keys))
+    result = {keys[k]: v for k, v in cached.items()}
+    missing = [sid for sid in student_ids if sid not in result]
+    if missing:
+        fresh = _compute_summaries(missing)
+        if fresh:
+            cache.set_many({summary_cache_key(sid): s for sid, s in fresh.items()}, CACHE_TIMEOUT)
+        result.update(fresh)
+    return result
+
+
+def get_student_summary(student_id):
+    """Return the cached summary for a single student (empty figures if unknown)."""
+    return get_student_summaries([student_id]).get(int(student_id)) or {
+        'overall_avg': 0.0, 'marks_count': 0, 'total_certs': 0, 'verified_certs': 0,
+        'post_count': 0, 'comment_count': 0, 'subject_avgs': [],
+    }
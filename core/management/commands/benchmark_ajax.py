@@ -0,0 +1,113 @@
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+SERVERS = {
+    # sync workers: one request at a time per process
+    'wsgi': ['campustrack.wsgi:application'],
+    'asgi': ['campustrack.asgi:application', '-k', 'uvicorn_worker.UvicornWorker'],
+}
+
+
+class Command(BaseCommand):
+    help = ('Start gunicorn with sync WSGI workers and with uvicorn ASGI workers on local ports, '
+            'fire many concurrent requests at an AJAX endpoint and compare throughput and latency.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/core/ajax/check-username/?username=benchmark_user',
+                            help='URL path to request')
+        parser.add_argument('--requests', type=int, default=2000, help='Total requests per server')
+        parser.add_argument('--concurrency', type=int, default=200, help='Requests in flight at once')
+        parser.add_argument('--workers', type=int, default=2, help='gunicorn worker processes for each server')
+        parser.add_argument('--servers', nargs='+', default=['wsgi', 'asgi'], choices=sorted(SERVERS))
+        parser.add_argument('--timeout', type=float, default=30.0, help='Per-request timeout in seconds')
+
+    def handle(self, *args, **options):
+        for name in options['servers']:
+            port = _free_port()
+            process = self._start(name, port, options['workers'])
+            try:
+                result = asyncio.run(_load(port, options['path'], options['requests'],
+                                           options['concurrency'], options['timeout']))
+            finally:
+                process.terminate()
+                process.wait(10)
+            latencies = sorted(result['latencies']) or [0.0]
+
+            def pct(p):
+                return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+            self.stdout.write(
+                f"{name}: {result['ok']} ok, {result['errors']} errors in {result['seconds']:.2f}s "
+                f"= {result['ok'] / result['seconds']:.0f} req/s; latency p50 {pct(0.5):.0f} ms, "
+                f"p95 {pct(0.95):.0f} ms, p99 {pct(0.99):.0f} ms; peak in flight {result['peak']}"
+            )
+
+    def _start(self, name, port, workers):
+        env = {
+            **os.environ,
+            # The repeated-query detector is sync-only middleware; it would put
+            # every ASGI request back on a thread.
+            'NPLUSONE_ENABLED': '0',
+            'METRICS_DIR': '',
+        }
+        command = [sys.executable, '-m', 'gunicorn', *SERVERS[name], '-w', str(workers),
+                   '-b', f'127.0.0.1:{port}', '--backlog', '4096', '--log-level', 'warning']
+        process = subprocess.Popen(command, cwd=settings.BASE_DIR, env=env)
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError(f'{name} server exited with code {process.returncode}')
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+                return process
+            except OSError:
+                time.sleep(0.2)
+        process.terminate()
+        raise CommandError(f'{name} server did not start on port {port}')
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def _load(port, path, total, concurrency, timeout):
+    result = {'ok': 0, 'errors': 0, 'latencies': [], 'peak': 0}
+    in_flight = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    request = f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n\r\n'.encode()
+
+    async def one():
+        nonlocal in_flight
+        async with semaphore:
+            in_flight += 1
+            result['peak'] = max(result['peak'], in_flight)
+            start = time.perf_counter()
+            try:
+                reader, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), timeout)
+                writer.write(request)
+                await writer.drain()
+                response = await asyncio.wait_for(reader.read(), timeout)
+                writer.close()
+                if response.split(b' ', 2)[1:2] in ([b'200'], [b'304']):
+                    result['ok'] += 1
+                    result['latencies'].append(time.perf_counter() - start)
+                else:
+                    result['errors'] += 1
+            except (OSError, asyncio.TimeoutError):
+                result['errors'] += 1
+            finally:
+                in_flight -= 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    result['seconds'] = time.perf_counter() - start
+    return result
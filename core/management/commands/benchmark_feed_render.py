@@ -0,0 +1,102 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Prefetch
+from django.template import Engine, RequestContext
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+
+from core.models import Comment, Department, Post, User
+from core.views.common import render_fragment
+
+FEED_LOOP = "{% for post in posts %}{% include 'includes/post_item.html' with post=post %}{% endfor %}"
+
+
+class Command(BaseCommand):
+    help = ('Render the student feed and the AJAX post fragment against throwaway posts '
+            '(rolled back afterwards) and report milliseconds per 100 posts.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=100, help='Posts in the feed')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed renders per case; median and best are reported')
+
+    def handle(self, *args, **options):
+        count = max(1, options['posts'])
+        with transaction.atomic():
+            posts, user = self._seed(count)
+            request = RequestFactory().get('/dashboard/')
+            request.user = user
+            request.session = {}
+            self._run(posts, request, count, options['repeat'])
+            transaction.set_rollback(True)
+
+    def _seed(self, count):
+        department, _created = Department.objects.get_or_create(name='CSE')
+        authors = User.objects.bulk_create([
+            User(username=f'feed-bench-{i}', email=f'feed-bench-{i}@example.com', role='student',
+                 department=department, year=2, password='!')
+            for i in range(10)
+        ])
+        created = Post.objects.bulk_create([
+            Post(author=authors[i % len(authors)], content=f'Benchmark post {i}\n' + 'Lorem ipsum dolor sit amet. ' * 8)
+            for i in range(count)
+        ])
+        Comment.objects.bulk_create([
+            Comment(post=post, author=authors[j], content='Nice one')
+            for post in created for j in range(2)
+        ])
+        Post.likes.through.objects.bulk_create([
+            Post.likes.through(post_id=post.pk, user_id=author.pk)
+            for post in created for author in authors[:3]
+        ])
+        # Same query as the student dashboard
+        posts = list(Post.objects.filter(pk__in=[p.pk for p in created])
+                     .select_related('author__student_profile', 'author__department')
+                     .prefetch_related(Prefetch('likes', queryset=User.objects.only('id')),
+                                       Prefetch('comments', queryset=Comment.objects.select_related('author__student_profile')))
+                     .order_by('-created_at'))
+        return posts, authors[0]
+
+    def _run(self, posts, request, count, repeat):
+        engine = Engine.get_default()
+        feed = engine.from_string(FEED_LOOP)
+        # The same templates without the cached loader. Within one render an
+        # {% include %} is compiled once, so this mostly shows up per request.
+        uncached_engine = Engine(
+            dirs=engine.dirs, loaders=['django.template.loaders.filesystem.Loader',
+                                       'django.template.loaders.app_directories.Loader'],
+            context_processors=engine.context_processors, libraries=engine.libraries,
+        )
+        uncached = uncached_engine.from_string(FEED_LOOP)
+
+        def feed_render(template):
+            return lambda: template.render(RequestContext(request, {'posts': posts, 'user': request.user}))
+
+        cases = [
+            ('feed, cached loader', feed_render(feed)),
+            ('feed, uncached loader', feed_render(uncached)),
+            ('AJAX post, uncached loader', lambda: ''.join(
+                uncached_engine.get_template('includes/post_item.html').render(
+                    RequestContext(request, {'post': p, 'user': request.user}))
+                for p in posts)),
+            ('AJAX post, render_to_string', lambda: ''.join(
+                render_to_string('includes/post_item.html', {'post': p, 'user': request.user}, request=request)
+                for p in posts)),
+            ('AJAX post, render_fragment', lambda: ''.join(
+                render_fragment(request, 'includes/post_item.html', {'post': p}) for p in posts)),
+        ]
+        scale = 100 / count
+        self.stdout.write(f'{count} posts, {repeat} renders per case, milliseconds per 100 posts:')
+        for name, render in cases:
+            html = render()  # warm-up; fills the cached loader
+            timings = []
+            for _ in range(max(1, repeat)):
+                start = time.perf_counter()
+                render()
+                timings.append((time.perf_counter() - start) * 1000 * scale)
+            self.stdout.write(
+                f'  {name:30} median {statistics.median(timings):7.1f} ms  best {min(timings):7.1f} ms  '
+                f'{len(html) * scale / 1024:6.0f} KiB'
+            )
@@ -0,0 +1,59 @@
+import re
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from core.models import Department, User
+
+ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'core.sessions',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+_WRITE_RE = re.compile(r'^\s*(INSERT|UPDATE|DELETE)\b', re.IGNORECASE)
+
+
+class Command(BaseCommand):
+    help = ('Log a student in, load the dashboard, poll for notifications and log out with each '
+            'session engine, counting the queries that touch django_session.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--polls', type=int, default=60, help='Notification polls (one every 5s in the browser)')
+        parser.add_argument('--engines', nargs='+', default=list(ENGINES), choices=list(ENGINES))
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'login, dashboard, {options["polls"]} notification polls, logout '
+                          f'(SESSION_CACHE_MAX_AGE={settings.SESSION_CACHE_MAX_AGE}):')
+        self.stdout.write(f'  {"engine":15} {"requests":>8} {"session reads":>14} {"session writes":>15} {"other queries":>14}')
+        for name in options['engines']:
+            with transaction.atomic(), override_settings(SESSION_ENGINE=ENGINES[name]):
+                counts = self._run(options['polls'])
+                transaction.set_rollback(True)
+            self.stdout.write(f'  {name:15} {counts["requests"]:>8} {counts["reads"]:>14} '
+                              f'{counts["writes"]:>15} {counts["other"]:>14}')
+
+    def _run(self, polls):
+        department, _created = Department.objects.get_or_create(name='CSE')
+        User.objects.create_user(username='session-bench', email='session-bench@example.com',
+                                 password='session-bench', role='student', department=department, year=2)
+        counts = {'requests': 0, 'reads': 0, 'writes': 0, 'other': 0}
+
+        def count(execute, sql, params, many, context):
+            if 'django_session' in sql:
+                counts['writes' if _WRITE_RE.match(sql) else 'reads'] += 1
+            else:
+                counts['other'] += 1
+            return execute(sql, params, many, context)
+
+        client = Client()
+        with connection.execute_wrapper(count):
+            client.post(reverse('login'), {'username': 'session-bench', 'password': 'session-bench'})
+            client.get(reverse('dashboard'))
+            for _ in range(polls):
+                client.get(reverse('core:ajax_unread_notifications'))
+            client.post(reverse('logout'))
+        counts['requests'] = polls + 3
+        return counts
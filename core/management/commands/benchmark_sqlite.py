@@ -0,0 +1,87 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from core.sqlite import PROFILES, apply_pragmas
+
+
+class Command(BaseCommand):
+    help = ('Measure concurrent read/write throughput of a scratch SQLite database under '
+            'each connection profile in core.sqlite (default vs tuned) and report lock errors.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=5.0, help='Duration of each run')
+        parser.add_argument('--writers', type=int, default=4, help='Concurrent writer threads')
+        parser.add_argument('--readers', type=int, default=8, help='Concurrent reader threads')
+        parser.add_argument('--profiles', nargs='+', default=['default', 'tuned'], choices=sorted(PROFILES))
+
+    def handle(self, *args, **options):
+        for name in options['profiles']:
+            result = self._run(PROFILES[name], options['seconds'], options['writers'], options['readers'])
+            self.stdout.write(
+                f"{name:>8}: {result['writes'] / options['seconds']:8.1f} writes/s  "
+                f"{result['reads'] / options['seconds']:8.1f} reads/s  "
+                f"{result['locked']} 'database is locked' errors"
+            )
+
+    def _run(self, pragmas, seconds, writers, readers):
+        """Hammer a fresh database file shaped like core_notification."""
+        fd, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        counts = {'writes': 0, 'reads': 0, 'locked': 0}
+        lock = threading.Lock()
+        stop = time.monotonic() + seconds
+
+        def connect():
+            # timeout=0 mirrors Django's default of failing fast unless the
+            # profile sets busy_timeout.
+            conn = sqlite3.connect(path, timeout=0, isolation_level=None, check_same_thread=False)
+            apply_pragmas(conn.cursor(), pragmas)
+            return conn
+
+        setup = connect()
+        setup.execute('CREATE TABLE notification (id INTEGER PRIMARY KEY, user_id INTEGER, content TEXT, read INTEGER)')
+        setup.execute('CREATE INDEX notification_user ON notification (user_id, read)')
+        setup.close()
+
+        def work(kind, n):
+            conn = connect()
+            local = {'writes': 0, 'reads': 0, 'locked': 0}
+            i = 0
+            while time.monotonic() < stop:
+                i += 1
+                try:
+                    if kind == 'write':
+                        conn.execute('BEGIN IMMEDIATE')
+                        conn.execute('INSERT INTO notification (user_id, content, read) VALUES (?, ?, 0)', (i % 500, f'note {n}-{i}'))
+                        conn.execute('COMMIT')
+                        local['writes'] += 1
+                    else:
+                        conn.execute('SELECT id, content FROM notification WHERE user_id = ? AND read = 0 ORDER BY id DESC LIMIT 10', (i % 500,)).fetchall()
+                        local['reads'] += 1
+                except sqlite3.OperationalError as exc:
+                    if 'locked' not in str(exc):
+                        raise
+                    local['locked'] += 1
+                    if conn.in_transaction:
+                        conn.execute('ROLLBACK')
+            conn.close()
+            with lock:
+                for key, value in local.items():
+                    counts[key] += value
+
+        threads = [threading.Thread(target=work, args=('write', n)) for n in range(writers)]
+        threads += [threading.Thread(target=work, args=('read', n)) for n in range(readers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        for suffix in ('', '-wal', '-shm'):
+            try:
+                os.remove(path + suffix)
+            except OSError:
+                pass
+        return counts
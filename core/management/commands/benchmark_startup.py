@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from core.startup import LAZY_MODULES, STARTUP_CODE, measure_imports, total_import_us, warm_up
+
+
+class Command(BaseCommand):
+    help = ('Measure what a worker imports before serving (python -X importtime in a fresh '
+            'interpreter), list the slowest imports and time the warm-up hook.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=15, help='Number of slowest imports to list')
+        parser.add_argument('--runs', type=int, default=3, help='Fresh interpreters to start; the fastest run is reported')
+        parser.add_argument('--budget-ms', type=float, help='Fail when the import total exceeds this many milliseconds')
+
+    def handle(self, *args, **options):
+        runs = [measure_imports(STARTUP_CODE) for _ in range(max(1, options['runs']))]
+        modules, wall = min(runs, key=lambda run: total_import_us(run[0]))
+        total_ms = total_import_us(modules) / 1000
+
+        self.stdout.write(f'{STARTUP_CODE}')
+        self.stdout.write(f'  {len(modules)} modules, {total_ms:.0f} ms importing, {wall * 1000:.0f} ms interpreter wall time')
+        self.stdout.write(f'  slowest (cumulative, top-level packages only):')
+        top_level = {name: times for name, times in modules.items() if '.' not in name}
+        for name, (_self_us, cumulative_us) in sorted(top_level.items(), key=lambda item: -item[1][1])[:options['top']]:
+            self.stdout.write(f'    {cumulative_us / 1000:8.1f} ms  {name}')
+
+        start = time.perf_counter()
+        warm_up()
+        self.stdout.write(f'  warm-up (URLs + templates): {(time.perf_counter() - start) * 1000:.0f} ms')
+
+        eager = [name for name in LAZY_MODULES if name in modules]
+        if eager:
+            raise CommandError(f'Imported at start-up but meant to be lazy: {", ".join(eager)}')
+        if options['budget_ms'] is not None and total_ms > options['budget_ms']:
+            raise CommandError(f'Start-up imports took {total_ms:.0f} ms, budget is {options["budget_ms"]:.0f} ms')
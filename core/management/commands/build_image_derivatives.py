@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from core.images import SPECS, build_derivatives, derivative_name, derivative_storage, is_image_name
+from core.models import StudentProfile, News, Post
+
+
+class Command(BaseCommand):
+    help = 'Build resized WebP/JPEG variants for existing avatars, news images and image attachments, and report the size savings.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Rebuild variants that already exist')
+
+    def handle(self, *args, **options):
+        sources = [
+            ('avatar', StudentProfile.objects.exclude(avatar='').exclude(avatar=None), 'avatar'),
+            ('news', News.objects.exclude(image='').exclude(image=None), 'image'),
+            ('attachment', Post.objects.exclude(attachment='').exclude(attachment=None), 'attachment'),
+        ]
+        built = failed = 0
+        original_bytes = served_bytes = 0
+        for spec, qs, field in sources:
+            smallest = SPECS[spec]['widths'][0] if spec == 'avatar' else SPECS[spec]['widths'][1]
+            for obj in qs.iterator():
+                fieldfile = getattr(obj, field)
+                if not is_image_name(fieldfile.name):
+                    continue
+                # Content-addressed storages keep variants in their plain, name-addressed storage.
+                storage = derivative_storage(fieldfile)
+                try:
+                    if options['force'] or not storage.exists(derivative_name(fieldfile.name, SPECS[spec]['widths'][-1], 'jpg')):
+                        build_derivatives(fieldfile, spec)
+                        built += 1
+                    original_bytes += fieldfile.storage.size(fieldfile.name)
+                    # Typical display size: 1x avatar, 2x-density attachment/news card
+                    served = derivative_name(fieldfile.name, smallest, 'webp')
+                    if not storage.exists(served):
+                        served = derivative_name(fieldfile.name, smallest, 'jpg')
+                    served_bytes += storage.size(served)
+                except Exception as exc:
+                    failed += 1
+                    self.stdout.write(self.style.WARNING(f'{fieldfile.name}: {exc}'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Built variants for {built} images ({failed} failed). '
+            f'Originals: {original_bytes / 1024:.0f} KiB, typical served variants: {served_bytes / 1024:.0f} KiB'
+        ))
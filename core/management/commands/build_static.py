@@ -0,0 +1,87 @@
+import os
+import re
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from core.models import Department, Post, User
+
+# (label, URL name, who is logged in)
+PAGES = [
+    ('home', 'home', None),
+    ('login', 'login', None),
+    ('register', 'register', None),
+    ('news', 'core:news_list', None),
+    ('student dashboard', 'dashboard', 'student'),
+    ('college activity', 'core:college_activity', 'student'),
+    ('notifications', 'core:notifications', 'student'),
+    ('teacher dashboard', 'dashboard', 'teacher'),
+]
+
+
+class Command(BaseCommand):
+    help = ('Collect static files into hashed, gzip- and brotli-compressed bundles and report '
+            'the bytes each page transfers on a first and on a repeat view.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--no-collect', action='store_true', help='Only report on the files already collected')
+
+    def handle(self, *args, **options):
+        if not options['no_collect']:
+            call_command('collectstatic', interactive=False, verbosity=0)
+        with transaction.atomic(), override_settings(DEBUG=False):
+            users = self._seed()
+            rows = [self._measure(label, url_name, users.get(role)) for label, url_name, role in PAGES]
+            transaction.set_rollback(True)
+
+        self.stdout.write(f'{"page":20} {"HTML":>9} {"static":>9} {"first view":>11} {"repeat view":>12}')
+        for label, html, assets, first, repeat in rows:
+            self.stdout.write(f'{label:20} {_kib(html):>9} {_kib(assets):>9} {_kib(first):>11} {_kib(repeat):>12}')
+        self.stdout.write('Static sizes are the precompressed (.br, else .gz) files WhiteNoise sends; HTML is '
+                          'uncompressed. A repeat view re-downloads only assets without a content hash.')
+
+    def _seed(self):
+        department, _created = Department.objects.get_or_create(name='CSE')
+        student = User(username='static-report-student', email='static-report-student@example.com',
+                       role='student', department=department, year=2, password='!')
+        teacher = User(username='static-report-teacher', email='static-report-teacher@example.com',
+                       role='teacher', department=department, teacher_approved=True, password='!')
+        User.objects.bulk_create([student, teacher])
+        Post.objects.bulk_create([Post(author=student, content=f'Post {i}') for i in range(10)])
+        return {'student': student, 'teacher': teacher}
+
+    def _measure(self, label, url_name, user):
+        client = Client()
+        if user is not None:
+            client.force_login(user)
+        response = client.get(reverse(url_name))
+        html = response.content
+        assets = cached = 0
+        prefix = re.escape(settings.STATIC_URL)
+        for url in sorted(set(re.findall(rb'(?:src|href)="(%s[^"?#]+)' % prefix.encode(), html))):
+            name = url.decode()[len(settings.STATIC_URL):]
+            size = _transferred_size(os.path.join(settings.STATIC_ROOT, name))
+            assets += size
+            if _is_hashed(name):
+                cached += size
+        return label, len(html), assets, len(html) + assets, len(html) + assets - cached
+
+
+def _transferred_size(path):
+    for candidate in (path + '.br', path + '.gz', path):
+        if os.path.exists(candidate):
+            return os.path.getsize(candidate)
+    return 0
+
+
+def _is_hashed(name):
+    # ManifestStaticFilesStorage names: css/style.0123456789ab.css
+    return re.search(r'\.[0-9a-f]{12}\.[^./]+$', name) is not None
+
+
+def _kib(size):
+    return f'{size / 1024:.1f} KiB'
@@ -0,0 +1,33 @@
+import time
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = ('Delete expired database sessions in small batches, pausing between them, so the '
+            'cleanup never holds the SQLite write lock for long (unlike clearsessions).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Sessions deleted per transaction')
+        parser.add_argument('--pause', type=float, default=0.05, help='Seconds to sleep between batches')
+
+    def handle(self, *args, **options):
+        if settings.SESSION_ENGINE.endswith('signed_cookies'):
+            self.stdout.write('Sessions are stored in signed cookies; there is nothing to clean up.')
+            return
+        now = timezone.now()
+        expired = Session.objects.filter(expire_date__lt=now)
+        deleted = batches = 0
+        start = time.perf_counter()
+        while True:
+            keys = list(expired.values_list('session_key', flat=True)[:options['batch_size']])
+            if not keys:
+                break
+            deleted += Session.objects.filter(session_key__in=keys).delete()[0]
+            batches += 1
+            time.sleep(options['pause'])
+        self.stdout.write(f'Deleted {deleted} expired sessions in {batches} batches '
+                          f'({time.perf_counter() - start:.1f}s); {Session.objects.count()} remain.')
@@ -0,0 +1,102 @@
+from pathlib import Path
+
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.core.serializers import sort_dependencies
+from django.db import connections, transaction
+
+SOURCE_ALIAS = 'sqlite_source'
+
+
+class Command(BaseCommand):
+    help = ('Copy every table of an existing SQLite database into the configured database '
+            '(normally Postgres via DATABASE_URL) in batches, keeping primary keys. '
+            'Run "manage.py migrate" against the target first, e.g.\n'
+            '  DATABASE_URL=postgres://localhost/campustrack python manage.py migrate\n'
+            '  DATABASE_URL=postgres://localhost/campustrack python manage.py copy_from_sqlite /var/data/db.sqlite3 --truncate')
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help='Path to the SQLite database file to copy from')
+        parser.add_argument('--target', default='default', help='Database alias to copy into')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows read and inserted per batch')
+        parser.add_argument('--truncate', action='store_true',
+                            help='Delete existing rows in the target first (required if migrate created content types/permissions)')
+
+    def handle(self, *args, **options):
+        source_path = Path(options['source'])
+        if not source_path.exists():
+            raise CommandError(f'SQLite database not found: {source_path}')
+        target = options['target']
+        if target not in connections.databases:
+            raise CommandError(f'Unknown database alias: {target}')
+        batch_size = max(1, options['batch_size'])
+
+        connections.databases[SOURCE_ALIAS] = {
+            **connections.databases[target],
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': str(source_path),
+            'USER': '', 'PASSWORD': '', 'HOST': '', 'PORT': '', 'OPTIONS': {},
+        }
+        try:
+            models = self._models_in_dependency_order()
+            # Foreign keys are checked at commit on Postgres (Django creates them
+            # DEFERRABLE INITIALLY DEFERRED), so rows referencing tables copied
+            # later in the same transaction are fine.
+            with transaction.atomic(using=target):
+                if options['truncate']:
+                    for model in reversed(models):
+                        model._base_manager.using(target).all()._raw_delete(target)
+                for model in models:
+                    copied = self._copy_model(model, target, batch_size)
+                    self.stdout.write(f'  {model._meta.label}: {copied} rows')
+                self._reset_sequences(models, target)
+            ContentType.objects.clear_cache()
+            mismatched = [
+                model._meta.label for model in models
+                if model._base_manager.using(SOURCE_ALIAS).count() != model._base_manager.using(target).count()
+            ]
+        finally:
+            connections[SOURCE_ALIAS].close()
+            del connections.databases[SOURCE_ALIAS]
+
+        if mismatched:
+            raise CommandError('Row counts differ for: ' + ', '.join(mismatched))
+        self.stdout.write(self.style.SUCCESS(f'Copied {len(models)} tables from {source_path} to "{target}"'))
+
+    def _models_in_dependency_order(self):
+        app_list = {}
+        for config in apps.get_app_configs():
+            app_models = [m for m in config.get_models(include_auto_created=True)
+                          if m._meta.managed and not m._meta.proxy]
+            if app_models:
+                app_list[config] = app_models
+        return sort_dependencies(app_list.items(), allow_cycles=True)
+
+    def _copy_model(self, model, target, batch_size):
+        fields = model._meta.local_concrete_fields
+        qs = model._base_manager.using(SOURCE_ALIAS).order_by('pk')
+        batch, copied = [], 0
+        for obj in qs.iterator(chunk_size=batch_size):
+            batch.append(obj)
+            if len(batch) >= batch_size:
+                copied += self._insert(model, batch, fields, target)
+                batch = []
+        if batch:
+            copied += self._insert(model, batch, fields, target)
+        return copied
+
+    def _insert(self, model, objs, fields, target):
+        # raw=True stores values as read (no auto_now_add / pre_save rewrites),
+        # the same path loaddata uses.
+        model._base_manager._insert(objs, fields=fields, using=target, raw=True)
+        return len(objs)
+
+    def _reset_sequences(self, models, target):
+        connection = connections[target]
+        statements = connection.ops.sequence_reset_sql(no_style(), models)
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
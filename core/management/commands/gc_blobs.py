@@ -0,0 +1,98 @@
+import os
+import time
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, FileField
+from django.utils import timezone
+from core.images import delete_derivatives
+from core.models import Blob
+from core.storage import BLOB_PREFIX, ContentAddressedStorage
+
+
+class Command(BaseCommand):
+    help = ('Recount references to content-addressed blobs and delete blobs, their image variants '
+            'and stray files under blobs/ that no FileField references any more.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-minutes', type=int, default=60,
+                            help='Keep unreferenced blobs referenced more recently than this (uploads still being saved)')
+        parser.add_argument('--dry-run', action='store_true', help='Report without deleting anything')
+
+    def handle(self, *args, **options):
+        storage = ContentAddressedStorage()
+        cutoff = timezone.now() - timezone.timedelta(minutes=options['grace_minutes'])
+        dry_run = options['dry_run']
+
+        # 1) Count actual references across every FileField using the blob storage.
+        fields = [(model, field) for model in apps.get_models() for field in model._meta.get_fields()
+                  if isinstance(field, FileField) and isinstance(field.storage, ContentAddressedStorage)]
+        refs = {}
+        for model, field in fields:
+            rows = (model._base_manager.filter(**{f'{field.name}__startswith': BLOB_PREFIX})
+                    .values(field.name).annotate(n=Count('pk')))
+            for row in rows:
+                refs[row[field.name]] = refs.get(row[field.name], 0) + row['n']
+
+        fixed = removed = freed = 0
+        for blob in Blob.objects.iterator():
+            actual = refs.get(blob.name, 0)
+            collectable = actual == 0 and blob.last_referenced_at < cutoff
+            if actual == blob.ref_count and not collectable:
+                continue
+            if dry_run:
+                fixed += actual != blob.ref_count
+                removed += collectable
+                freed += blob.size if collectable else 0
+                continue
+            # The counts above are a snapshot: recount this blob under its row lock,
+            # which an upload taking a reference (core.storage) has to wait for.
+            with transaction.atomic():
+                locked = Blob.objects.select_for_update().filter(pk=blob.pk).first()
+                if locked is None or locked.ref_count > blob.ref_count:
+                    # Gone, or referenced again since the snapshot: never lower a count that went up.
+                    continue
+                actual = sum(model._base_manager.filter(**{field.name: locked.name}).count() for model, field in fields)
+                if actual != locked.ref_count:
+                    fixed += 1
+                    Blob.objects.filter(pk=locked.pk).update(ref_count=actual)
+                # The grace period runs from the last reference, not from creation: an upload
+                # of old content takes its reference before its FileField row is saved.
+                if actual == 0 and locked.last_referenced_at < cutoff:
+                    removed += 1
+                    freed += locked.size
+                    locked.delete()
+                    # Inside the lock, so a later upload of this content finds no row and rewrites the file.
+                    storage.delete(locked.name)
+                    delete_derivatives(storage.plain_storage, locked.name)
+
+        # 2) Files under blobs/ without a Blob row (interrupted uploads), and image
+        #    variants (core.images) whose original is gone.
+        known = set(Blob.objects.values_list('name', flat=True))
+        originals = {os.path.splitext(name)[0] for name in known}
+        root = storage.path(BLOB_PREFIX)
+        stray = 0
+        for dirpath, _dirs, files in os.walk(root):
+            for filename in files:
+                full = os.path.join(dirpath, filename)
+                name = os.path.relpath(full, storage.location).replace(os.sep, '/')
+                if name in known:
+                    continue
+                if '/derived/' in name:
+                    # <dir>/derived/<stem>_w<width>.<fmt> belongs to <dir>/<stem>.<ext>
+                    directory, derived = name.split('/derived/', 1)
+                    if f'{directory}/{derived.rsplit("_w", 1)[0]}' in originals:
+                        continue
+                if os.path.getmtime(full) > time.time() - options['grace_minutes'] * 60:
+                    continue
+                stray += 1
+                freed += os.path.getsize(full)
+                if not dry_run:
+                    os.remove(full)
+
+        verb = 'Would remove' if dry_run else 'Removed'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {removed} unreferenced blobs and {stray} stray files ({freed / 1024:.0f} KiB); '
+            f'corrected {fixed} reference counts'
+        ))
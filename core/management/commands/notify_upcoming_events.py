@@ -33,7 +33,7 @@ class Command(BaseCommand):
             if ev.scope == 'college':
                 targets = User.objects.filter(role='student')
             else:
-                targets = User.objects.filter(role='student', department=ev.department)
+                targets = User.objects.filter(role='student', department_id=ev.department_id)
 
             for u in targets:
                 Notification.objects.create(user=u, content=content)
@@ -0,0 +1,208 @@
+import csv
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import validate_email
+from django.db import transaction
+from core import departments
+from core.availability import invalidate_availability
+from core.bloom import request_rebuild
+from core.conditional import bump_model_version
+from core.models import User, StudentProfile, TeacherProfile, StudentIdSequence
+
+COLUMNS = ('username', 'email', 'password', 'role', 'department', 'year', 'first_name', 'last_name')
+
+
+def _init_worker(settings_module):
+    # Worker processes started with "spawn" (macOS/Windows) need Django set up
+    # before make_password can read PASSWORD_HASHERS.
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+def _hash_password(raw):
+    # None produces an unusable password; such users sign in via password reset.
+    return make_password(raw or None)
+
+
+def _parse_year(value):
+    """A year column as an int, or None if it is not a whole positive number.
+
+    Spreadsheets hand whole numbers over as floats ("2.0"), so those are accepted.
+    """
+    try:
+        number = float(value)
+    except ValueError:
+        return None
+    if not number.is_integer() or not 0 < number <= 32767:  # also rejects inf and nan
+        return None
+    return int(number)
+
+
+def _read_rows(path):
+    """Yield (line_no, dict) for every data row of a CSV or XLSX file."""
+    if path.suffix.lower() in ('.xlsx', '.xlsm'):
+        import openpyxl
+        wb = openpyxl.load_workbook(filename=path, read_only=True, data_only=True)
+        rows = wb.active.iter_rows(values_only=True)
+        header = next(rows, None) or ()
+        keys = [str(h).strip().lower() if h is not None else '' for h in header]
+        for idx, row in enumerate(rows, start=2):
+            if not row or all(c is None for c in row):
+                continue
+            yield idx, {k: ('' if v is None else str(v).strip()) for k, v in zip(keys, row) if k}
+        wb.close()
+    else:
+        with path.open(newline='', encoding='utf-8-sig') as fh:
+            reader = csv.DictReader(fh)
+            reader.fieldnames = [(h or '').strip().lower() for h in (reader.fieldnames or [])]
+            for idx, row in enumerate(reader, start=2):
+                if not any((v or '').strip() for v in row.values() if isinstance(v, str)):
+                    continue
+                yield idx, {k: (v or '').strip() for k, v in row.items() if k and isinstance(v, str)}
+
+
+class Command(BaseCommand):
+    help = ('Create student/teacher accounts in bulk from a CSV or XLSX file. '
+            'Expected columns: ' + ', '.join(COLUMNS) + ' (only username and email are required). '
+            'Rows whose username or email already exists are skipped. Per-row signals are bypassed: '
+            'profiles and student IDs are created here in batches.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or XLSX file to import')
+        parser.add_argument('--role', choices=['student', 'teacher'], default='student', help='Role for rows without a role column')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Rows per bulk_create batch')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Processes used for password hashing (1 disables the pool)')
+        parser.add_argument('--approve-teachers', action='store_true', help='Mark created teacher accounts as approved')
+        parser.add_argument('--dry-run', action='store_true', help='Validate the file and report without writing anything')
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f'File not found: {path}')
+        chunk_size = max(1, options['chunk_size'])
+
+        accepted, skipped = self._validate(path, options['role'])
+        for line, reason in skipped:
+            self.stdout.write(self.style.WARNING(f'Row {line}: skipped ({reason})'))
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'Would create {len(accepted)} users, skipped {len(skipped)} rows (dry run)'))
+            return
+
+        hashes = self._hash_all([row.get('password') for row in accepted], options['workers'])
+
+        created = 0
+        try:
+            for start in range(0, len(accepted), chunk_size):
+                batch = accepted[start:start + chunk_size]
+                created += self._create_batch(batch, hashes[start:start + chunk_size], options['approve_teachers'])
+                self.stdout.write(f'  {created}/{len(accepted)} created')
+        finally:
+            if created:
+                # bulk_create sends no post_save, so do what the User receivers would:
+                # rebuild the user filter (core.bloom) and expire cached ETags of pages
+                # that list users. With a shared cache this reaches every web worker.
+                # With the per-process locmem cache it only reaches this process; the
+                # workers see the new users once their counters and filters reach their
+                # max age (CONDITIONAL_VERSION_MAX_AGE, BLOOM_MAX_AGE), and the login
+                # prefilter is off under locmem, so no login is refused meanwhile.
+                request_rebuild()
+                bump_model_version('core.User')
+
+        self.stdout.write(self.style.SUCCESS(f'Created {created} users, skipped {len(skipped)} rows'))
+
+    def _validate(self, path, default_role):
+        """Split the file into rows to create and (line, reason) skips."""
+        rows = list(_read_rows(path))
+        existing_usernames = set()
+        existing_emails = set()
+        # One pass over the user table instead of two lookups per row.
+        for username, email in User.objects.values_list('username', 'email').iterator():
+            existing_usernames.add((username or '').lower())
+            existing_emails.add((email or '').lower())
+
+        accepted, skipped = [], []
+        for line, row in rows:
+            username = row.get('username', '')
+            email = row.get('email', '')
+            role = (row.get('role') or default_role).lower()
+            if not username or not email:
+                skipped.append((line, 'missing username or email'))
+                continue
+            try:
+                validate_email(email)
+            except ValidationError:
+                skipped.append((line, f'invalid email {email!r}'))
+                continue
+            if role not in ('student', 'teacher'):
+                skipped.append((line, f'unknown role {role!r}'))
+                continue
+            if username.lower() in existing_usernames:
+                skipped.append((line, f'username {username!r} exists'))
+                continue
+            if email.lower() in existing_emails:
+                skipped.append((line, f'email {email!r} exists'))
+                continue
+            year = row.get('year') or None
+            if year is not None:
+                year = _parse_year(year)
+                if year is None:
+                    skipped.append((line, f'invalid year {row["year"]!r}'))
+                    continue
+            existing_usernames.add(username.lower())
+            existing_emails.add(email.lower())
+            accepted.append({**row, 'username': username, 'email': email, 'role': role, 'year': year})
+        return accepted, skipped
+
+    def _hash_all(self, passwords, workers):
+        # PBKDF2 dominates provisioning time, so spread it across processes.
+        if workers <= 1 or len(passwords) < 2:
+            return [_hash_password(p) for p in passwords]
+        chunksize = max(1, len(passwords) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'campustrack.settings'),)) as pool:
+            return list(pool.map(_hash_password, passwords, chunksize=chunksize))
+
+    def _create_batch(self, batch, hashes, approve_teachers):
+        students = sum(1 for row in batch if row['role'] == 'student')
+        with transaction.atomic():
+            student_ids = iter(StudentIdSequence.reserve(students))
+            # One lookup per distinct name; names that are not departments yet are added unlisted.
+            by_name = {}
+            for row in batch:
+                name = (row.get('department') or '').strip()
+                if name and name.casefold() not in by_name:
+                    by_name[name.casefold()] = departments.get_or_create(name)
+            users = []
+            for row, password in zip(batch, hashes):
+                users.append(User(
+                    username=row['username'],
+                    email=row['email'],
+                    password=password,
+                    role=row['role'],
+                    department=by_name.get((row.get('department') or '').strip().casefold()),
+                    year=row['year'],
+                    first_name=row.get('first_name', ''),
+                    last_name=row.get('last_name', ''),
+                    teacher_approved=approve_teachers and row['role'] == 'teacher',
+                    student_id=next(student_ids) if row['role'] == 'student' else None,
+                ))
+            # bulk_create skips save() and the post_save receivers, so the
+            # profiles the signals would have created are inserted here.
+            users = User.objects.bulk_create(users)
+            if any(u.pk is None for u in users):
+                # Backends without RETURNING support: look the new rows up.
+                by_username = dict(User.objects.filter(username__in=[u.username for u in users]).values_list('username', 'pk'))
+                for u in users:
+                    u.pk = by_username[u.username]
+            StudentProfile.objects.bulk_create([StudentProfile(user_id=u.pk) for u in users if u.role == 'student'])
+            TeacherProfile.objects.bulk_create([TeacherProfile(user_id=u.pk) for u in users if u.role == 'teacher'])
+        # Names cached as "available" by check_username / check_email are taken now.
+        for user in users:
+            invalidate_availability(user)
+        return len(users)
@@ -0,0 +1,32 @@
+import secrets
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import bloom
+
+
+class Command(BaseCommand):
+    help = ('Tell every worker to rebuild its username/email Bloom filter, then build one here and '
+            'report its size and measured false-positive rate.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--probes', type=int, default=100000,
+                            help='Random names that exist nowhere to look up when measuring false positives')
+
+    def handle(self, *args, **options):
+        bloom.request_rebuild()
+        start = time.perf_counter()
+        current = bloom.build()
+        elapsed = time.perf_counter() - start
+        f = current.bloom
+        self.stdout.write(
+            f'{f.items} names in {f.bits} bits ({f.memory_bytes / 1024:.1f} KiB), {f.hashes} hashes, '
+            f'sized for {f.capacity}; built in {elapsed * 1000:.0f} ms'
+        )
+        probes = max(1, options['probes'])
+        hits = sum(bloom._member(field, secrets.token_hex(8)) in f for field in bloom.FIELDS for _ in range(probes // 2))
+        self.stdout.write(
+            f'false positives: {hits} of {probes // 2 * 2} random probes ({hits / (probes // 2 * 2):.3%}), '
+            f'estimated {f.estimated_false_positive_rate():.3%}, target {f.error_rate:.1%}'
+        )
@@ -0,0 +1,211 @@
+"""Permission-checked serving of uploaded media.
+
+Every ``MEDIA_URL`` request goes through `serve_media`, which decides from
+the path who may read the file:
+
+* avatars and news images are public;
+* post attachments need a logged-in user (the feed shows them to everyone);
+* certificates are readable by their owner, staff, approved teachers of the
+  student's department and, once verified, by logged-in users (verified
+  certificates are listed on profiles and the college activity page).
+
+Content-addressed blobs (see `core.storage`) may back both a certificate and
+an attachment; access is granted if any referencing object allows it. Image
+variants under ``derived/`` follow their original.
+
+The transfer itself is handed to the web server when
+``settings.MEDIA_SERVE_MODE`` is ``"nginx"`` (``X-Accel-Redirect`` to
+``settings.MEDIA_ACCEL_PREFIX``, an ``internal`` location aliased to
+``MEDIA_ROOT``) or ``"sendfile"`` (``X-Sendfile`` for Apache/lighttpd), so a
+large PDF does not hold a Python worker. Otherwise a `FileResponse` is
+returned with ETag/Last-Modified validators and single byte-range support.
+"""
+import mimetypes
+import os
+import re
+import posixpath
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import FileSystemStorage
+from django.db.models import Q
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+from .models import Blob, Certificate, Post
+from .storage import BLOB_PREFIX
+
+PUBLIC_PREFIXES = ('avatars/', 'news_images/')
+ATTACHMENT_PREFIX = 'post_attachments/'
+CERTIFICATE_PREFIX = 'certificates/'
+
+_DERIVED_RE = re.compile(r'^(?P<directory>(?:.*/)?)derived/(?P<stem>[^/]+)_w\d+\.(?:webp|jpg)$')
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _is_approved_teacher(user):
+    return user.is_staff or (getattr(user, 'role', None) == 'teacher' and bool(getattr(user, 'teacher_approved', False)))
+
+
+def can_view_certificate(user, cert):
+    if not user.is_authenticated:
+        return False
+    if user.is_staff or cert.student_id == user.pk or cert.verified:
+        return True
+    return (_is_approved_teacher(user) and bool(user.department_id)
+            and user.department_id == cert.student.department_id)
+
+
+def _original_filter(field, name):
+    """Q matching `field` values that `name` is the file or a derivative of."""
+    match = _DERIVED_RE.match(name)
+    if match is None:
+        return Q(**{field: name})
+    # derived/<stem>_w320.webp belongs to <dir>/<stem>.<any image extension>
+    return Q(**{f'{field}__startswith': f"{match['directory']}{match['stem']}."})
+
+
+def can_view_media(user, name):
+    if name.startswith(PUBLIC_PREFIXES):
+        return True
+    if not user.is_authenticated:
+        return False
+    if user.is_staff:
+        return True
+    attachment = name.startswith((ATTACHMENT_PREFIX, BLOB_PREFIX))
+    if attachment and Post.objects.filter(_original_filter('attachment', name)).exists():
+        return True
+    if name.startswith((CERTIFICATE_PREFIX, BLOB_PREFIX)):
+        certs = Certificate.objects.filter(_original_filter('file', name)).select_related('student')
+        return any(can_view_certificate(user, cert) for cert in certs)
+    return False
+
+
+class _RangeFile:
+    """File-like view of `length` bytes of an open file, starting at `start`.
+
+    Deliberately has no ``fileno()``: WSGI servers would otherwise sendfile()
+    from the offset to the end of the file instead of stopping at `length`.
+    """
+
+    def __init__(self, fh, start, length):
+        self._fh = fh
+        self._remaining = length
+        fh.seek(start)
+
+    def read(self, size=-1):
+        if self._remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._fh.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def close(self):
+        self._fh.close()
+
+
+def _parse_range(header, size):
+    """(start, end) inclusive for a single satisfiable range, 'invalid' or None."""
+    match = _RANGE_RE.match(header.replace(' ', ''))
+    if match is None:
+        # Multiple or malformed ranges: ignoring the header is allowed.
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return 'invalid'
+    return start, end
+
+
+def _cache_control(name):
+    if name.startswith(PUBLIC_PREFIXES):
+        return 'public, max-age=86400'
+    if name.startswith(BLOB_PREFIX):
+        # The name is the content hash, so the bytes behind it never change.
+        return 'private, max-age=31536000, immutable'
+    return 'private, max-age=3600'
+
+
+def serve_media(request, path):
+    name = posixpath.normpath(path).lstrip('/')
+    if name.startswith('../') or name in ('.', '..') or not can_view_media(request.user, name):
+        # 404 rather than 403 so URLs of private files cannot be probed.
+        raise Http404('File not found')
+
+    storage = FileSystemStorage(location=settings.MEDIA_ROOT)
+    try:
+        full_path = storage.path(name)
+        stat = os.stat(full_path)
+    except (SuspiciousFileOperation, FileNotFoundError, NotADirectoryError):
+        raise Http404('File not found')
+
+    etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+    last_modified = int(stat.st_mtime)
+    content_type, encoding = mimetypes.guess_type(name)
+    content_type = content_type or 'application/octet-stream'
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        not_modified['Cache-Control'] = _cache_control(name)
+        return not_modified
+
+    mode = getattr(settings, 'MEDIA_SERVE_MODE', 'django')
+    if mode in ('nginx', 'sendfile'):
+        # The web server does the transfer, including Range requests.
+        response = HttpResponse(content_type=content_type)
+        if mode == 'nginx':
+            prefix = getattr(settings, 'MEDIA_ACCEL_PREFIX', '/protected-media/')
+            response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(name)
+        else:
+            response['X-Sendfile'] = full_path
+    else:
+        response = _file_response(request, full_path, stat.st_size, etag, last_modified, content_type)
+
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = _cache_control(name)
+    response['X-Content-Type-Options'] = 'nosniff'
+    return response
+
+
+def _file_response(request, full_path, size, etag, last_modified, content_type):
+    byte_range = None
+    range_header = request.headers.get('Range')
+    if range_header and request.method in ('GET', 'HEAD') and _if_range_matches(request, etag, last_modified):
+        byte_range = _parse_range(range_header, size)
+    if byte_range == 'invalid':
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    fh = open(full_path, 'rb')
+    if byte_range is None:
+        response = FileResponse(fh, content_type=content_type)
+    else:
+        start, end = byte_range
+        response = FileResponse(_RangeFile(fh, start, end - start + 1), content_type=content_type, status=206)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = str(end - start + 1)
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def _if_range_matches(request, etag, last_modified):
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
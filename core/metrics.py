@@ -0,0 +1,448 @@
+"""Per-view request metrics in Prometheus text format.
+
+`MetricsMiddleware` records, per resolved view name, the number of requests
+(by method and status), a latency histogram, SQL statements and time, template
+render time and response bytes. SQL is measured by an execute wrapper on
+every connection and templates by `InstrumentedDjangoTemplates`, the template
+backend configured in ``settings.TEMPLATES``.
+
+Each process keeps its own aggregates and writes them every
+``settings.METRICS_FLUSH_SECONDS`` to a JSON file of its own in
+``settings.METRICS_DIR``; the `/metrics` view merges all files, so the numbers
+cover every gunicorn worker, including restarted ones (counters never go
+back). Shards of processes that have exited are folded into one
+``retired.json`` and deleted when `/metrics` is read, so the directory does
+not grow with every worker restart. Empty the directory on deploy to start
+from zero.
+
+`/metrics` answers staff users, scrapers presenting ``settings.METRICS_TOKEN``
+as a bearer token and addresses in ``settings.METRICS_ALLOWED_IPS``; nobody
+else by default.
+"""
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import Http404, HttpResponse
+from django.template.backends.django import DjangoTemplates, Template, reraise
+from django.template.exceptions import TemplateDoesNotExist
+from django.utils.crypto import constant_time_compare
+
+from . import bloom
+from .routers import get_alias_query_counts
+from .sqlite import get_lock_stats
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+UNRESOLVED = '<unresolved>'
+METHODS = ('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS')
+BLOOM_GAUGES = ('items', 'capacity', 'bits', 'hashes', 'memory_bytes', 'estimated_false_positive_rate')
+RETIRED_SHARD = 'retired.json'
+RETIRE_LOCK = 'retire.lock'
+# A lock older than this was left by a process that died while retiring.
+RETIRE_LOCK_SECONDS = 60
+
+# Per-request accumulator: {'queries': int, 'sql_seconds': float, 'template_seconds': float, 'template_depth': int}
+_current = contextvars.ContextVar('campustrack_request_metrics', default=None)
+
+_lock = threading.Lock()
+_requests = {}
+_views = {}
+_last_flush = 0.0
+# One file per process lifetime, so a recycled pid never overwrites a dead worker's totals.
+_shard_name = f'{os.getpid()}-{uuid.uuid4().hex[:8]}.json'
+
+
+def _metrics_dir():
+    return str(getattr(settings, 'METRICS_DIR', ''))
+
+
+def _new_accumulator():
+    # Shared by reference with sync_to_async threads, which copy the context.
+    return {'queries': 0, 'sql_seconds': 0.0, 'template_seconds': 0.0, 'template_depth': 0}
+
+
+def _observe(buckets, bounds, value):
+    for i, bound in enumerate(bounds):
+        if value <= bound:
+            buckets[i] += 1
+            return
+    buckets[-1] += 1
+
+
+def record(view, method, status, seconds, queries, sql_seconds, template_seconds, response_bytes):
+    with _lock:
+        key = f'{view}\t{method}\t{status}'
+        _requests[key] = _requests.get(key, 0) + 1
+        stats = _views.get(view)
+        if stats is None:
+            stats = _views[view] = {
+                'count': 0, 'latency_sum': 0.0, 'latency_buckets': [0] * (len(LATENCY_BUCKETS) + 1),
+                'queries': 0, 'query_buckets': [0] * (len(QUERY_BUCKETS) + 1),
+                'sql_seconds': 0.0, 'template_seconds': 0.0, 'response_bytes': 0,
+            }
+        stats['count'] += 1
+        stats['latency_sum'] += seconds
+        _observe(stats['latency_buckets'], LATENCY_BUCKETS, seconds)
+        stats['queries'] += queries
+        _observe(stats['query_buckets'], QUERY_BUCKETS, queries)
+        stats['sql_seconds'] += sql_seconds
+        stats['template_seconds'] += template_seconds
+        stats['response_bytes'] += response_bytes
+
+
+def snapshot():
+    """This process's aggregates (plus its SQLite and per-alias counters)."""
+    with _lock:
+        return {
+            'requests': dict(_requests),
+            'views': {view: {k: (list(v) if isinstance(v, list) else v) for k, v in stats.items()}
+                      for view, stats in _views.items()},
+            'db_statements': get_alias_query_counts(),
+            'sqlite': get_lock_stats(),
+            'bloom': bloom.stats(),
+        }
+
+
+def flush(force=False):
+    """Write this process's snapshot to its shard file (at most every few seconds)."""
+    global _last_flush
+    directory = _metrics_dir()
+    now = time.monotonic()
+    if not directory or (not force and now - _last_flush < getattr(settings, 'METRICS_FLUSH_SECONDS', 5)):
+        return
+    _last_flush = now
+    try:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, _shard_name)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as fh:
+            json.dump(snapshot(), fh)
+        os.replace(tmp_path, path)
+    except OSError:
+        # Metrics must never break a request.
+        pass
+
+
+def _merge(total, shard):
+    for key, count in shard.get('requests', {}).items():
+        total['requests'][key] = total['requests'].get(key, 0) + count
+    for view, stats in shard.get('views', {}).items():
+        merged = total['views'].get(view)
+        if merged is None:
+            total['views'][view] = {k: (list(v) if isinstance(v, list) else v) for k, v in stats.items()}
+            continue
+        for k, v in stats.items():
+            if isinstance(v, list):
+                merged[k] = [a + b for a, b in zip(merged[k], v)]
+            else:
+                merged[k] += v
+    for section in ('db_statements', 'sqlite'):
+        for key, value in shard.get(section, {}).items():
+            total[section][key] = total[section].get(key, 0) + value
+    for key, value in shard.get('bloom', {}).items():
+        # Every worker holds a copy of the same filter: sizes are per process, counters add up.
+        if key in BLOOM_GAUGES:
+            total['bloom'][key] = max(total['bloom'].get(key, 0), value)
+        else:
+            total['bloom'][key] = total['bloom'].get(key, 0) + value
+
+
+def _empty():
+    return {'requests': {}, 'views': {}, 'db_statements': {}, 'sqlite': {}, 'bloom': {}}
+
+
+def _read_shard(directory, name):
+    try:
+        with open(os.path.join(directory, name)) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def _process_exited(name):
+    """Whether the process that wrote shard `name` (``<pid>-<uuid>.json``) is gone."""
+    pid = name.split('-', 1)[0]
+    if os.name == 'nt' or not pid.isdigit():
+        return False  # os.kill(pid, 0) would terminate the process on Windows
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        pass  # alive, but owned by someone else
+    return False
+
+
+def retire_exited_shards(directory):
+    """Fold the shards of exited processes into ``retired.json`` and delete them.
+
+    ``retired.json`` lists the shards it has absorbed until they are deleted,
+    so a crash between the two steps cannot count a shard twice. Only one
+    process retires at a time; the others skip it.
+    """
+    lock_path = os.path.join(directory, RETIRE_LOCK)
+    try:
+        os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+    except FileExistsError:
+        try:
+            if time.time() - os.path.getmtime(lock_path) > RETIRE_LOCK_SECONDS:
+                os.remove(lock_path)
+        except OSError:
+            pass
+        return
+    except OSError:
+        return
+    try:
+        retired = _read_shard(directory, RETIRED_SHARD) or _empty()
+        absorbed = set(retired.get('absorbed', ()))
+        names = [n for n in os.listdir(directory) if n.endswith('.json') and n != RETIRED_SHARD]
+        leftover = [n for n in names if n in absorbed]
+        exited = [n for n in names if n not in absorbed and n != _shard_name and _process_exited(n)]
+        if exited:
+            total = _empty()
+            _merge(total, retired)
+            for name in exited:
+                shard = _read_shard(directory, name)
+                if shard is not None:
+                    _merge(total, shard)
+            # Gauges describe live workers only.
+            total['bloom'] = {k: v for k, v in total['bloom'].items() if k not in BLOOM_GAUGES}
+            total['absorbed'] = sorted(leftover + exited)
+            path = os.path.join(directory, RETIRED_SHARD)
+            with open(f'{path}.tmp', 'w') as fh:
+                json.dump(total, fh)
+            os.replace(f'{path}.tmp', path)
+        for name in leftover + exited:
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+    except OSError:
+        pass
+    finally:
+        try:
+            os.remove(lock_path)
+        except OSError:
+            pass
+
+
+def collect():
+    """Aggregates of every process that has written a shard (or just this one)."""
+    total = _empty()
+    directory = _metrics_dir()
+    if not directory:
+        _merge(total, snapshot())
+        return total
+    flush(force=True)
+    retire_exited_shards(directory)
+    try:
+        names = [n for n in os.listdir(directory) if n.endswith('.json') and n != RETIRED_SHARD]
+    except OSError:
+        names = []
+    shards = {name: _read_shard(directory, name) for name in names}
+    # Read last: a shard retired by another process meanwhile is then listed as absorbed.
+    retired = _read_shard(directory, RETIRED_SHARD) or {}
+    _merge(total, retired)
+    absorbed = set(retired.get('absorbed', ()))
+    for name, shard in shards.items():
+        if shard is not None and name not in absorbed:
+            _merge(total, shard)
+    return total
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _histogram(lines, name, view, bounds, buckets, total, count):
+    cumulative = 0
+    for bound, n in zip(bounds, buckets):
+        cumulative += n
+        lines.append(f'{name}_bucket{{view="{_label(view)}",le="{bound}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{view="{_label(view)}",le="+Inf"}} {count}')
+    lines.append(f'{name}_sum{{view="{_label(view)}"}} {total}')
+    lines.append(f'{name}_count{{view="{_label(view)}"}} {count}')
+
+
+def render_prometheus(data):
+    lines = [
+        '# HELP campustrack_http_requests_total Requests by view, method and status code.',
+        '# TYPE campustrack_http_requests_total counter',
+    ]
+    for key, count in sorted(data['requests'].items()):
+        view, method, status = key.split('\t')
+        lines.append(f'campustrack_http_requests_total{{view="{_label(view)}",method="{method}",status="{status}"}} {count}')
+
+    views = sorted(data['views'].items())
+    lines += ['# HELP campustrack_http_request_duration_seconds Time spent in Django per request.',
+              '# TYPE campustrack_http_request_duration_seconds histogram']
+    for view, s in views:
+        _histogram(lines, 'campustrack_http_request_duration_seconds', view, LATENCY_BUCKETS,
+                   s['latency_buckets'], s['latency_sum'], s['count'])
+    lines += ['# HELP campustrack_db_queries_per_request SQL statements executed per request.',
+              '# TYPE campustrack_db_queries_per_request histogram']
+    for view, s in views:
+        _histogram(lines, 'campustrack_db_queries_per_request', view, QUERY_BUCKETS,
+                   s['query_buckets'], s['queries'], s['count'])
+
+    for name, key, help_text in (
+        ('campustrack_db_query_seconds_total', 'sql_seconds', 'Time spent executing SQL.'),
+        ('campustrack_template_render_seconds_total', 'template_seconds', 'Time spent rendering templates.'),
+        ('campustrack_http_response_bytes_total', 'response_bytes', 'Response body bytes sent.'),
+    ):
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        for view, s in views:
+            lines.append(f'{name}{{view="{_label(view)}"}} {s[key]}')
+
+    lines += ['# HELP campustrack_db_statements_total SQL statements by database alias.',
+              '# TYPE campustrack_db_statements_total counter']
+    for alias, count in sorted(data['db_statements'].items()):
+        lines.append(f'campustrack_db_statements_total{{alias="{_label(alias)}"}} {count}')
+    lines += ['# HELP campustrack_sqlite_lock_events_total SQLite lock contention counters (see core.sqlite).',
+              '# TYPE campustrack_sqlite_lock_events_total counter']
+    for event, value in sorted(data['sqlite'].items()):
+        lines.append(f'campustrack_sqlite_lock_events_total{{event="{_label(event)}"}} {value}')
+
+    filter_stats = data.get('bloom', {})
+    lines += ['# HELP campustrack_user_filter_lookups_total User lookups answered by the Bloom filter (core.bloom): '
+              'absent skipped the database, probable went on to it, false_positive found nobody there.',
+              '# TYPE campustrack_user_filter_lookups_total counter']
+    for result in ('absent', 'probable', 'false_positive'):
+        lines.append(f'campustrack_user_filter_lookups_total{{result="{result}"}} {filter_stats.get(result, 0)}')
+    for name, key, kind, help_text in (
+        ('campustrack_user_filter_rebuilds_total', 'rebuilds', 'counter', 'Filter builds from the user table.'),
+        ('campustrack_user_filter_build_seconds_total', 'build_seconds', 'counter', 'Time spent building filters.'),
+        ('campustrack_user_filter_items', 'items', 'gauge', 'Names added to the filter.'),
+        ('campustrack_user_filter_capacity', 'capacity', 'gauge', 'Names the filter is sized for.'),
+        ('campustrack_user_filter_memory_bytes', 'memory_bytes', 'gauge', 'Size of one worker\'s bit array.'),
+        ('campustrack_user_filter_false_positive_rate', 'estimated_false_positive_rate', 'gauge',
+         'Estimated false-positive rate from the share of bits set.'),
+    ):
+        if key in filter_stats:
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}', f'{name} {filter_stats[key]}']
+    return '\n'.join(lines) + '\n'
+
+
+def _allowed(request):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated and user.is_staff:
+        return True
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return True
+    return request.META.get('REMOTE_ADDR') in getattr(settings, 'METRICS_ALLOWED_IPS', ())
+
+
+def metrics_view(request):
+    if not _allowed(request):
+        raise Http404
+    response = HttpResponse(render_prometheus(collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+def _time_queries(execute, sql, params, many, context):
+    current = _current.get()
+    if current is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        current['queries'] += 1
+        current['sql_seconds'] += time.perf_counter() - start
+
+
+@receiver(connection_created)
+def install_query_timer(sender, connection, **kwargs):
+    if _time_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_queries)
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        current = _current.get()
+        if current is None:
+            return super().render(context, request)
+        # Only the outermost render counts; render_to_string() inside a
+        # template tag would otherwise be counted twice.
+        current['template_depth'] += 1
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            current['template_depth'] -= 1
+            if current['template_depth'] == 0:
+                current['template_seconds'] += time.perf_counter() - start
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, timing each render for MetricsMiddleware."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self._acall(request)
+        token = _current.set(_new_accumulator())
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+            elapsed = time.perf_counter() - start
+            current = _current.get()
+        finally:
+            _current.reset(token)
+        self._record(request, response, elapsed, current)
+        return response
+
+    async def _acall(self, request):
+        token = _current.set(_new_accumulator())
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+            elapsed = time.perf_counter() - start
+            current = _current.get()
+        finally:
+            _current.reset(token)
+        self._record(request, response, elapsed, current)
+        return response
+
+    def _record(self, request, response, elapsed, current):
+        match = getattr(request, 'resolver_match', None)
+        # Unresolved paths share one label so scanners cannot blow up cardinality.
+        view = match.view_name if match is not None and match.view_name else UNRESOLVED
+        if view == 'metrics':
+            return
+        if response.streaming:
+            size = int(response.get('Content-Length') or 0)
+        else:
+            size = len(response.content)
+        method = request.method if request.method in METHODS else 'OTHER'
+        record(view, method, response.status_code, elapsed, current['queries'],
+               current['sql_seconds'], current['template_seconds'], size)
+        flush()
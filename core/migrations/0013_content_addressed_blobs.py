@@ -0,0 +1,35 @@
+# Generated by Django 4.2 on 2026-10-19 15:22
+
+import core.models
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_notification_unread_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('digest', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('size', models.BigIntegerField()),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='certificate',
+            name='file',
+            field=models.FileField(storage=core.models.blob_storage, upload_to='certificates/'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='attachment',
+            field=models.FileField(blank=True, null=True, storage=core.models.blob_storage, upload_to='post_attachments/'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2 on 2026-10-19 16:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    """Step 1 of 3 of turning User.department/Event.department into foreign keys.
+
+    The steps are separate migrations (separate transactions): on PostgreSQL
+    the deferred FK triggers queued by the backfill's UPDATEs would make the
+    ALTER TABLEs of step 3 fail with "pending trigger events".
+    """
+
+    dependencies = [
+        ('core', '0013_content_addressed_blobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='department',
+            name='listed',
+            field=models.BooleanField(default=True, help_text='Offered in the department dropdowns'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='department_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='users', to='core.department'),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='department_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='events', to='core.department'),
+        ),
+    ]
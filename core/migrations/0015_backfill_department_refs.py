@@ -0,0 +1,61 @@
+# Generated by Django 4.2 on 2026-10-19 16:05
+
+from collections import defaultdict
+
+from django.db import migrations
+
+# Rows per UPDATE round during the backfill, to bound memory and statement size.
+BATCH_SIZE = 1000
+
+
+def _department_ids(apps):
+    """Map a stripped, casefolded name to a Department id, creating unlisted ones on demand."""
+    Department = apps.get_model('core', 'Department')
+    ids = {name.strip().casefold(): pk for pk, name in Department.objects.values_list('id', 'name')}
+
+    def department_id(name):
+        key = name.strip().casefold()
+        if key not in ids:
+            ids[key] = Department.objects.create(name=name.strip(), listed=False).pk
+        return ids[key]
+
+    return department_id
+
+
+def backfill(apps, schema_editor):
+    department_id = _department_ids(apps)
+    for model_name in ('User', 'Event'):
+        model = apps.get_model('core', model_name)
+        rows = model.objects.exclude(department__isnull=True).exclude(department='').order_by('pk')
+        last = 0
+        while True:
+            batch = list(rows.filter(pk__gt=last).values_list('pk', 'department')[:BATCH_SIZE])
+            if not batch:
+                break
+            by_department = defaultdict(list)
+            for pk, name in batch:
+                if name.strip():
+                    by_department[department_id(name)].append(pk)
+            for dep_id, pks in by_department.items():
+                model.objects.filter(pk__in=pks).update(department_ref_id=dep_id)
+            last = batch[-1][0]
+
+
+def restore_names(apps, schema_editor):
+    Department = apps.get_model('core', 'Department')
+    for model_name in ('User', 'Event'):
+        model = apps.get_model('core', model_name)
+        for dep_id, name in Department.objects.values_list('id', 'name'):
+            model.objects.filter(department_ref_id=dep_id).update(department=name)
+
+
+class Migration(migrations.Migration):
+    """Step 2 of 3: point department_ref at Department rows matching the old names."""
+
+    dependencies = [
+        ('core', '0014_department_refs'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, restore_names),
+    ]
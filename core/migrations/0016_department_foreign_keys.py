@@ -0,0 +1,40 @@
+# Generated by Django 4.2 on 2026-10-19 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Step 3 of 3: drop the name columns, rename the foreign keys into place, add the indexes."""
+
+    dependencies = [
+        ('core', '0015_backfill_department_refs'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='user',
+            name='department',
+        ),
+        migrations.RemoveField(
+            model_name='event',
+            name='department',
+        ),
+        migrations.RenameField(
+            model_name='user',
+            old_name='department_ref',
+            new_name='department',
+        ),
+        migrations.RenameField(
+            model_name='event',
+            old_name='department_ref',
+            new_name='department',
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['role', 'department', 'year', 'is_active'], name='core_user_role_dept_year_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['scope', 'department', 'date_from'], name='core_event_scope_dept_date_idx'),
+        ),
+    ]
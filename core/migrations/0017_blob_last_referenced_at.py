@@ -0,0 +1,19 @@
+# Generated by Django 4.2 on 2026-10-19 16:10
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_department_foreign_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blob',
+            name='last_referenced_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-19 16:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_blob_last_referenced_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='feed_key',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -1,7 +1,12 @@
-from django.db import models
+from django.db import models, IntegrityError, transaction
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
 from django.conf import settings
+from django.db.models.functions import Lower
+
+# Enables `field__lower=value` lookups, which match the functional
+# LOWER(...) indexes below (iexact compiles to UPPER/LIKE and cannot use them).
+models.CharField.register_lookup(Lower)
 
 ROLE_CHOICES = (('student','Student'),('teacher','Teacher'))
 
@@ -10,17 +15,50 @@ class User(AbstractUser):
     role = models.CharField(max_length=10, choices=ROLE_CHOICES)
     # Whether a teacher account has been approved by an admin (added by migration 0005)
     teacher_approved = models.BooleanField(default=False)
-    department = models.CharField(max_length=100, blank=True, null=True)
+    department = models.ForeignKey('Department', on_delete=models.PROTECT, null=True, blank=True, related_name='users')
     # Automatically assigned, unique student identifier (CT<year>ST####)
     student_id = models.CharField(max_length=20, unique=True, null=True, blank=True)
     year = models.PositiveSmallIntegerField(blank=True, null=True)
+    # Part of the signed calendar feed tokens (core.ical); bumped to revoke the user's feed URLs
+    feed_key = models.PositiveIntegerField(default=0)
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
 
+    class Meta(AbstractUser.Meta):
+        swappable = 'AUTH_USER_MODEL'
+        indexes = [
+            # Case-insensitive login / availability lookups (email__lower, username__lower)
+            models.Index(Lower('email'), name='core_user_email_lower_idx'),
+            models.Index(Lower('username'), name='core_user_username_lower_idx'),
+            # Department rosters: dashboards, marks pages and event notifications
+            models.Index(fields=['role', 'department', 'year', 'is_active'], name='core_user_role_dept_year_idx'),
+        ]
+
     def __str__(self):
         return f"{self.email} ({self.role})"
 
+    def get_session_auth_hash(self):
+        # Users restored by core.authcache carry the hash and leave the password deferred.
+        cached = self.__dict__.get('_session_auth_hash')
+        if cached is not None and 'password' not in self.__dict__:
+            return cached
+        return super().get_session_auth_hash()
+
+    def save(self, *args, **kwargs):
+        # New students get their id before the INSERT, in the same transaction,
+        # so a failed insert rolls the sequence back instead of leaving a gap.
+        if self._state.adding and self.role == 'student' and not self.student_id:
+            with transaction.atomic(using=kwargs.get('using')):
+                self.student_id = StudentIdSequence.reserve(1)[0]
+                try:
+                    super().save(*args, **kwargs)
+                except Exception:
+                    self.student_id = None
+                    raise
+            return
+        super().save(*args, **kwargs)
+
 class StudentProfile(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='student_profile')
     bio = models.TextField(blank=True)
@@ -36,11 +74,35 @@ class TeacherProfile(models.Model):
     def __str__(self):
         return self.user.username
 
+class Blob(models.Model):
+    """One stored file in the content-addressed storage (`core.storage`).
+
+    `ref_count` is the number of FileField values pointing at the blob; the
+    `gc_blobs` command recounts it and removes blobs nobody references.
+    `last_referenced_at` is when an upload last took a reference: gc keeps
+    blobs referenced recently, whose FileField row may not be saved yet.
+    """
+    digest = models.CharField(max_length=64, primary_key=True)
+    name = models.CharField(max_length=255, unique=True)
+    size = models.BigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+    last_referenced_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} refs)"
+
+
+def blob_storage():
+    from .storage import ContentAddressedStorage
+    return ContentAddressedStorage()
+
+
 class Post(models.Model):
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='posts')
     content = models.TextField()
     # optional attachment: image or document (pdf) supporting posts
-    attachment = models.FileField(upload_to='post_attachments/', null=True, blank=True)
+    attachment = models.FileField(upload_to='post_attachments/', storage=blob_storage, null=True, blank=True)
     created_at = models.DateTimeField(default=timezone.now)
     likes = models.ManyToManyField(settings.AUTH_USER_MODEL, related_name='liked_posts', blank=True)
     def __str__(self): return f"Post by {self.author.email}"
@@ -55,7 +117,7 @@ class Comment(models.Model):
 class Certificate(models.Model):
     student = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, limit_choices_to={'role':'student'})
     title = models.CharField(max_length=255)
-    file = models.FileField(upload_to='certificates/')
+    file = models.FileField(upload_to='certificates/', storage=blob_storage)
     uploaded_at = models.DateTimeField(default=timezone.now)
     verified = models.BooleanField(default=False)
     verified_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='verified_certs')
@@ -66,11 +128,12 @@ class Certificate(models.Model):
 class Department(models.Model):
     """A simple admin-managed department list.
 
-    We keep `User.department` as a CharField for backward compatibility but
-    provide a `Department` model so admins can manage allowed department
-    names centrally. Forms will source department choices from this model.
+    `User.department` and `Event.department` point here. Forms offer the
+    listed departments (see core.departments); a name typed under "Other"
+    is stored as an unlisted department that an admin can list or merge.
     """
     name = models.CharField(max_length=120, unique=True)
+    listed = models.BooleanField(default=True, help_text='Offered in the department dropdowns')
 
     class Meta:
         ordering = ['name']
@@ -78,6 +141,68 @@ class Department(models.Model):
     def __str__(self):
         return self.name
 
+class StudentIdSequence(models.Model):
+    """Per-year counter backing the CT<year>ST#### student identifiers.
+
+    Allocation is a single atomic ``UPDATE ... SET last_value = last_value + n``
+    so concurrent registrations never compute the same number, and a caller
+    can reserve a contiguous block of ids for bulk provisioning.
+    """
+    year = models.PositiveSmallIntegerField(primary_key=True)
+    last_value = models.PositiveIntegerField(default=0)
+
+    PREFIX = 'CT{year}ST'
+
+    def __str__(self):
+        return f"{self.prefix_for(self.year)} (last {self.last_value})"
+
+    @classmethod
+    def prefix_for(cls, year):
+        return cls.PREFIX.format(year=year)
+
+    @classmethod
+    def format_id(cls, year, value):
+        return cls.prefix_for(year) + str(value).zfill(4)
+
+    @classmethod
+    def _highest_assigned(cls, year):
+        """Highest number already used for `year` (seeds a new sequence row)."""
+        prefix = cls.prefix_for(year)
+        highest = 0
+        for sid in User.objects.filter(student_id__startswith=prefix).values_list('student_id', flat=True).iterator():
+            suffix = sid[len(prefix):]
+            if suffix.isdigit():
+                highest = max(highest, int(suffix))
+        return highest
+
+    @classmethod
+    def reserve(cls, count=1, year=None):
+        """Atomically reserve `count` consecutive student ids and return them."""
+        if count < 1:
+            return []
+        if year is None:
+            year = timezone.localdate().year
+        for _ in range(3):
+            with transaction.atomic():
+                updated = cls.objects.filter(year=year).update(last_value=models.F('last_value') + count)
+                if updated:
+                    last = cls.objects.filter(year=year).values_list('last_value', flat=True).get()
+                    break
+                try:
+                    # First allocation this year: continue after any ids
+                    # assigned before the sequence table existed.
+                    with transaction.atomic():
+                        seq = cls.objects.create(year=year, last_value=cls._highest_assigned(year) + count)
+                    last = seq.last_value
+                    break
+                except IntegrityError:
+                    # Another process created the row first; retry the UPDATE.
+                    continue
+        else:
+            raise RuntimeError(f'Could not allocate student ids for {year}')
+        return [cls.format_id(year, value) for value in range(last - count + 1, last + 1)]
+
+
 class Event(models.Model):
     SCOPE_CHOICES = (('department','Department'),('college','College'))
     title = models.CharField(max_length=255)
@@ -85,10 +210,17 @@ class Event(models.Model):
     date_from = models.DateTimeField()
     date_to = models.DateTimeField()
     scope = models.CharField(max_length=20, choices=SCOPE_CHOICES, default='college')
-    department = models.CharField(max_length=100, blank=True, null=True)
+    department = models.ForeignKey(Department, on_delete=models.PROTECT, null=True, blank=True, related_name='events')
     # Optional registration URL provided by teachers
     registration_link = models.URLField(blank=True, null=True)
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True)
+
+    class Meta:
+        indexes = [
+            # Department event lists and reminders, in date order
+            models.Index(fields=['scope', 'department', 'date_from'], name='core_event_scope_dept_date_idx'),
+        ]
+
     def __str__(self): return self.title
 
     @property
@@ -147,6 +279,15 @@ class Notification(models.Model):
     content = models.CharField(max_length=255)
     created_at = models.DateTimeField(default=timezone.now)
     read = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            # Unread badge / polling queries only ever touch unread rows.
+            # Partial indexes are created on backends that support them
+            # (PostgreSQL, SQLite) and skipped elsewhere.
+            models.Index(fields=['user', 'created_at'], condition=models.Q(read=False), name='core_notif_unread_idx'),
+        ]
+
     def __str__(self): return f"Notif for {self.user.email}"
 
 
@@ -0,0 +1,39 @@
+"""Cache keys and invalidation for the public news pages.
+
+Anonymous `news_list` pages and `news_detail` articles are cached as rendered
+HTML. A detail entry is deleted when its article changes; list pages are keyed
+by a generation counter that is bumped on any change, since one new or
+removed article shifts every page of the list. The page number in a list key
+is clamped to the real page range first, so ``?page=N`` for arbitrary N
+cannot fill the cache with copies of the last page.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+
+from .caching import bump_generation, get_generation, get_or_set_locked
+
+NEWS_CACHE_TIMEOUT = getattr(settings, 'NEWS_CACHE_TIMEOUT', 60 * 60)
+NEWS_PAGE_SIZE = getattr(settings, 'NEWS_PAGE_SIZE', 12)
+LIST_GENERATION_KEY = 'news:list:generation'
+
+
+def news_list_cache_key(page):
+    return f'news:list:{get_generation(LIST_GENERATION_KEY)}:page:{page}'
+
+
+def news_page_count():
+    """Number of news list pages, cached under the list generation."""
+    from .models import News
+
+    key = f'news:list:{get_generation(LIST_GENERATION_KEY)}:pages'
+    return get_or_set_locked(key, lambda: Paginator(News.objects.all(), NEWS_PAGE_SIZE).num_pages, NEWS_CACHE_TIMEOUT)
+
+
+def news_detail_cache_key(news_id):
+    return f'news:detail:{news_id}'
+
+
+def invalidate_news(news_id):
+    cache.delete(news_detail_cache_key(news_id))
+    bump_generation(LIST_GENERATION_KEY)
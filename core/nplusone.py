@@ -0,0 +1,174 @@
+"""Repeated-query (N+1) detection and per-view query budgets.
+
+`QueryRecorder` fingerprints every SQL statement run inside it (literals and
+``IN (...)`` lists collapsed) and remembers where each one came from: the
+template line being rendered, if any, and the innermost project source line.
+A fingerprint seen `threshold` times or more in one request is almost always
+a per-row query in a loop.
+
+`NPlusOneMiddleware` runs the recorder on every request when
+``settings.NPLUSONE_ENABLED`` (default: ``DEBUG``) and logs offenders to the
+``core.nplusone`` logger, or raises `RepeatedQueriesError` when
+``settings.NPLUSONE_RAISE`` is set. `QueryBudgetMixin` gives test cases
+``assertQueryBudget()`` so ``core/tests.py`` can pin the number of queries a
+view may run against seeded data and CI fails when a change adds more.
+"""
+import logging
+import os
+import re
+import sys
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\bIN\s*\((?:\s*(?:%s|\?)\s*,?)+\)', re.IGNORECASE)
+_SPACE_RE = re.compile(r'\s+')
+
+# Execute wrappers and helpers that sit on every query's stack.
+_IGNORED_FILES = {
+    os.path.join(os.path.dirname(__file__), name)
+    for name in ('nplusone.py', 'metrics.py', 'routers.py', 'sqlite.py')
+}
+
+
+class RepeatedQueriesError(Exception):
+    pass
+
+
+def fingerprint(sql):
+    sql = _STRING_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('IN (...)', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+def _project_root():
+    return str(getattr(settings, 'BASE_DIR', os.getcwd()))
+
+
+def query_location():
+    """'template.html:12' and/or 'core/views.py:40 in view' for the running query."""
+    root = _project_root()
+    template = code = None
+    frame = sys._getframe(1)
+    while frame is not None and (template is None or code is None):
+        if template is None and frame.f_code.co_name == 'render_annotated':
+            node = frame.f_locals.get('self')
+            origin, token = getattr(node, 'origin', None), getattr(node, 'token', None)
+            if origin is not None and token is not None:
+                template = f'{origin.template_name}:{token.lineno}'
+        filename = frame.f_code.co_filename
+        if (code is None and filename.startswith(root) and filename not in _IGNORED_FILES
+                and 'site-packages' not in filename):
+            code = f'{os.path.relpath(filename, root)}:{frame.f_lineno} in {frame.f_code.co_name}'
+        frame = frame.f_back
+    return ' via '.join(part for part in (template, code) if part) or '<unknown>'
+
+
+class QueryRecorder:
+    """Count statements by fingerprint on every database alias while active."""
+
+    def __init__(self):
+        self.total = 0
+        self.counts = Counter()
+        self.locations = {}
+        self.samples = {}
+        self._stack = None
+
+    def __call__(self, execute, sql, params, many, context):
+        key = fingerprint(sql)
+        self.total += 1
+        self.counts[key] += 1
+        self.locations.setdefault(key, Counter())[query_location()] += 1
+        self.samples.setdefault(key, sql)
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for alias in connections:
+            self._stack.enter_context(connections[alias].execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+        self._stack = None
+
+    def repeated(self, threshold):
+        """[(count, fingerprint, most common location), ...] for shapes run >= threshold times."""
+        return [
+            (count, key, self.locations[key].most_common(1)[0][0])
+            for key, count in self.counts.most_common()
+            if count >= threshold
+        ]
+
+    def report(self, threshold):
+        lines = [f'{self.total} queries']
+        for count, key, location in self.repeated(threshold):
+            lines.append(f'  {count}x at {location}: {key[:300]}')
+        return '\n'.join(lines)
+
+
+class NPlusOneMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'NPLUSONE_ENABLED', settings.DEBUG):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = getattr(settings, 'NPLUSONE_THRESHOLD', 5)
+        self.raise_errors = getattr(settings, 'NPLUSONE_RAISE', False)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+        return self._finish(request, response, recorder)
+
+    async def __acall__(self, request):
+        # Connections are per thread and the ORM runs in the request's thread-sensitive
+        # sync_to_async thread, so the wrappers are installed there, not on this one's.
+        recorder = QueryRecorder()
+        await sync_to_async(recorder.__enter__)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(recorder.__exit__)(None, None, None)
+        return self._finish(request, response, recorder)
+
+    def _finish(self, request, response, recorder):
+        if recorder.repeated(self.threshold):
+            message = f'Repeated queries in {request.method} {request.path}: {recorder.report(self.threshold)}'
+            if self.raise_errors:
+                raise RepeatedQueriesError(message)
+            logger.warning(message)
+        response['X-DB-Queries'] = str(recorder.total)
+        return response
+
+
+class QueryBudgetMixin:
+    """TestCase mixin: fail when a page runs too many or repeated queries."""
+
+    repeated_query_threshold = 5
+
+    def assertQueryBudget(self, url, budget, threshold=None, **extra):
+        threshold = threshold or self.repeated_query_threshold
+        with QueryRecorder() as recorder:
+            response = self.client.get(url, **extra)
+        self.assertLess(response.status_code, 400, f'GET {url} returned {response.status_code}')
+        if recorder.total > budget:
+            self.fail(f'GET {url} ran {recorder.total} queries, budget is {budget}:\n{recorder.report(2)}')
+        if recorder.repeated(threshold):
+            self.fail(f'GET {url} repeats queries:\n{recorder.report(threshold)}')
+        return response
@@ -0,0 +1,124 @@
+"""Token-bucket rate limiting on top of Django's cache framework.
+
+``settings.RATELIMITS`` maps a group name to its buckets, one per scope::
+
+    {'availability': {'session': (30, 30), 'ip': (300, 60)}}
+
+``(30, 30)`` is a bucket of 30 requests that refills completely in 30
+seconds, i.e. bursts of 30 and one request per second sustained. Scopes are
+``session`` (the session cookie; skipped when the client has none), ``ip``
+(the client address, see `client_ip`) and ``site`` (one bucket shared by
+everyone, for budgets such as database lookups).
+
+`ratelimit(group)` decorates a sync or async view; `consume(group, request)`
+can be called anywhere below it. Either way an empty bucket raises
+`RateLimited` and the client gets a 429 with Retry-After.
+
+Buckets are read and written with plain get/set, so concurrent requests on
+the same key can each spend the same token: under contention a client may
+get slightly more than its rate, never unboundedly more. With the default
+locmem cache every worker has its own buckets; use CACHE_URL=redis:// or
+file:// to share them.
+"""
+import math
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+
+
+class RateLimited(Exception):
+    def __init__(self, group, scope, retry_after):
+        super().__init__(f'{group} rate limit exceeded ({scope}), retry in {retry_after:.1f}s')
+        self.group = group
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+def client_ip(request):
+    """The client address, skipping ``RATELIMIT_PROXY_COUNT`` trusted proxies.
+
+    Each proxy appends the address it received the request from to
+    X-Forwarded-For, so the n-th entry from the right was written by our own
+    outermost proxy; anything left of it is client-supplied.
+    """
+    proxies = getattr(settings, 'RATELIMIT_PROXY_COUNT', 0)
+    if proxies:
+        forwarded = [part.strip() for part in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if part.strip()]
+        if len(forwarded) >= proxies:
+            return forwarded[-proxies]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def take(key, capacity, per_seconds):
+    """Spend one token from the bucket at `key`; 0 if allowed, else seconds until a token is back."""
+    rate = capacity / per_seconds
+    now = time.time()
+    state = cache.get(key)
+    tokens, stamp = state if state is not None else (capacity, now)
+    tokens = min(capacity, tokens + (now - stamp) * rate)
+    if tokens < 1:
+        return (1 - tokens) / rate
+    # A bucket left alone for `per_seconds` is full again, which is what a missing key means.
+    cache.set(key, (tokens - 1, now), math.ceil(per_seconds))
+    return 0
+
+
+def _scope_key(scope, request):
+    if scope == 'site':
+        return 'site'
+    if scope == 'ip':
+        return f'ip:{client_ip(request)}'
+    if scope == 'session':
+        session = getattr(request, 'session', None)
+        session_key = session.session_key if session is not None else None
+        return f'session:{session_key}' if session_key else None
+    raise ValueError(f'Unknown rate limit scope {scope!r}')
+
+
+def consume(group, request):
+    """Take a token from every bucket of `group`; raise RateLimited when one is empty."""
+    if not getattr(settings, 'RATELIMIT_ENABLED', True):
+        return
+    for scope, (capacity, per_seconds) in settings.RATELIMITS[group].items():
+        key = _scope_key(scope, request)
+        if key is None:
+            continue
+        retry_after = take(f'ratelimit:{group}:{key}', capacity, per_seconds)
+        if retry_after:
+            raise RateLimited(group, scope, retry_after)
+
+
+def too_many_requests(exc):
+    seconds = max(1, math.ceil(exc.retry_after))
+    response = JsonResponse({'message': f'Too many requests, try again in {seconds}s', 'retry_after': seconds},
+                            status=429)
+    response['Retry-After'] = str(seconds)
+    return response
+
+
+def ratelimit(group):
+    """Apply the buckets of `group` to a view and answer RateLimited (from anywhere inside it) with 429."""
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def _wrapped(request, *args, **kwargs):
+                try:
+                    await sync_to_async(consume)(group, request)
+                    return await view_func(request, *args, **kwargs)
+                except RateLimited as exc:
+                    return too_many_requests(exc)
+            return _wrapped
+
+        @wraps(view_func)
+        def _wrapped(request, *args, **kwargs):
+            try:
+                consume(group, request)
+                return view_func(request, *args, **kwargs)
+            except RateLimited as exc:
+                return too_many_requests(exc)
+        return _wrapped
+    return decorator
@@ -0,0 +1,138 @@
+"""Primary/replica database routing for read-heavy views.
+
+`ReplicaRoutingMiddleware` marks requests for the views listed in
+``settings.REPLICA_READ_VIEWS``; `PrimaryReplicaRouter` then sends their reads
+to the ``replica`` alias. Reads of models in ``settings.REPLICA_READ_MODELS``
+go to the replica from any view. Writes always go to ``default``.
+
+Read-your-writes: as soon as a request writes, the rest of it reads from the
+primary, and the response sets a short-lived cookie that keeps the same client
+on the primary for ``settings.REPLICA_PIN_SECONDS`` so it sees its own change
+even if the replica lags.
+
+Without a ``replica`` entry in ``DATABASES`` every query stays on ``default``.
+"""
+import contextvars
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+PRIMARY = 'default'
+REPLICA = 'replica'
+PIN_COOKIE = 'ct_primary_until'
+
+# Per-request routing state: {'replica_ok': bool, 'wrote': bool, 'pinned': bool}
+_state = contextvars.ContextVar('campustrack_db_routing', default=None)
+
+_counts_lock = threading.Lock()
+_query_counts = {}
+
+
+def replica_enabled():
+    return REPLICA in settings.DATABASES
+
+
+def get_alias_query_counts():
+    """Per-process count of executed statements, keyed by database alias."""
+    with _counts_lock:
+        return dict(_query_counts)
+
+
+def _count_queries(execute, sql, params, many, context):
+    alias = context['connection'].alias
+    with _counts_lock:
+        _query_counts[alias] = _query_counts.get(alias, 0) + 1
+    return execute(sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_query_counter(sender, connection, **kwargs):
+    if _count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_queries)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not replica_enabled() or connections[PRIMARY].in_atomic_block:
+            return PRIMARY
+        state = _state.get()
+        if state is not None and state['wrote']:
+            return PRIMARY
+        if state is not None and state['replica_ok']:
+            return REPLICA
+        if model._meta.label in getattr(settings, 'REPLICA_READ_MODELS', ()) and (state is None or not state['pinned']):
+            return REPLICA
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state['wrote'] = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data.
+        if {obj1._state.db, obj2._state.db} <= {PRIMARY, REPLICA}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica receives its schema through replication.
+        return db != REPLICA
+
+
+class ReplicaRoutingMiddleware:
+    """Decide per request whether reads may use the replica."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self._acall(request)
+        token = _state.set({'replica_ok': False, 'wrote': False, 'pinned': self._pinned(request)})
+        try:
+            return self._finish(self.get_response(request))
+        finally:
+            _state.reset(token)
+
+    async def _acall(self, request):
+        token = _state.set({'replica_ok': False, 'wrote': False, 'pinned': self._pinned(request)})
+        try:
+            return self._finish(await self.get_response(request))
+        finally:
+            _state.reset(token)
+
+    def _finish(self, response):
+        state = _state.get()
+        if state['wrote'] and replica_enabled():
+            pin_seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 10)
+            response.set_cookie(PIN_COOKIE, str(int(time.time()) + pin_seconds), max_age=pin_seconds, httponly=True, samesite='Lax')
+        if settings.DEBUG and replica_enabled():
+            response['X-DB-Route'] = REPLICA if state['replica_ok'] and not state['wrote'] else PRIMARY
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = _state.get()
+        match = getattr(request, 'resolver_match', None)
+        if state is None or match is None or state['pinned']:
+            return None
+        if request.method in ('GET', 'HEAD') and match.view_name in getattr(settings, 'REPLICA_READ_VIEWS', ()):
+            state['replica_ok'] = True
+        return None
+
+    def _pinned(self, request):
+        try:
+            return int(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
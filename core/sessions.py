@@ -0,0 +1,42 @@
+"""Cached database sessions that stay safe on a per-process cache.
+
+Django's cached_db engine keeps each session in the cache for the session's
+whole lifetime. With the default locmem cache every worker has its own copy,
+so after a logout (which deletes the row and only this worker's entry) the
+other workers would keep accepting the session cookie for weeks.
+``settings.SESSION_CACHE_MAX_AGE`` caps how long an entry is trusted: with a
+per-process cache a logout reaches every worker within that many seconds,
+and an active session still costs at most one read per worker per interval
+instead of one per request. With a shared cache (redis, file) the cap is
+off and this is plain cached_db.
+
+Selected with ``SESSION_BACKEND=cached_db``; see campustrack/settings.py.
+"""
+from django.conf import settings
+from django.contrib.sessions.backends import cached_db
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+
+
+class SessionStore(cached_db.SessionStore):
+    def _cache_timeout(self, expiry_age):
+        cap = getattr(settings, 'SESSION_CACHE_MAX_AGE', None)
+        return expiry_age if cap is None else min(expiry_age, cap)
+
+    def load(self):
+        try:
+            data = self._cache.get(self.cache_key)
+        except Exception:
+            # As cached_db: an invalid cache key resets the session.
+            data = None
+        if data is None:
+            s = self._get_session_from_db()
+            if s:
+                data = self.decode(s.session_data)
+                self._cache.set(self.cache_key, data, self._cache_timeout(self.get_expiry_age(expiry=s.expire_date)))
+            else:
+                data = {}
+        return data
+
+    def save(self, must_create=False):
+        DBStore.save(self, must_create)
+        self._cache.set(self.cache_key, self._session, self._cache_timeout(self.get_expiry_age()))
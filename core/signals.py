@@ -1,7 +1,14 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
-from .models import User, StudentProfile, TeacherProfile, Certificate, Notification
-import datetime
+from .models import User, StudentProfile, TeacherProfile, Certificate, Notification, Marks, Post, Comment, StudentIdSequence, News, Event, Department
+from .insights import invalidate_student_summary
+from .news_cache import invalidate_news
+from .availability import invalidate_availability
+from .authcache import invalidate_user as invalidate_cached_user
+from .bloom import add_user as add_user_to_bloom_filter
+from .departments import invalidate_departments
+from .conditional import bump_model_version
+from .images import ensure_derivatives, is_image_name
 
 @receiver(post_save, sender=User)
 def create_user_related_profiles(sender, instance: User, created, **kwargs):
@@ -18,8 +25,11 @@ def cert_uploaded(sender, instance, created, **kwargs):
         Notification.objects.create(user=instance.student, content=f'Certificate \"{instance.title}\" uploaded and awaiting verification')
 
 @receiver(post_save, sender=User)
-def ensure_profiles_exist_on_update(sender, instance: User, **kwargs):
+def ensure_profiles_exist_on_update(sender, instance: User, created, **kwargs):
     """If role changed later, ensure appropriate profile exists."""
+    if created:
+        # create_user_related_profiles has just created it
+        return
     if instance.role == 'student':
         StudentProfile.objects.get_or_create(user=instance)
     elif instance.role == 'teacher':
@@ -27,27 +37,151 @@ def ensure_profiles_exist_on_update(sender, instance: User, **kwargs):
 
 
 def generate_student_id():
-    year = datetime.datetime.now().year
-    prefix = f"CT{year}ST"
+    """Allocate the next student id for the current year from the sequence table.
+
+    New student users get their id from `User.save()` inside the INSERT's
+    transaction; this helper is kept for scripts that need a standalone id.
+    """
+    return StudentIdSequence.reserve(1)[0]
+
+
+@receiver(pre_save, sender=Marks)
+def remember_previous_mark_student(sender, instance, **kwargs):
+    """Remember the original student of an edited mark so both summaries are dropped."""
+    instance._previous_student_id = None
+    if instance.pk:
+        instance._previous_student_id = Marks.objects.filter(pk=instance.pk).values_list('student_id', flat=True).first()
+
 
-    last_user = User.objects.filter(student_id__startswith=prefix).order_by("student_id").last()
+@receiver(post_save, sender=Marks)
+@receiver(post_delete, sender=Marks)
+@receiver(post_save, sender=Certificate)
+@receiver(post_delete, sender=Certificate)
+def invalidate_summary_for_student_records(sender, instance, **kwargs):
+    invalidate_student_summary(instance.student_id, getattr(instance, '_previous_student_id', None))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_summary_for_authored_records(sender, instance, **kwargs):
+    invalidate_student_summary(instance.author_id)
 
-    if not last_user:
-        return prefix + "0001"
 
-    last_id = int(last_user.student_id[-4:])
-    new_id = last_id + 1
-    return prefix + str(new_id).zfill(4)
+@receiver(post_save, sender=News)
+@receiver(post_delete, sender=News)
+def invalidate_news_pages(sender, instance, **kwargs):
+    invalidate_news(instance.pk)
 
 
 @receiver(post_save, sender=User)
-def assign_student_id(sender, instance, created, **kwargs):
-    # Assign only once at creation for students
-    try:
-        if created and getattr(instance, 'role', None) == "student":
-            if not instance.student_id:
-                instance.student_id = generate_student_id()
-                instance.save()
-    except Exception:
-        # Defensive: do not allow signal errors to break user creation
-        pass
+@receiver(post_delete, sender=User)
+def invalidate_user_availability(sender, instance, **kwargs):
+    invalidate_availability(instance)
+
+
+@receiver(post_save, sender=User)
+def add_user_to_lookup_filter(sender, instance, **kwargs):
+    add_user_to_bloom_filter(instance)
+
+
+# request.user snapshots (core.authcache): profile edits, password changes, deactivation
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_snapshot(sender, instance, **kwargs):
+    invalidate_cached_user(instance.pk)
+
+
+@receiver(post_save, sender=StudentProfile)
+@receiver(post_delete, sender=StudentProfile)
+@receiver(post_save, sender=TeacherProfile)
+@receiver(post_delete, sender=TeacherProfile)
+def invalidate_profile_owner_snapshot(sender, instance, **kwargs):
+    invalidate_cached_user(instance.user_id)
+
+
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+def invalidate_department_registry(sender, instance, **kwargs):
+    invalidate_departments()
+
+
+# Version counters behind the ETag/Last-Modified validators (core.conditional)
+VERSIONED_MODELS = (User, StudentProfile, TeacherProfile, Post, Comment, Certificate, Event, Marks, News)
+# Rows of these models also bump a counter scoped to the user they belong to, so
+# a page about one user is not invalidated by every other user's change.
+VERSION_OWNERS = {
+    'core.User': 'pk',
+    'core.StudentProfile': 'user_id',
+    'core.TeacherProfile': 'user_id',
+    'core.Certificate': 'student_id',
+    'core.Marks': 'student_id',
+}
+
+
+@receiver(pre_save, sender=User)
+def remember_previous_department(sender, instance, update_fields=None, **kwargs):
+    """Remember the department a user leaves, so its leaderboards are refreshed too."""
+    instance._previous_department_id = None
+    if instance.pk and (update_fields is None or 'department' in update_fields):
+        instance._previous_department_id = (
+            User.objects.filter(pk=instance.pk).values_list('department_id', flat=True).first())
+
+
+def bump_version_for_instance(sender, instance, update_fields=None, **kwargs):
+    if sender is User and update_fields is not None and set(update_fields) == {'last_login'}:
+        return  # every login does this, and no page shows last_login
+    label = sender._meta.label
+    bump_model_version(label)
+    owner = VERSION_OWNERS.get(label)
+    if owner:
+        owners = {getattr(instance, owner), getattr(instance, '_previous_student_id', None)}
+        for user_id in owners - {None}:
+            bump_model_version(label, user_id)
+    if sender is User:
+        # Profiles rank a student among the department's students.
+        departments = {instance.department_id, getattr(instance, '_previous_department_id', None)}
+        for department_id in departments - {None}:
+            bump_model_version(label, f'department:{department_id}')
+
+
+for _model in VERSIONED_MODELS:
+    post_save.connect(bump_version_for_instance, sender=_model, dispatch_uid=f'version-{_model._meta.label}-save')
+    post_delete.connect(bump_version_for_instance, sender=_model, dispatch_uid=f'version-{_model._meta.label}-delete')
+
+
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Notification)
+def bump_user_notifications_version(sender, instance, **kwargs):
+    bump_model_version('core.Notification', instance.user_id)
+
+
+@receiver(post_save, sender=StudentProfile)
+def build_avatar_derivatives(sender, instance, **kwargs):
+    if instance.avatar:
+        ensure_derivatives(instance.avatar, 'avatar')
+
+
+@receiver(post_save, sender=News)
+def build_news_image_derivatives(sender, instance, **kwargs):
+    if instance.image:
+        ensure_derivatives(instance.image, 'news')
+
+
+@receiver(post_save, sender=Post)
+def build_attachment_derivatives(sender, instance, **kwargs):
+    if instance.attachment and is_image_name(instance.attachment.name):
+        ensure_derivatives(instance.attachment, 'attachment')
+
+
+@receiver(post_delete, sender=Certificate)
+def release_certificate_file(sender, instance, **kwargs):
+    if instance.file:
+        instance.file.storage.release(instance.file.name)
+
+
+@receiver(post_delete, sender=Post)
+def release_post_attachment(sender, instance, **kwargs):
+    if instance.attachment:
+        instance.attachment.storage.release(instance.attachment.name)
@@ -0,0 +1,140 @@
+"""SQLite connection tuning and lock-contention counters.
+
+Every new SQLite connection gets the PRAGMAs of the profile named by
+``settings.SQLITE_PROFILE`` (overridden key-by-key by ``settings.SQLITE_PRAGMAS``).
+Statements that fail with "database is locked" outside a transaction are
+retried a few times with a short backoff; the counters below record how often
+that happens so lock contention can be watched in production. Most lock waits
+never fail, though: ``busy_timeout`` absorbs them inside SQLite. Those are
+counted as ``busy_waits`` (and ``busy_wait_seconds``): writes that took longer
+than ``settings.SQLITE_BUSY_WAIT_THRESHOLD``. With WAL, readers never wait on
+the writer, so a slow write is almost always one that waited for the lock.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import OperationalError
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+PROFILES = {
+    # Django's defaults: rollback journal, no busy timeout, default cache.
+    'default': {},
+    'tuned': {
+        # Readers no longer block the single writer and vice versa.
+        'journal_mode': 'WAL',
+        # Wait up to 5s for a competing writer instead of failing immediately.
+        'busy_timeout': 5000,
+        # Safe with WAL: only the last commits can be lost on power failure.
+        'synchronous': 'NORMAL',
+        'mmap_size': 128 * 1024 * 1024,
+        # Negative values are KiB: ~20 MB page cache per connection.
+        'cache_size': -20000,
+        'temp_store': 'MEMORY',
+    },
+}
+
+_stats_lock = threading.Lock()
+_stats = {
+    'connections': 0,
+    'lock_errors': 0,
+    'retries': 0,
+    'retry_successes': 0,
+    'gave_up': 0,
+    'retry_wait_seconds': 0.0,
+    'busy_waits': 0,
+    'busy_wait_seconds': 0.0,
+}
+READ_PREFIXES = ('SELECT', 'PRAGMA', 'EXPLAIN')
+
+
+def get_pragmas():
+    """Return the PRAGMAs configured for this process."""
+    pragmas = dict(PROFILES.get(getattr(settings, 'SQLITE_PROFILE', 'tuned'), {}))
+    pragmas.update(getattr(settings, 'SQLITE_PRAGMAS', {}) or {})
+    return pragmas
+
+
+def apply_pragmas(cursor, pragmas):
+    """Run `PRAGMA key=value` for each item on a DB-API cursor."""
+    for key, value in pragmas.items():
+        cursor.execute(f'PRAGMA {key}={value}')
+
+
+def get_lock_stats():
+    """Snapshot of the per-process lock-contention counters."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_lock_stats():
+    with _stats_lock:
+        for key in _stats:
+            _stats[key] = 0.0 if isinstance(_stats[key], float) else 0
+
+
+def _bump(key, amount=1):
+    with _stats_lock:
+        _stats[key] += amount
+
+
+def _is_lock_error(exc):
+    return 'database is locked' in str(exc) or 'database table is locked' in str(exc)
+
+
+def _count_busy_wait(sql, started, threshold):
+    elapsed = time.monotonic() - started
+    if elapsed > threshold and not sql.lstrip()[:7].upper().startswith(READ_PREFIXES):
+        _bump('busy_waits')
+        _bump('busy_wait_seconds', elapsed)
+
+
+def retry_on_lock(execute, sql, params, many, context):
+    """Execute wrapper that retries "database is locked" outside transactions.
+
+    Inside an atomic block a retry cannot help (the transaction already holds
+    or waits on the lock), so the error is only counted and re-raised.
+    """
+    connection = context['connection']
+    retries = getattr(settings, 'SQLITE_LOCK_RETRIES', 3)
+    threshold = getattr(settings, 'SQLITE_BUSY_WAIT_THRESHOLD', 0.1)
+    if many and not isinstance(params, (list, tuple)):
+        # executemany() consumes an iterator: a retry would otherwise write nothing.
+        params = list(params)
+    attempt = 0
+    while True:
+        started = time.monotonic()
+        try:
+            result = execute(sql, params, many, context)
+        except OperationalError as exc:
+            if not _is_lock_error(exc):
+                raise
+            _count_busy_wait(sql, started, threshold)
+            _bump('lock_errors')
+            if connection.in_atomic_block or attempt >= retries:
+                _bump('gave_up')
+                raise
+            attempt += 1
+            _bump('retries')
+            delay = 0.05 * (2 ** (attempt - 1))
+            _bump('retry_wait_seconds', delay)
+            time.sleep(delay)
+            continue
+        _count_busy_wait(sql, started, threshold)
+        if attempt:
+            _bump('retry_successes')
+        return result
+
+
+@receiver(connection_created)
+def configure_sqlite_connection(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = get_pragmas()
+    if pragmas:
+        with connection.cursor() as cursor:
+            apply_pragmas(cursor, pragmas)
+    if retry_on_lock not in connection.execute_wrappers:
+        connection.execute_wrappers.append(retry_on_lock)
+    _bump('connections')
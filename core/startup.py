@@ -0,0 +1,97 @@
+"""Worker start-up: import-time measurement and warm-up.
+
+`warm_up()` is called from ``campustrack/wsgi.py`` and ``campustrack/asgi.py``
+once the application is loaded, i.e. in every worker before it accepts
+traffic. It imports the URLconf and compiles its patterns, compiles every
+project template into the cached template loader and builds the user lookup
+filter (`core.bloom`), so the first requests after a restart do not pay for
+any of them.
+
+`measure_imports()` runs a fresh interpreter with ``-X importtime`` and is
+used by ``manage.py benchmark_startup`` and the start-up import tests.
+"""
+import logging
+import os
+import re
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# What a worker imports before serving: settings, apps, URLconf (and so every view module).
+STARTUP_CODE = 'import django; django.setup(); import campustrack.urls'
+# Only imported by the code that uses them; importing them at start-up is a regression.
+LAZY_MODULES = ('openpyxl', 'PIL')
+
+_IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def measure_imports(code=STARTUP_CODE):
+    """Import `code` in a new interpreter; {module: (self_us, cumulative_us)} and wall seconds."""
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'campustrack.settings')}
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    elapsed = time.perf_counter() - start
+    modules = {}
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if match:
+            modules[match.group(4)] = (int(match.group(1)), int(match.group(2)))
+    return modules, elapsed
+
+
+def total_import_us(modules):
+    """Sum of self times: the import cost of everything that was loaded."""
+    return sum(self_us for self_us, _ in modules.values())
+
+
+def warm_up():
+    start = time.perf_counter()
+    try:
+        from django.urls import get_resolver
+
+        resolver = get_resolver()
+        resolver.reverse_dict  # populates and compiles the whole URL tree
+        templates = _compile_templates()
+        if getattr(settings, 'BLOOM_FILTER_ENABLED', True):
+            from .bloom import build
+
+            build()  # one streaming query over the user table
+        from .departments import registry
+
+        registry()
+    except Exception:
+        # A warm-up failure must not stop the worker; the first request will report it.
+        logger.exception('Worker warm-up failed')
+        return
+    logger.info('Worker warm-up: %d templates compiled, user filter and departments loaded in %.0f ms',
+                templates, (time.perf_counter() - start) * 1000)
+
+
+def _compile_templates():
+    from django.template import engines
+
+    count = 0
+    for engine in engines.all():
+        for directory in engine.template_dirs:
+            directory = str(directory)
+            # Third-party app templates (admin, crispy) are left to load on demand.
+            if not directory.startswith(str(settings.BASE_DIR)) or 'site-packages' in directory:
+                continue
+            for root, _dirs, files in os.walk(directory):
+                for filename in files:
+                    if not filename.endswith(('.html', '.txt')):
+                        continue
+                    name = os.path.relpath(os.path.join(root, filename), directory).replace(os.sep, '/')
+                    try:
+                        engine.get_template(name)
+                        count += 1
+                    except Exception:
+                        logger.warning('Could not compile template %s during warm-up', name, exc_info=True)
+    return count
@@ -0,0 +1,57 @@
+"""Static file storage and serving that works in both WSGI and ASGI middleware chains."""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+
+class BundledStaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """Content-hashed names plus .gz/.br copies, written by collectstatic.
+
+    WhiteNoise serves the hashed names with a one-year ``immutable``
+    Cache-Control and picks the precompressed copy the browser accepts.
+    ``manage.py build_static`` runs the build and reports page weights.
+
+    Before a build (the test suite, a fresh checkout without DEBUG) a file
+    missing from the manifest is linked under its plain name instead of
+    failing the page.
+    """
+
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """WhiteNoise, usable without a sync hop under ASGI.
+
+    WhiteNoise 6's middleware is sync only, so as the second middleware it
+    would make every ASGI request, async views included, hold a thread.
+    Here the lookup stays on the event loop and only an actual static file is
+    served from a thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self._acall(request)
+        return super().__call__(request)
+
+    async def _acall(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
@@ -0,0 +1,102 @@
+"""Content-addressed, deduplicating file storage for certificates and post attachments.
+
+Uploads are hashed (SHA-256) before anything is written. A file whose content
+is already stored is not written again: the FileField simply gets the name of
+the existing blob (``blobs/ab/cd/<digest><ext>``) and the blob's reference
+count in `core.models.Blob` is incremented. `release()` drops a reference;
+`manage.py gc_blobs` recounts references and removes unreferenced blobs.
+
+Files stored before this existed keep their old names and are served as
+usual; only names under ``blobs/`` are reference counted.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+BLOB_PREFIX = 'blobs/'
+CHUNK_SIZE = 64 * 1024
+
+
+def blob_name_for(digest, ext):
+    return f'{BLOB_PREFIX}{digest[:2]}/{digest[2:4]}/{digest}{ext}'
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Derived files (image variants) are addressed by name, not content.
+        self.plain_storage = FileSystemStorage(location=self._location, base_url=self._base_url)
+
+    def get_available_name(self, name, max_length=None):
+        # The final name comes from the content hash in _save().
+        return name
+
+    def _save(self, name, content):
+        from .models import Blob
+
+        digest, size = self._hash(content)
+        ext = os.path.splitext(name)[1].lower()[:10]
+        referenced = {'ref_count': F('ref_count') + 1, 'last_referenced_at': timezone.now()}
+        with transaction.atomic():
+            if Blob.objects.filter(digest=digest).update(**referenced):
+                blob_name = Blob.objects.filter(digest=digest).values_list('name', flat=True).get()
+            else:
+                blob_name = blob_name_for(digest, ext)
+                try:
+                    with transaction.atomic():
+                        Blob.objects.create(digest=digest, name=blob_name, size=size, ref_count=1)
+                except IntegrityError:
+                    # A concurrent upload of the same content registered it first.
+                    Blob.objects.filter(digest=digest).update(**referenced)
+                    blob_name = Blob.objects.filter(digest=digest).values_list('name', flat=True).get()
+            # Also covers a file gc_blobs removed just before this reference was taken.
+            if not self.exists(blob_name):
+                self._write(blob_name, content)
+        return blob_name
+
+    def _hash(self, content):
+        sha = hashlib.sha256()
+        size = 0
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks(CHUNK_SIZE):
+            sha.update(chunk)
+            size += len(chunk)
+        return sha.hexdigest(), size
+
+    def _write(self, blob_name, content):
+        # Write to a temporary file and rename so a concurrent writer of the
+        # same blob never exposes a partial file.
+        full_path = self.path(blob_name)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                for chunk in content.chunks(CHUNK_SIZE):
+                    fh.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(tmp_path, self.file_permissions_mode)
+            os.replace(tmp_path, full_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def release(self, name):
+        """Drop one reference to `name`.
+
+        The file itself is removed by `gc_blobs` once the count is zero, which
+        avoids racing with a concurrent upload of the same content.
+        """
+        from .models import Blob
+
+        if name and name.startswith(BLOB_PREFIX):
+            Blob.objects.filter(name=name, ref_count__gt=0).update(ref_count=F('ref_count') - 1)
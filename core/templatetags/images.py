@@ -0,0 +1,46 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from core.images import SPECS, derivative_formats, derivative_urls, derivatives_exist
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(fieldfile, spec, alt='', css_class='', width=None, height=None, style='', sizes=None):
+    """Render a lazily-loaded <picture> for an uploaded image.
+
+    Usage: {% responsive_image profile.avatar 'avatar' alt='avatar' css_class='rounded-circle' width=48 height=48 %}
+
+    Serves the WebP variants with a JPEG fallback, sized by `sizes` (defaults
+    to the displayed `width`, or the smallest variant). Renders the original
+    file while the variants have not been built; building them is left to the
+    upload signal and ``build_image_derivatives``, never done mid-render.
+    """
+    if not fieldfile:
+        return ''
+    if sizes is None:
+        sizes = f'{width}px' if width else f"(max-width: {SPECS[spec]['widths'][-1]}px) 100vw, {SPECS[spec]['widths'][-1]}px"
+    attrs = format_html(
+        'alt="{}" class="{}"{}{}{} loading="lazy" decoding="async"',
+        alt, css_class,
+        format_html(' width="{}"', width) if width else '',
+        format_html(' height="{}"', height) if height else '',
+        format_html(' style="{}"', style) if style else '',
+    )
+    if not derivatives_exist(fieldfile, spec):
+        return format_html('<img src="{}" {}>', fieldfile.url, attrs)
+
+    def srcset(fmt):
+        return format_html_join(', ', '{} {}w', derivative_urls(fieldfile, spec, fmt))
+
+    jpg = derivative_urls(fieldfile, spec, 'jpg')
+    # Fallback src: the smallest variant at least as wide as the displayed size
+    fallback = next((url for url, w in jpg if width and w >= int(width)), jpg[-1][0])
+    sources = ''
+    if 'webp' in derivative_formats():
+        sources = format_html('<source type="image/webp" srcset="{}" sizes="{}">', srcset('webp'), sizes)
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" {}></picture>',
+        sources, fallback, srcset('jpg'), sizes, attrs,
+    )
@@ -1,3 +1,1067 @@
-from django.test import TestCase
+import json
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from io import BytesIO, StringIO
+from types import SimpleNamespace
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.sessions.models import Session
+from django.core import signing
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from core import bloom, metrics, sqlite
+from core.availability import availability_cache_key
+from core.backends import EmailOrUsernameModelBackend
+from core.ical import TOKEN_SALT, feed_token
+from core.images import delete_derivatives, derivative_name
+from core.insights import get_student_summaries
+from core.forms import EventForm, UserEditForm, UserRegisterForm
+from core.models import Blob, Certificate, Comment, Department, Event, Marks, News, Notification, Post, StudentIdSequence, User
+from core.nplusone import NPlusOneMiddleware, QueryBudgetMixin
+from core.routers import PIN_COOKIE, PrimaryReplicaRouter, ReplicaRoutingMiddleware
+from core.startup import LAZY_MODULES, measure_imports, total_import_us
+from core.sessions import SessionStore
+from core.staticfiles import BundledStaticFilesStorage
+from core.storage import ContentAddressedStorage
+
+ROWS = 8  # rows per list: enough for a per-row query to exceed the repeat threshold
+# Opt-in budget for worker start-up imports (settings, apps, URLconf), in ms; about
+# 300 ms on a laptop. Wall-clock timings are too noisy for shared CI runners.
+STARTUP_IMPORT_BUDGET_MS = os.environ.get('STARTUP_IMPORT_BUDGET_MS')
+
+
+class TempMediaRootMixin:
+    """Run the test case against its own MEDIA_ROOT, deleted afterwards."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp(prefix='campustrack-media-')
+        cls._media_override = override_settings(MEDIA_ROOT=cls.media_root)
+        cls._media_override.enable()
+        try:
+            super().setUpClass()
+        except Exception:
+            cls._media_override.disable()
+            shutil.rmtree(cls.media_root, ignore_errors=True)
+            raise
+
+    @classmethod
+    def tearDownClass(cls):
+        try:
+            super().tearDownClass()
+        finally:
+            cls._media_override.disable()
+            shutil.rmtree(cls.media_root, ignore_errors=True)
+
+
+class QueryBudgetTests(TempMediaRootMixin, QueryBudgetMixin, TestCase):
+    """Queries per page against seeded data; raise a budget only on purpose."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(name='CSE')
+        cls.teacher = User.objects.create_user(
+            username='teacher', email='teacher@example.com', password='x', role='teacher',
+            department=cls.department, teacher_approved=True,
+        )
+        cls.students = [
+            User.objects.create_user(
+                username=f'student{i}', email=f'student{i}@example.com', password='x', role='student',
+                department=cls.department, year=2,
+            )
+            for i in range(ROWS)
+        ]
+        cls.student = cls.students[0]
+        now = timezone.now()
+        for i, student in enumerate(cls.students):
+            post = Post.objects.create(author=student, content=f'Post {i}')
+            post.likes.set(cls.students[:3])
+            for j in range(2):
+                Comment.objects.create(post=post, author=cls.students[j], content='Nice')
+            for verified in (True, False):
+                Certificate.objects.create(
+                    student=student, title=f'Cert {i}', verified=verified, verified_by=cls.teacher if verified else None,
+                    file=SimpleUploadedFile(f'cert{i}-{verified}.pdf', f'%PDF {i} {verified}'.encode()),
+                )
+            for subject in ('Maths', 'Physics'):
+                Marks.objects.create(student=student, subject=subject, marks_obtained=60 + i, total_marks=100,
+                                     created_at=now - timedelta(days=40 * i))
+            Event.objects.create(title=f'Event {i}', date_from=now + timedelta(days=i), date_to=now + timedelta(days=i, hours=2),
+                                 scope='department' if i % 2 else 'college', department=cls.department, created_by=cls.teacher)
+            News.objects.create(title=f'News {i}', content='Body', author=cls.teacher)
+            Notification.objects.create(user=cls.student, content=f'Notification {i}')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_student_pages(self):
+        self.client.force_login(self.student)
+        self.assertQueryBudget(reverse('dashboard'), 8)
+        self.assertQueryBudget(reverse('core:college_activity'), 5)
+        self.assertQueryBudget(reverse('core:view_profile', args=[self.student.pk]), 10)
+        self.assertQueryBudget(reverse('core:notifications'), 3)
+
+    def test_teacher_pages(self):
+        self.client.force_login(self.teacher)
+        self.assertQueryBudget(reverse('dashboard'), 5)
+        self.assertQueryBudget(reverse('core:events_list'), 3)
+        self.assertQueryBudget(reverse('core:marks_list'), 3)
+        self.assertQueryBudget(reverse('core:student_insights', args=[self.student.pk]), 7)
+
+    def test_public_pages(self):
+        self.assertQueryBudget(reverse('core:news_list'), 2)
+
+
+@override_settings(NPLUSONE_ENABLED=True, NPLUSONE_THRESHOLD=3)
+class NPlusOneMiddlewareTests(TestCase):
+    """Repeated-query logging (core.nplusone) in sync and async middleware chains."""
+
+    def query_repeatedly(self):
+        for pk in range(4):
+            User.objects.filter(pk=pk).exists()
+        return HttpResponse()
+
+    def test_sync_chain(self):
+        middleware = NPlusOneMiddleware(lambda request: self.query_repeatedly())
+        with self.assertLogs('core.nplusone', 'WARNING'):
+            response = middleware(RequestFactory().get('/'))
+        self.assertEqual(response['X-DB-Queries'], '4')
+
+    async def test_async_chain(self):
+        async def get_response(request):
+            return await sync_to_async(self.query_repeatedly)()
+
+        middleware = NPlusOneMiddleware(get_response)
+        self.assertTrue(iscoroutinefunction(middleware))
+        with self.assertLogs('core.nplusone', 'WARNING'):
+            response = await middleware(RequestFactory().get('/'))
+        self.assertEqual(response['X-DB-Queries'], '4')
+
+
+class StudentSummaryTests(TestCase):
+    """Cached per-student insight summaries (core.insights)."""
+
+    def setUp(self):
+        cache.clear()
+        self.students = [User.objects.create_user(username=f's{i}', email=f's{i}@example.com', password='x',
+                                                  role='student', year=2) for i in range(3)]
+        for student, score in zip(self.students, (40, 60, 80)):
+            Marks.objects.create(student=student, subject='Maths', marks_obtained=score)
+
+    def test_batch_is_computed_once_and_dropped_on_new_marks(self):
+        ids = [s.pk for s in self.students]
+        with self.assertNumQueries(2):
+            summaries = get_student_summaries(ids)
+        self.assertEqual([summaries[pk]['overall_avg'] for pk in ids], [40.0, 60.0, 80.0])
+        with self.assertNumQueries(0):
+            get_student_summaries(ids)
+        Marks.objects.create(student=self.students[0], subject='Physics', marks_obtained=100)
+        with self.assertNumQueries(2):
+            summary = get_student_summaries(ids)[ids[0]]
+        self.assertEqual(summary['overall_avg'], 70.0)
+        self.assertEqual([row['subject'] for row in summary['subject_avgs']], ['Maths', 'Physics'])
+
+    def test_counts_are_not_multiplied_across_tables(self):
+        student = self.students[0]
+        Marks.objects.create(student=student, subject='Physics', marks_obtained=30, total_marks=50)
+        Marks.objects.create(student=student, subject='Art', marks_obtained=0, total_marks=0)
+        for verified in (True, False, False):
+            Certificate.objects.create(student=student, title='Cert', file='certificates/c.pdf', verified=verified)
+        posts = [Post.objects.create(author=student, content='x') for _ in range(2)]
+        for post in posts * 2:
+            Comment.objects.create(post=post, author=student, content='y')
+        summary = get_student_summaries([student.pk])[student.pk]
+        self.assertEqual((summary['marks_count'], summary['total_certs'], summary['verified_certs'],
+                          summary['post_count'], summary['comment_count']), (3, 3, 1, 2, 4))
+        self.assertEqual(summary['overall_avg'], 50.0)  # (40 + 60) / 2; the 0/0 row has no percentage
+
+
+class StudentIdSequenceTests(TestCase):
+    """Student ids from the per-year sequence table."""
+
+    def test_reservations_are_disjoint_and_continue_after_existing_ids(self):
+        User.objects.create_user(username='legacy', email='legacy@example.com', password='x',
+                                 role='teacher', student_id='CT2030ST0007')
+        first = StudentIdSequence.reserve(3, year=2030)
+        second = StudentIdSequence.reserve(2, year=2030)
+        self.assertEqual(first, ['CT2030ST0008', 'CT2030ST0009', 'CT2030ST0010'])
+        self.assertEqual(second, ['CT2030ST0011', 'CT2030ST0012'])
+        self.assertEqual(StudentIdSequence.reserve(0, year=2030), [])
+
+    def test_new_students_get_the_next_id(self):
+        first, second = (User.objects.create_user(username=f's{i}', email=f's{i}@example.com', password='x',
+                                                  role='student') for i in range(2))
+        prefix = StudentIdSequence.prefix_for(timezone.localdate().year)
+        self.assertEqual([first.student_id, second.student_id], [f'{prefix}0001', f'{prefix}0002'])
+
+
+@override_settings(RATELIMITS={
+    'availability': {'session': (100, 60), 'ip': (3, 60)},
+    'availability-db': {'site': (100, 1)},
+})
+class AvailabilityCheckTests(TestCase):
+    """check_username / check_email: rate limits and the result cache."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_rate_limited_per_ip(self):
+        url = reverse('core:check_username')
+        for i in range(3):
+            self.assertEqual(self.client.get(url, {'username': f'free{i}'}).status_code, 200)
+        response = self.client.get(url, {'username': 'free3'})
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+        # Another client address has its own bucket.
+        self.assertEqual(self.client.get(url, {'username': 'free3'}, REMOTE_ADDR='10.0.0.2').status_code, 200)
+
+    def test_cached_answer_is_invalidated_on_registration(self):
+        url = reverse('core:check_username')
+        self.assertTrue(self.client.get(url, {'username': 'newcomer'}).json()['available'])
+        with self.assertNumQueries(0):
+            self.assertTrue(self.client.get(url, {'username': 'NewComer'}).json()['available'])
+        User.objects.create_user(username='newcomer', email='newcomer@example.com', password='x')
+        self.assertIsNone(cache.get(availability_cache_key('username', 'newcomer')))
+        self.assertFalse(self.client.get(url, {'username': 'newcomer'}, REMOTE_ADDR='10.0.0.2').json()['available'])
+
+    def test_unknown_name_skips_the_database(self):
+        url = reverse('core:check_email')
+        self.client.get(url, {'email': 'first@example.com'})  # builds this process's user filter
+        with self.assertNumQueries(0):
+            self.assertTrue(self.client.get(url, {'email': 'nobody@example.com'}).json()['valid'])
+
+
+class NotificationEndpointTests(TestCase):
+    """The notification poll, mark-read and heartbeat AJAX endpoints."""
+
+    def setUp(self):
+        cache.clear()
+        self.student = User.objects.create_user(username='student', email='student@example.com', password='pw',
+                                                role='student', year=2)
+        self.first, self.second = (Notification.objects.create(user=self.student, content=c) for c in ('one', 'two'))
+
+    def test_anonymous_poll_is_sent_to_login(self):
+        self.assertEqual(self.client.get(reverse('core:ajax_unread_notifications')).status_code, 302)
+
+    def test_poll_and_mark_read(self):
+        self.client.login(username='student', password='pw')
+        poll, mark = reverse('core:ajax_unread_notifications'), reverse('core:ajax_mark_notification_read')
+        data = self.client.get(poll, {'last_id': self.first.pk}).json()
+        self.assertEqual(([n['content'] for n in data['notifications']], data['unread_count']), (['two'], 2))
+        self.assertEqual(self.client.post(mark, {'id': self.first.pk}).json()['marked'], self.first.pk)
+        self.assertEqual(self.client.get(poll).json()['unread_count'], 1)
+        self.assertEqual(self.client.post(mark, {'id': 'x'}).status_code, 400)
+        self.client.post(mark, {'all': '1'})
+        self.assertEqual(self.client.get(poll).json()['unread_count'], 0)
+
+    def test_heartbeat_is_empty_outside_debug(self):
+        self.assertEqual(self.client.get(reverse('core:ajax_heartbeat')).json(), {'reload_token': ''})
+
+
+class AuthUserCacheTests(TestCase):
+    """request.user from cached snapshots (core.authcache)."""
+
+    def setUp(self):
+        cache.clear()
+        self.student = User.objects.create_user(username='student', email='student@example.com', password='pw',
+                                                role='student', year=2)
+        self.client.login(username='student', password='pw')
+        self.poll_url = reverse('core:ajax_unread_notifications')
+
+    def test_poll_skips_identity_queries(self):
+        self.client.get(self.poll_url)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get(self.poll_url).status_code, 200)
+        identity = [q['sql'] for q in ctx.captured_queries if 'core_user' in q['sql'] or 'profile' in q['sql']]
+        self.assertEqual(identity, [])
+
+    def test_deactivation_and_password_change_end_sessions(self):
+        self.client.get(self.poll_url)
+        self.student.is_active = False
+        self.student.save()
+        self.assertEqual(self.client.get(self.poll_url).status_code, 302)
+
+        self.student.is_active = True
+        self.student.save()
+        self.client.login(username='student', password='pw')
+        self.client.get(self.poll_url)
+        self.student.set_password('new')
+        self.student.save()
+        self.assertEqual(self.client.get(self.poll_url).status_code, 302)
+
+
+class DepartmentRegistryTests(TestCase):
+    """Department choices from the cached registry (core.departments)."""
+
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cse = Department.objects.create(name='CSE')
+            Department.objects.create(name='ECE')
+
+    def test_forms_do_not_query_departments(self):
+        user = User.objects.create_user(username='student', email='student@example.com', password='x',
+                                        role='student', department=self.cse, year=2)
+        UserRegisterForm()
+        with self.assertNumQueries(0):
+            forms = [UserRegisterForm(), EventForm(), UserEditForm(instance=user)]
+        self.assertIn(('ECE', 'ECE'), forms[0].fields['department'].choices)
+
+    def test_changes_are_picked_up(self):
+        self.assertIn(('CSE', 'CSE'), UserRegisterForm().fields['department'].choices)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cse.name = 'Computer Science'
+            self.cse.save()
+        choices = UserRegisterForm().fields['department'].choices
+        self.assertIn(('Computer Science', 'Computer Science'), choices)
+        self.assertNotIn(('CSE', 'CSE'), choices)
+
+    def test_typed_department_uses_the_stored_name(self):
+        form = UserRegisterForm(data={
+            'username': 'newcomer', 'email': 'newcomer@example.com', 'role': 'student', 'year': 1,
+            'department': '__other__', 'other_department': ' ece ', 'password1': 'S3cure-pass!', 'password2': 'S3cure-pass!',
+        })
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.cleaned_data['department'].name, 'ECE')
+
+    def test_new_typed_department_is_unlisted(self):
+        form = UserRegisterForm(data={
+            'username': 'newcomer', 'email': 'newcomer@example.com', 'role': 'student', 'year': 1,
+            'department': '__other__', 'other_department': 'Robotics', 'password1': 'S3cure-pass!', 'password2': 'S3cure-pass!',
+        })
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertFalse(Department.objects.filter(name='Robotics').exists())
+        with self.captureOnCommitCallbacks(execute=True):
+            user = form.save()
+        self.assertEqual(user.department.name, 'Robotics')
+        self.assertFalse(user.department.listed)
+        self.assertNotIn(('Robotics', 'Robotics'), UserRegisterForm().fields['department'].choices)
+        self.assertEqual(UserEditForm(instance=user).initial['other_department'], 'Robotics')
+
+
+class CalendarFeedTests(TestCase):
+    """.ics event feeds (core.ical): contents, tokens and conditional GET."""
+
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cse = Department.objects.create(name='CSE')
+            ece = Department.objects.create(name='ECE')
+        self.student = User.objects.create_user(username='student', email='student@example.com', password='x',
+                                                role='student', department=self.cse, year=2)
+        start = timezone.now() + timedelta(days=3)
+        for title, scope, department in (('Fest', 'college', None), ('CSE talk', 'department', self.cse),
+                                         ('ECE lab', 'department', ece)):
+            Event.objects.create(title=title, scope=scope, department=department, date_from=start,
+                                 date_to=start + timedelta(hours=2), registration_link='https://example.com/register')
+        self.url = reverse('core:calendar_personal', args=[feed_token(self.student)])
+
+    def test_personal_feed(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        body = response.content.decode()
+        self.assertIn('SUMMARY:Fest', body)
+        self.assertIn('SUMMARY:CSE talk', body)
+        self.assertNotIn('ECE lab', body)
+        self.assertIn('URL:https://example.com/register', body)
+        self.assertTrue(all(len(line.encode()) <= 75 for line in body.split('\r\n')))
+
+    def test_unchanged_feed_is_a_304_without_queries(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        Event.objects.filter(title='Fest').get().delete()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Fest', response.content.decode())
+
+    def test_token_is_required(self):
+        self.assertEqual(self.client.get(reverse('core:calendar_college', args=['1:forged'])).status_code, 404)
+        department_url = reverse('core:calendar_department', args=[feed_token(self.student), self.cse.pk])
+        self.assertIn('CSE talk', self.client.get(department_url).content.decode())
+        self.student.is_active = False
+        self.student.save()
+        self.assertEqual(self.client.get(department_url).status_code, 404)
+
+    def test_reset_revokes_old_feed_urls(self):
+        legacy_url = reverse('core:calendar_personal', args=[signing.Signer(salt=TOKEN_SALT).sign(str(self.student.pk))])
+        self.assertEqual(self.client.get(legacy_url).status_code, 200)
+        self.client.force_login(self.student)
+        self.assertEqual(self.client.get(reverse('core:reset_calendar_feed')).status_code, 302)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.client.post(reverse('core:reset_calendar_feed'))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.assertEqual(self.client.get(legacy_url).status_code, 404)
+        self.student.refresh_from_db()
+        new_url = reverse('core:calendar_personal', args=[feed_token(self.student)])
+        self.assertNotEqual(new_url, self.url)
+        self.assertIn('SUMMARY:Fest', self.client.get(new_url).content.decode())
+
+    @override_settings(CONDITIONAL_VERSION_MAX_AGE=30, ICS_CACHE_TIMEOUT=30)
+    def test_feed_expires_under_a_per_process_cache(self):
+        self.assertIn('SUMMARY:Fest', self.client.get(self.url).content.decode())
+        # As if renamed by another worker: no signal reaches this process's counters
+        Event.objects.filter(title='Fest').update(title='Spring fest')
+        self.assertNotIn('Spring fest', self.client.get(self.url).content.decode())
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=time.time() + 31):
+            self.assertIn('SUMMARY:Spring fest', self.client.get(self.url).content.decode())
+
+
+class NewsCacheTests(TempMediaRootMixin, TestCase):
+    """Anonymous news pages served from the page cache (core.news_cache)."""
+
+    def setUp(self):
+        cache.clear()
+        author = User.objects.create_user(username='editor', email='editor@example.com', password='x')
+        News.objects.bulk_create([News(title=f'News {i}', content='x', author=author) for i in range(13)])
+
+    def test_out_of_range_pages_share_the_last_page(self):
+        url = reverse('core:news_list')
+        last = self.client.get(url, {'page': 2}).content
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, {'page': 999}).content, last)
+            self.assertEqual(self.client.get(url, {'page': 1000}).content, last)
+        self.assertEqual(len([key for key in cache._cache if ':news:list:' in key and ':page:' in key]), 1)
+
+    def test_edits_invalidate_the_list_and_the_article(self):
+        news = News.objects.create(title='Latest', content='x', author=User.objects.get())
+        list_url, detail_url = reverse('core:news_list'), reverse('core:news_detail', args=[news.pk])
+        self.client.get(list_url)
+        self.client.get(detail_url)
+        with self.assertNumQueries(0):
+            self.client.get(list_url)
+            self.client.get(detail_url)
+        news.title = 'Corrected headline'
+        news.save()
+        self.assertContains(self.client.get(list_url), 'Corrected headline')
+        self.assertContains(self.client.get(detail_url), 'Corrected headline')
+
+
+class ConditionalGetTests(TestCase):
+    """ETag validators from model versions (core.conditional)."""
+
+    def setUp(self):
+        cache.clear()
+        self.student = User.objects.create_user(username='student', email='student@example.com', password='pw',
+                                                role='student', year=2)
+        self.client.login(username='student', password='pw')
+
+    def test_notification_poll_is_answered_with_304_until_the_users_own_change(self):
+        other = User.objects.create_user(username='other', email='other@example.com', password='pw')
+        url = reverse('core:ajax_unread_notifications')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        Notification.objects.create(user=other, content='not yours')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        Notification.objects.create(user=self.student, content='yours')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.json()['unread_count'], 1)
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+
+    def test_profile_etag_ignores_logins_and_other_users(self):
+        other = User.objects.create_user(username='other', email='other@example.com', password='pw')
+        url = reverse('core:view_profile', args=[self.student.pk])
+        etag = self.client.get(url)['ETag']
+        self.client_class().login(username='other', password='pw')  # saves other.last_login
+        other.first_name = 'Renamed'
+        other.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.student.first_name = 'Changed'
+        self.student.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    @override_settings(CONDITIONAL_VERSION_MAX_AGE=30)
+    def test_counters_expire_under_a_per_process_cache(self):
+        # Another worker's bump never reaches this one; its counter must not outlive the max age.
+        url = reverse('core:ajax_unread_notifications')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=time.time() + 31):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_profile_etag_changes_with_the_day(self):
+        url = reverse('core:view_profile', args=[self.student.pk])
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # The certificate chart's months are counted back from today.
+        with mock.patch('core.conditional.time.time', return_value=time.time() + 60 * 60 * 24):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class PostFragmentTests(TempMediaRootMixin, TestCase):
+    """Posts rendered as partials for the feed's AJAX actions."""
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', email='author@example.com', password='pw',
+                                               role='student', year=2)
+        User.objects.create_user(username='peer', email='peer@example.com', password='pw', role='student', year=2)
+        self.post = Post.objects.create(author=self.author, content='First draft')
+        self.url = reverse('core:edit_post', args=[self.post.pk])
+
+    def test_ajax_edit_returns_the_post_partial(self):
+        self.client.login(username='author', password='pw')
+        response = self.client.post(self.url, {'content': 'Final text'}, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        html = response.json()['html']
+        self.assertIn('Final text', html)
+        self.assertIn(f'data-url="{self.url}"', html)
+        self.assertNotIn('<script', html)
+
+    def test_ajax_edit_by_someone_else_is_refused(self):
+        self.client.login(username='peer', password='pw')
+        response = self.client.post(self.url, {'content': 'Hijacked'}, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.status_code, 403)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.content, 'First draft')
+
+    def test_dashboard_loads_the_post_script_once(self):
+        self.client.login(username='author', password='pw')
+        self.assertEqual(self.client.get(reverse('dashboard')).content.decode().count('js/post_item.js'), 1)
+
+
+@override_settings(SESSION_CACHE_MAX_AGE=30)
+class SessionStoreTests(TestCase):
+    """Cached database sessions (core.sessions) and cleanup_sessions."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cached_copy_is_trusted_for_the_cap_only(self):
+        store = SessionStore()
+        store['user'] = 'someone'
+        store.save()
+        # A logout in another worker deletes the row but not this worker's cached copy.
+        Session.objects.filter(pk=store.session_key).delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(SessionStore(store.session_key).load(), {'user': 'someone'})
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=time.time() + 31):
+            self.assertEqual(SessionStore(store.session_key).load(), {})
+
+    def test_cleanup_deletes_expired_sessions_in_batches(self):
+        now = timezone.now()
+        expired = [Session(session_key=f'expired{i}', session_data='', expire_date=now - timedelta(days=1))
+                   for i in range(3)]
+        Session.objects.bulk_create([*expired, Session(session_key='live', session_data='',
+                                                       expire_date=now + timedelta(days=1))])
+        out = StringIO()
+        call_command('cleanup_sessions', '--batch-size', '2', '--pause', '0', stdout=out)
+        self.assertIn('Deleted 3 expired sessions in 2 batches', out.getvalue())
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['live'])
+
+
+class BlobStorageTests(TempMediaRootMixin, TestCase):
+    """Content-addressed uploads (core.storage) and gc_blobs."""
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', email='author@example.com', password='x', role='student')
+
+    def post(self, content=b'same bytes', filename='a.pdf'):
+        return Post.objects.create(author=self.author, content='x', attachment=SimpleUploadedFile(filename, content))
+
+    def test_same_content_is_stored_once(self):
+        first, second = self.post(), self.post()
+        self.assertEqual(first.attachment.name, second.attachment.name)
+        self.assertEqual(Blob.objects.get().ref_count, 2)
+        second.delete()
+        self.assertEqual(Blob.objects.get().ref_count, 1)
+
+    def test_gc_keeps_blobs_referenced_during_the_grace_period(self):
+        storage = ContentAddressedStorage()
+        old = timezone.now() - timedelta(days=1)
+        # An old blob nobody references any more ...
+        name = storage.save('a.pdf', SimpleUploadedFile('a.pdf', b'old bytes'))
+        Blob.objects.update(ref_count=0, created_at=old, last_referenced_at=old)
+        # ... gets a new reference from an upload whose Post is not saved yet.
+        self.assertEqual(storage.save('b.pdf', SimpleUploadedFile('b.pdf', b'old bytes')), name)
+        call_command('gc_blobs', stdout=StringIO())
+        self.assertTrue(storage.exists(name))
+        Blob.objects.update(last_referenced_at=old)
+        call_command('gc_blobs', stdout=StringIO())
+        self.assertFalse(Blob.objects.exists())
+        self.assertFalse(storage.exists(name))
+
+    def test_gc_removes_image_variants_with_their_blob(self):
+        buf = BytesIO()
+        Image.new('RGB', (40, 30), 'red').save(buf, 'PNG')
+        post = self.post(buf.getvalue(), 'a.png')
+        name = post.attachment.name
+        plain = ContentAddressedStorage().plain_storage
+        variant = derivative_name(name, 320, 'jpg')
+        self.assertTrue(plain.exists(variant))
+        # A variant leaked by an earlier gc run, without its original
+        leaked = derivative_name('blobs/00/00/gone.png', 320, 'jpg')
+        plain.save(leaked, SimpleUploadedFile('v.jpg', b'x'))
+        os.utime(plain.path(leaked), (0, 0))
+        post.delete()
+        old = timezone.now() - timedelta(days=1)
+        Blob.objects.update(last_referenced_at=old)
+        call_command('gc_blobs', stdout=StringIO())
+        self.assertFalse(Blob.objects.exists())
+        self.assertFalse(plain.exists(variant))
+        self.assertFalse(plain.exists(derivative_name(name, 48, 'webp')))
+        self.assertFalse(plain.exists(leaked))
+
+
+class LoginBackendTests(TestCase):
+    """Case-insensitive email/username logins (core.backends)."""
+
+    def authenticate(self, login, password):
+        return EmailOrUsernameModelBackend().authenticate(None, username=login, password=password)
+
+    def test_case_variants_match_through_the_lower_indexes(self):
+        user = User.objects.create_user(username='MixedCase', email='Mixed.Case@Example.com', password='pw')
+        for login in ('mixedcase', 'MIXEDCASE', ' mixed.case@example.com ', 'MIXED.CASE@EXAMPLE.COM'):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.authenticate(login, 'pw'), user)
+            self.assertIn('LOWER(', queries[0]['sql'])
+        self.assertIsNone(self.authenticate('mixedcase', 'wrong'))
+        self.assertIsNone(self.authenticate('nobody', 'pw'))
+
+    def test_accounts_differing_only_by_case(self):
+        first = User.objects.create_user(username='twin', email='twin@example.com', password='first-pw')
+        second = User.objects.create_user(username='TWIN', email='Twin@Example.com', password='second-pw')
+        self.assertEqual(self.authenticate('twin@example.com', 'first-pw'), first)
+        self.assertEqual(self.authenticate('TWIN@EXAMPLE.COM', 'second-pw'), second)
+        self.assertEqual(self.authenticate('Twin', 'second-pw'), second)
+        self.assertIsNone(self.authenticate('twin', 'wrong'))
+        # A username equal to another account's email: the email account is tried first.
+        owner = User.objects.create_user(username='owner', email='shared@example.com', password='pw')
+        User.objects.create_user(username='shared@example.com', email='other@example.com', password='pw')
+        self.assertEqual(self.authenticate('shared@example.com', 'pw'), owner)
+
+
+class BloomFilterTests(TestCase):
+    """The per-process username/email filter (core.bloom) and the login prefilter."""
+
+    def setUp(self):
+        cache.clear()
+        bloom._filter = None
+
+    def tearDown(self):
+        bloom._filter = None
+
+    def test_no_false_negatives_after_add_user(self):
+        bloom.build()
+        users = [User.objects.create_user(username=f'Member{n}', email=f'Member{n}@Example.com')
+                 for n in range(50)]
+        for user in users:
+            self.assertTrue(bloom.might_exist('username', user.username.upper()))
+            self.assertTrue(bloom.might_exist('email', user.email.lower()))
+
+    def test_rebuilds_after_a_generation_bump_or_its_max_age(self):
+        first = bloom.build()
+        # Added without signals, as if by another worker whose bump this one cannot see
+        User.objects.bulk_create([User(username='elsewhere', email='elsewhere@example.com')])
+        self.assertFalse(bloom.might_exist('username', 'elsewhere'))
+        bloom.request_rebuild()
+        self.assertTrue(bloom.might_exist('username', 'elsewhere'))
+        self.assertIsNot(bloom._filter, first)
+
+        second = bloom._filter
+        User.objects.bulk_create([User(username='later', email='later@example.com')])
+        self.assertFalse(bloom.might_exist('username', 'later'))
+        with mock.patch('core.bloom.time.monotonic', return_value=time.monotonic() + settings.BLOOM_MAX_AGE + 1):
+            self.assertTrue(bloom.might_exist('username', 'later'))
+        self.assertIsNot(bloom._filter, second)
+
+    def test_login_prefilter_is_off_unless_the_cache_is_shared(self):
+        script = 'from campustrack import settings; print(settings.BLOOM_LOGIN_PREFILTER)'
+        for url, expected in (('locmem://', 'False'), ('dummy://', 'False'), ('redis://cache:6379/0', 'True')):
+            output = subprocess.run([sys.executable, '-c', script], cwd=settings.BASE_DIR, capture_output=True,
+                                    text=True, check=True, env={**os.environ, 'CACHE_URL': url}).stdout
+            self.assertEqual(output.strip(), expected, url)
+
+    def test_prefilter_skips_the_query_but_still_hashes(self):
+        User.objects.create_user(username='known', email='known@example.com', password='pw')
+        bloom.build()
+        backend = EmailOrUsernameModelBackend()
+        with override_settings(BLOOM_LOGIN_PREFILTER=True), \
+                mock.patch.object(backend, '_hash_anyway', wraps=backend._hash_anyway) as hashed:
+            with self.assertNumQueries(0):
+                self.assertIsNone(backend.authenticate(None, username='stranger', password='pw'))
+            hashed.assert_called_once_with('pw')
+            self.assertIsNotNone(backend.authenticate(None, username='KNOWN', password='pw'))
+        # Without the prefilter a user this worker's filter has not seen yet still logs in.
+        User.objects.bulk_create([User(username='fresh', email='fresh@example.com', password=make_password('pw'))])
+        with override_settings(BLOOM_LOGIN_PREFILTER=False):
+            self.assertIsNotNone(backend.authenticate(None, username='fresh', password='pw'))
+
+
+@override_settings(BLOOM_LOGIN_PREFILTER=True)
+class ProvisionUsersTests(TestCase):
+    """Bulk account creation with provision_users."""
+
+    def setUp(self):
+        cache.clear()
+        User.objects.create_user(username='first', email='first@example.com', password='x')
+
+    def provision(self, *rows, options=()):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as fh:
+            fh.write('username,email,password,role\n')
+            fh.writelines(f'{row}\n' for row in rows)
+        out = StringIO()
+        call_command('provision_users', fh.name, '--workers', '1', *options, stdout=out)
+        return out.getvalue()
+
+    def test_creates_users_with_profiles_and_skips_taken_names(self):
+        rows = ('s1,s1@example.com,pw,student', 't1,t1@example.com,pw,teacher',
+                'FIRST,other@example.com,pw,student', 's1b,S1@example.com,pw,student')
+        self.assertIn('Would create 2 users, skipped 2 rows', self.provision(*rows, options=['--dry-run']))
+        self.assertEqual(User.objects.count(), 1)
+        self.assertIn('Created 2 users, skipped 2 rows', self.provision(*rows))
+        student, teacher = User.objects.get(username='s1'), User.objects.get(username='t1')
+        self.assertTrue(student.student_id and student.student_profile.pk)
+        self.assertTrue(teacher.teacher_profile.pk)
+        self.assertTrue(student.check_password('pw'))
+
+    def test_rejects_years_that_are_not_whole_numbers(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as fh:
+            fh.write('username,email,year\n')
+            for n, year in enumerate(('2', '3.0', '2.5', 'inf', 'nan', '-1', 'two')):
+                fh.write(f'y{n},y{n}@example.com,{year}\n')
+        out = StringIO()
+        call_command('provision_users', fh.name, '--workers', '1', stdout=out)
+        self.assertIn('Created 2 users, skipped 5 rows', out.getvalue())
+        self.assertEqual(dict(User.objects.filter(username__in=['y0', 'y1']).values_list('username', 'year')),
+                         {'y0': 2, 'y1': 3})
+        self.assertIn("invalid year 'inf'", out.getvalue())
+
+    def test_provisioned_user_can_log_in_at_once(self):
+        url = reverse('core:check_username')
+        # Builds this process's user filter and caches the name as available.
+        self.assertTrue(self.client.get(url, {'username': 'fresher'}).json()['available'])
+        self.provision('fresher,fresher@example.com,pw-fresher,student')
+        self.assertTrue(self.client.login(username='fresher@example.com', password='pw-fresher'))
+        self.assertFalse(self.client.get(url, {'username': 'fresher'}).json()['available'])
+
+
+@mock.patch('core.routers.replica_enabled', return_value=True)
+class ReplicaRoutingTests(SimpleTestCase):
+    """Read routing and the read-your-writes pin (core.routers)."""
+
+    def request(self, view_name, write=False, cookies=None):
+        router, routes = PrimaryReplicaRouter(), []
+
+        def view(request):
+            middleware.process_view(request, None, (), {})
+            if write:
+                router.db_for_write(News)
+            routes.append(router.db_for_read(News))
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(view)
+        request = RequestFactory().get('/')
+        request.COOKIES.update(cookies or {})
+        request.resolver_match = SimpleNamespace(view_name=view_name)
+        return middleware(request), routes[0]
+
+    def test_listed_views_read_from_the_replica(self, _enabled):
+        self.assertEqual(self.request('core:news_list')[1], 'replica')
+        self.assertEqual(self.request('core:notifications')[1], 'default')
+
+    def test_a_write_pins_the_client_to_the_primary(self, _enabled):
+        response, route = self.request('core:news_list', write=True)
+        self.assertEqual(route, 'default')
+        pin = response.cookies[PIN_COOKIE]
+        self.assertEqual(self.request('core:news_list', cookies={PIN_COOKIE: pin.value})[1], 'default')
+        expired = str(int(time.time()) - 1)
+        self.assertEqual(self.request('core:news_list', cookies={PIN_COOKIE: expired})[1], 'replica')
+
+
+class CopyFromSQLiteTests(TransactionTestCase):
+    """manage.py copy_from_sqlite."""
+
+    def test_copies_rows_with_their_primary_keys(self):
+        author = User.objects.create_user(username='author', email='author@example.com', password='x', role='student')
+        news = News.objects.create(title='Kept', content='x', author=author)
+        directory = tempfile.mkdtemp(prefix='campustrack-copy-')
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        source = os.path.join(directory, 'source.sqlite3')
+        connection.ensure_connection()
+        target = sqlite3.connect(source)
+        connection.connection.backup(target)
+        target.close()
+        News.objects.all().delete()
+        User.objects.all().delete()
+
+        call_command('copy_from_sqlite', source, '--truncate', stdout=StringIO())
+        self.assertEqual(News.objects.get().pk, news.pk)
+        self.assertEqual(News.objects.get().author_id, author.pk)
+        # Sequences continue after the copied keys.
+        self.assertGreater(User.objects.create_user(username='next', email='next@example.com', password='x').pk, author.pk)
+
+
+class DepartmentBackfillMigrationTests(TransactionTestCase):
+    """0015_backfill_department_refs: department names to Department rows and back."""
+
+    before, after = ('core', '0014_department_refs'), ('core', '0015_backfill_department_refs')
+
+    def migrate(self, target):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate([target])
+        return executor.loader.project_state([target]).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes('core')[0])
+
+    def test_backfill_and_reverse(self):
+        apps = self.migrate(self.before)
+        Department, User, Event = (apps.get_model('core', name) for name in ('Department', 'User', 'Event'))
+        cse = Department.objects.create(name='CSE')
+        for n, name in enumerate(('CSE', ' cse ', 'Cse', 'Robotics', ' robotics', '', '  ')):
+            User.objects.create(username=f'u{n}', email=f'u{n}@example.com', department=name)
+        now = timezone.now()
+        Event.objects.create(title='Talk', date_from=now, date_to=now, scope='department', department='cse ')
+
+        apps = self.migrate(self.after)
+        Department, User, Event = (apps.get_model('core', name) for name in ('Department', 'User', 'Event'))
+        robotics = Department.objects.get(name='Robotics')
+        self.assertFalse(robotics.listed)
+        self.assertEqual(Department.objects.count(), 2)
+        refs = dict(User.objects.values_list('username', 'department_ref_id'))
+        self.assertEqual(refs, {'u0': cse.pk, 'u1': cse.pk, 'u2': cse.pk, 'u3': robotics.pk, 'u4': robotics.pk,
+                                'u5': None, 'u6': None})
+        self.assertEqual(Event.objects.get().department_ref_id, cse.pk)
+
+        apps = self.migrate(self.before)
+        User, Event = apps.get_model('core', 'User'), apps.get_model('core', 'Event')
+        names = dict(User.objects.values_list('username', 'department'))
+        self.assertEqual(names, {'u0': 'CSE', 'u1': 'CSE', 'u2': 'CSE', 'u3': 'Robotics', 'u4': 'Robotics',
+                                 'u5': '', 'u6': '  '})
+        self.assertEqual(Event.objects.get().department, 'CSE')
+
+
+class SQLiteTuningTests(TestCase):
+    """Connection PRAGMAs and lock retries (core.sqlite)."""
+
+    def test_connections_get_the_tuned_pragmas(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+
+    def test_lock_errors_are_retried_outside_transactions_only(self):
+        attempts = []
+
+        def execute(sql, params, many, context):
+            attempts.append(sql)
+            if len(attempts) == 1:
+                raise OperationalError('database is locked')
+            return 'done'
+
+        sqlite.reset_lock_stats()
+        outside = {'connection': SimpleNamespace(in_atomic_block=False)}
+        self.assertEqual(sqlite.retry_on_lock(execute, 'SELECT 1', None, False, outside), 'done')
+        attempts.clear()
+        with self.assertRaises(OperationalError):
+            sqlite.retry_on_lock(execute, 'SELECT 1', None, False, {'connection': SimpleNamespace(in_atomic_block=True)})
+        self.assertEqual(len(attempts), 1)
+        stats = sqlite.get_lock_stats()
+        self.assertEqual((stats['lock_errors'], stats['retry_successes'], stats['gave_up']), (2, 1, 1))
+
+    def test_executemany_retry_resends_every_row(self):
+        batches = []
+
+        def execute(sql, params, many, context):
+            batches.append(list(params))
+            if len(batches) == 1:
+                raise OperationalError('database is locked')
+
+        outside = {'connection': SimpleNamespace(in_atomic_block=False)}
+        sqlite.retry_on_lock(execute, 'INSERT INTO t VALUES (%s)', ((n,) for n in range(3)), True, outside)
+        self.assertEqual(batches, [[(0,), (1,), (2,)]] * 2)
+
+    @override_settings(SQLITE_BUSY_WAIT_THRESHOLD=0.01)
+    def test_slow_writes_are_counted_as_busy_waits(self):
+        def execute(sql, params, many, context):
+            time.sleep(0.02)
+
+        sqlite.reset_lock_stats()
+        outside = {'connection': SimpleNamespace(in_atomic_block=False)}
+        sqlite.retry_on_lock(execute, 'SELECT 1', None, False, outside)
+        sqlite.retry_on_lock(execute, 'UPDATE t SET x = 1', None, False, outside)
+        stats = sqlite.get_lock_stats()
+        self.assertEqual(stats['busy_waits'], 1)
+        self.assertGreaterEqual(stats['busy_wait_seconds'], 0.02)
+
+
+@override_settings(METRICS_DIR='', METRICS_TOKEN='scrape-secret', METRICS_ALLOWED_IPS=['10.0.0.9'])
+class MetricsEndpointTests(TestCase):
+    """Per-view request metrics served at /metrics (core.metrics)."""
+
+    def test_requests_are_counted_per_view(self):
+        line = 'campustrack_http_requests_total{view="core:news_list",method="GET",status="200"}'
+
+        def count():
+            body = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer scrape-secret').content.decode()
+            found = [row for row in body.splitlines() if row.startswith(line)]
+            return int(found[0].split()[-1]) if found else 0
+
+        before = count()
+        self.client.get(reverse('core:news_list'))
+        self.client.get(reverse('core:news_list'))
+        self.assertEqual(count(), before + 2)
+
+    def test_only_staff_the_token_and_listed_addresses_are_answered(self):
+        url = reverse('metrics')
+        # Loopback is what every request looks like behind a same-host proxy.
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer wrong').status_code, 404)
+        self.assertEqual(self.client.get(url, REMOTE_ADDR='10.0.0.9').status_code, 200)
+        User.objects.create_user(username='admin', email='admin@example.com', password='pw', is_staff=True)
+        self.client.login(username='admin', password='pw')
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class MetricsShardTests(SimpleTestCase):
+    """Per-process metrics files merged by /metrics (core.metrics)."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='campustrack-metrics-')
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        override = override_settings(METRICS_DIR=self.directory)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def write_shard(self, name, count):
+        with open(os.path.join(self.directory, name), 'w') as fh:
+            json.dump({'requests': {'test:view\tGET\t200': count}}, fh)
+
+    def test_exited_workers_are_folded_into_one_file(self):
+        child = subprocess.Popen(['true'])
+        child.wait()
+        self.write_shard(f'{child.pid}-deadbeef.json', 3)
+        self.write_shard(f'{os.getppid()}-cafebabe.json', 4)
+        for _ in range(2):
+            self.assertEqual(metrics.collect()['requests']['test:view\tGET\t200'], 7)
+        self.assertEqual(sorted(os.listdir(self.directory)),
+                         sorted([metrics._shard_name, f'{os.getppid()}-cafebabe.json', 'retired.json']))
+
+
+class ResponsiveImageTests(TempMediaRootMixin, TestCase):
+    """Resized variants of uploaded images (core.images) and {% responsive_image %}."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='editor', email='editor@example.com', password='x')
+
+    def png(self, size):
+        buf = BytesIO()
+        Image.new('RGB', size, (200, 30, 30)).save(buf, 'PNG')
+        return SimpleUploadedFile('photo.png', buf.getvalue(), content_type='image/png')
+
+    def test_upload_gets_resized_variants(self):
+        news = News.objects.create(title='Photo', content='x', author=self.author, image=self.png((2000, 1000)))
+        storage = news.image.storage
+        with storage.open(derivative_name(news.image.name, 480, 'jpg')) as fh:
+            self.assertEqual(Image.open(fh).size, (480, 240))
+        html = Template("{% load images %}{% responsive_image news.image 'news' alt='Photo' %}").render(
+            Context({'news': news}))
+        self.assertIn('<picture>', html)
+        self.assertIn('loading="lazy"', html)
+        self.assertIn(f'{storage.url(derivative_name(news.image.name, 960, "jpg"))} 960w', html)
+
+    def test_missing_variants_render_the_original_until_built(self):
+        post = Post.objects.create(author=self.author, content='x', attachment=self.png((800, 600)))
+        plain = post.attachment.storage.plain_storage
+        delete_derivatives(plain, post.attachment.name)
+        template = Template("{% load images %}{% responsive_image post.attachment 'attachment' %}")
+        html = template.render(Context({'post': post}))
+        self.assertTrue(html.startswith(f'<img src="{post.attachment.url}"'))
+        self.assertFalse(plain.exists(derivative_name(post.attachment.name, 320, 'jpg')))
+        call_command('build_image_derivatives', stdout=StringIO())
+        self.assertTrue(plain.exists(derivative_name(post.attachment.name, 320, 'jpg')))
+        self.assertIn('<picture>', template.render(Context({'post': post})))
+
+    def test_missing_original_falls_back_to_its_url(self):
+        news = News(title='Gone', content='x', author=self.author, image='news_images/missing.png')
+        html = Template("{% load images %}{% responsive_image news.image 'news' %}").render(Context({'news': news}))
+        self.assertTrue(html.startswith(f'<img src="{news.image.url}"'))
+
+
+@override_settings(MEDIA_SERVE_MODE='django')
+class MediaServingTests(TempMediaRootMixin, TestCase):
+    """Permission-checked media downloads (core.media)."""
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', email='owner@example.com', password='pw', role='student')
+        User.objects.create_user(username='peer', email='peer@example.com', password='pw', role='student')
+        cert = Certificate.objects.create(student=self.owner, title='Cert',
+                                          file=SimpleUploadedFile('cert.pdf', b'0123456789'))
+        self.url = settings.MEDIA_URL + cert.file.name
+
+    def test_unverified_certificate_is_hidden_from_others(self):
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.client.login(username='peer', password='pw')
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.client.login(username='owner', password='pw')
+        self.assertEqual(b''.join(self.client.get(self.url).streaming_content), b'0123456789')
+
+    def test_byte_ranges(self):
+        self.client.login(username='owner', password='pw')
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(b''.join(response.streaming_content), b'2345')
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=20-').status_code, 416)
+        # A stale If-Range gets the whole file.
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-5', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+
+class StaticBundleTests(SimpleTestCase):
+    """Hashed, precompressed static files (core.staticfiles)."""
+
+    def test_collectstatic_writes_hashed_compressed_copies(self):
+        root = tempfile.mkdtemp(prefix='campustrack-static-')
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        self.assertEqual(BundledStaticFilesStorage(location=root).url('css/style.css'), '/static/css/style.css')
+        with override_settings(STATIC_ROOT=root):
+            call_command('collectstatic', interactive=False, verbosity=0, ignore_patterns=['admin'])
+        url = BundledStaticFilesStorage(location=root).url('css/style.css')
+        self.assertRegex(url, r'^/static/css/style\.[0-9a-f]{12}\.css$')
+        hashed = os.path.join(root, url[len('/static/'):])
+        for suffix in ('', '.gz', '.br'):
+            self.assertTrue(os.path.exists(hashed + suffix), suffix)
+
+
+class StartupImportTests(SimpleTestCase):
+    """What a worker imports before serving its first request."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.modules = measure_imports()[0]
+
+    def test_heavy_modules_are_imported_lazily(self):
+        eager = [name for name in self.modules if name.split('.')[0] in LAZY_MODULES]
+        self.assertEqual(eager, [], 'import these inside the functions that need them')
+
+    @skipUnless(STARTUP_IMPORT_BUDGET_MS, 'set STARTUP_IMPORT_BUDGET_MS to check the import time')
+    def test_startup_import_budget(self):
+        # Best of three fresh interpreters, to keep disk cache noise out.
+        modules = min((measure_imports()[0] for _ in range(3)), key=total_import_us)
+        self.assertLessEqual(total_import_us(modules) / 1000, float(STARTUP_IMPORT_BUDGET_MS),
+                             'run "manage.py benchmark_startup" to see what got slower')
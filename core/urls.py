@@ -42,7 +42,13 @@ urlpatterns = [
     path('ajax/comment/<int:pk>/edit/', views.edit_comment, name='ajax_edit_comment'),
     path('ajax/comment/<int:pk>/delete/', views.delete_comment, name='ajax_delete_comment'),
     path('student/<int:pk>/insights/', views.student_insights, name='student_insights'),
+    path('student/insights/compare/', views.student_insights_compare, name='student_insights_compare'),
     path('events/<int:pk>/registrations/', views.event_registrations, name='event_registrations'),
+    # iCalendar feeds; the token is from core.ical.feed_token
+    path('calendar/<str:token>/college.ics', views.calendar_college, name='calendar_college'),
+    path('calendar/<str:token>/departments/<int:pk>.ics', views.calendar_department, name='calendar_department'),
+    path('calendar/<str:token>/events.ics', views.calendar_personal, name='calendar_personal'),
+    path('calendar/reset/', views.reset_calendar_feed, name='reset_calendar_feed'),
     path('ajax/notifications/unread/', views.unread_notifications_json, name='ajax_unread_notifications'),
     path('ajax/notifications/mark-read/', views.mark_notification_read, name='ajax_mark_notification_read'),
         path('notifications/clear-read/', views.clear_read_notifications, name='clear_read_notifications'),
@@ -0,0 +1,21 @@
+"""Views, split into feature modules.
+
+Every view is re-exported here, so URLconfs keep using ``views.<name>``.
+"""
+from .common import is_approved_teacher
+from .accounts import (
+    CustomPasswordChangeView, home, register, pending_teachers, approve_teacher, reject_teacher,
+    dashboard, view_profile, college_activity, edit_profile, check_username, check_email, heartbeat,
+)
+from .feed import create_post, edit_post, delete_post, toggle_like, add_comment, edit_comment, delete_comment
+from .certificates import upload_certificate, verify_certificate
+from .news import news_list, news_detail, add_news, edit_news, delete_news
+from .marks import (
+    bulk_upload_marks, student_availability, add_marks, marks_list, edit_mark, delete_mark,
+    student_insights, student_insights_compare, toggle_student_active,
+)
+from .events import create_event, events_list, edit_event, delete_event, event_registrations
+from .calendars import calendar_college, calendar_department, calendar_personal, reset_calendar_feed
+from .notifications import (
+    notifications, clear_read_notifications, unread_notifications_json, mark_notification_read,
+)
@@ -0,0 +1,493 @@
+"""Registration, dashboards, profiles and account checks."""
+import re
+from collections import defaultdict, OrderedDict
+
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth import login, update_session_auth_hash, authenticate
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.views import PasswordChangeView
+from django.core.exceptions import ValidationError
+from django.core.mail import send_mail
+from django.core.validators import validate_email
+from django.db.models import Avg, F, Prefetch
+from django.http import JsonResponse
+from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
+from django.utils import timezone
+
+from ..authcache import get_user
+from ..availability import is_taken
+from ..ical import feed_token
+from ..conditional import conditional_on
+from ..forms import UserRegisterForm, UserEditForm, StudentProfileForm, TeacherProfileForm
+from ..models import Certificate, Comment, Event, Marks, Notification, Post, User
+from ..ratelimit import ratelimit
+
+
+class CustomPasswordChangeView(PasswordChangeView):
+    """Override PasswordChangeView to email the new password to the user after a successful change.
+
+    Note: sending plaintext passwords by email is insecure; consider sending a notification without the password or a confirmation link instead.
+    """
+    def form_valid(self, form):
+        # Save the new password (PasswordChangeView does this in form_valid)
+        response = super().form_valid(form)
+        # Ensure the session auth hash is updated so the user remains authenticated
+        # with the new password and Django's session doesn't get invalidated.
+        try:
+            update_session_auth_hash(self.request, self.request.user)
+        except Exception:
+            pass
+        try:
+            new_password = form.cleaned_data.get('new_password1')
+            user = self.request.user
+            if user.email and new_password:
+                subject = 'Your CampusTrack password was changed'
+                message = f'Hello {user.get_full_name() or user.username},\n\nYour password was successfully changed.\n\nNew password: {new_password}\n\nIf you did not perform this change, please contact support immediately.'
+                send_mail(subject, message, getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@localhost'), [user.email], fail_silently=True)
+        except Exception:
+            # Avoid breaking the flow if email sending fails
+            pass
+        return response
+
+
+def home(request):
+    return render(request, 'home.html')
+
+
+def register(request):
+    if request.method == 'POST':
+        form = UserRegisterForm(request.POST)
+        if form.is_valid():
+            user = form.save(commit=False)
+            user.username = form.cleaned_data['username']
+            user.email = form.cleaned_data['email']
+            user.role = form.cleaned_data['role']
+            year = form.cleaned_data.get('year')
+            if year:
+                user.year = year
+            user.save()
+            # Authenticate the newly created user so `login()` knows which
+            # authentication backend was used. When multiple backends are
+            # configured, Django requires the backend attribute on the user.
+            raw_password = form.cleaned_data.get('password1')
+            auth_user = None
+            try:
+                if raw_password:
+                    # Try authenticating with username first, then email.
+                    auth_user = authenticate(request, username=user.username, password=raw_password)
+                    if not auth_user and user.email:
+                        auth_user = authenticate(request, username=user.email, password=raw_password)
+            except Exception:
+                auth_user = None
+
+            if auth_user:
+                login(request, auth_user)
+            else:
+                # Fallback: explicitly provide backend from settings (first one)
+                from django.conf import settings as _settings
+                backend = (_settings.AUTHENTICATION_BACKENDS[0] if getattr(_settings, 'AUTHENTICATION_BACKENDS', None) else None)
+                if backend:
+                    login(request, user, backend=backend)
+                else:
+                    # Last resort: login without backend (may raise in some configs)
+                    login(request, user)
+            return redirect('dashboard')
+    else:
+        form = UserRegisterForm()
+    return render(request, 'register.html', {'form': form})
+
+
+@login_required
+def pending_teachers(request):
+    """Admin view: list teacher accounts awaiting approval."""
+    if not request.user.is_staff:
+        return redirect('dashboard')
+    pending = User.objects.filter(role='teacher', teacher_approved=False).select_related('department').order_by('date_joined')
+    return render(request, 'admin/pending_teachers.html', {'pending': pending})
+
+
+@login_required
+def approve_teacher(request, pk):
+    """Approve a teacher account so they gain teacher privileges.
+
+    Only staff users may perform this action.
+    """
+    if not request.user.is_staff:
+        return redirect('dashboard')
+    user = get_object_or_404(User, pk=pk)
+    if request.method == 'POST':
+        user.teacher_approved = True
+        user.save()
+        Notification.objects.create(user=user, content='Your teacher account has been approved by an administrator.')
+        try:
+            if getattr(settings, 'EMAIL_HOST', None) and user.email:
+                send_mail('Teacher Account Approved', 'Your account has been approved as a teacher. You can now access teacher features.', settings.DEFAULT_FROM_EMAIL, [user.email], fail_silently=True)
+        except Exception:
+            pass
+        messages.success(request, f'Approved teacher {user.get_full_name() or user.username}.')
+        # If this was an AJAX request, return JSON so client JS can update the UI
+        if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+            return JsonResponse({'ok': True, 'action': 'approve', 'pk': user.pk})
+        return redirect('core:pending_teachers')
+    return render(request, 'admin/confirm_approve.html', {'user_obj': user})
+
+
+@login_required
+def reject_teacher(request, pk):
+    """Reject a teacher request: demote role to student and notify the user.
+
+    Only staff users may perform this action.
+    """
+    if not request.user.is_staff:
+        return redirect('dashboard')
+    user = get_object_or_404(User, pk=pk)
+    if request.method == 'POST':
+        # demote to student and mark not approved
+        user.role = 'student'
+        user.teacher_approved = False
+        user.save()
+        Notification.objects.create(user=user, content='Your request to be a teacher was declined by an administrator.')
+        try:
+            if getattr(settings, 'EMAIL_HOST', None) and user.email:
+                send_mail('Teacher Account Declined', 'Your request to be a teacher has been declined by an administrator.', settings.DEFAULT_FROM_EMAIL, [user.email], fail_silently=True)
+        except Exception:
+            pass
+        messages.success(request, f'Rejected teacher request for {user.get_full_name() or user.username}.')
+        # If AJAX, return JSON so client can update UI immediately
+        if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+            return JsonResponse({'ok': True, 'action': 'reject', 'pk': user.pk})
+        return redirect('core:pending_teachers')
+    return render(request, 'admin/confirm_reject.html', {'user_obj': user})
+
+
+@login_required
+def dashboard(request):
+    user = request.user
+    if user.role == 'student':
+        # post_item.html shows author avatars, like counts and the first comments
+        posts = (Post.objects.select_related('author__student_profile', 'author__department')
+                 .prefetch_related(Prefetch('likes', queryset=User.objects.only('id')),
+                                   Prefetch('comments', queryset=Comment.objects.select_related('author__student_profile')))
+                 .order_by('-created_at'))
+        events_college = Event.objects.filter(scope='college')
+        events_dept = Event.objects.filter(scope='department', department_id=user.department_id)
+        events = (events_college | events_dept).order_by('date_from')
+        # Only consider students in the same department AND the same year as the current user
+        dept_students = User.objects.filter(role='student', department_id=user.department_id, year=getattr(user, 'year', None))
+        ranks = dept_students.select_related('department').annotate(avg_score=Avg(F('marks__marks_obtained') * 100.0 / F('marks__total_marks'))).order_by('-avg_score')
+        ranks_list = [(s, getattr(s, 'avg_score') or 0) for s in ranks]
+        position = None
+        for idx, (stu, avg_score) in enumerate(ranks_list, start=1):
+            if stu.pk == user.pk:
+                position = idx
+                break
+        notifications = Notification.objects.filter(user=user).order_by('-created_at')[:10]
+        # Personal .ics feed (college + own department events) for calendar apps
+        calendar_url = request.build_absolute_uri(reverse('core:calendar_personal', args=[feed_token(user)]))
+        return render(request, 'students/dashboard.html', {
+            'posts': posts,'events': events,'position': position,'notifications': notifications,'ranks': ranks_list[:5],
+            'calendar_url': calendar_url,
+        })
+    elif user.role == 'teacher':
+        # If the teacher account hasn't been approved yet, show a pending notice
+        if not getattr(user, 'teacher_approved', False):
+            return render(request, 'teachers/pending_approval.html')
+        # Only show certificates that haven't been reviewed yet (verified=False and no feedback)
+        # from students of the teacher's department (the only ones whose files they may open)
+        pending_certs = Certificate.objects.filter(verified=False, feedback='', student__department_id=user.department_id).select_related('student')
+        # By default only show active students; teachers can opt-in to see inactive via ?show_inactive=1
+        show_inactive = request.GET.get('show_inactive') == '1'
+        # Restrict teachers to only see students from their own department
+        if show_inactive:
+            students = User.objects.filter(role='student', department_id=user.department_id).select_related('department')
+        else:
+            students = User.objects.filter(role='student', department_id=user.department_id, is_active=True).select_related('department')
+        notifications = Notification.objects.filter(user=user).order_by('-created_at')[:10]
+        return render(request, 'teachers/dashboard.html', {
+            'pending_certs': pending_certs,'students': students,'notifications': notifications,
+            'show_inactive': show_inactive,
+        })
+    else:
+        return redirect('home')
+
+
+def _profile_versions(request, pk):
+    """Counters of the profile's owner, the viewer and the owner's department (for the ranks)."""
+    keys = [(label, pk) for label in ('core.User', 'core.StudentProfile', 'core.TeacherProfile', 'core.Certificate')]
+    keys.append(('core.User', request.user.pk))
+    owner = get_user(pk)
+    if owner is not None and owner.department_id:
+        keys.append(('core.User', f'department:{owner.department_id}'))
+    return keys
+
+
+@login_required
+# The certificate chart covers the 12 months (of 30 days) back from today, so the
+# page changes with the date as well as with the data. Marks stay global: the
+# ranks compare the owner's marks with the rest of the department's.
+@conditional_on(_profile_versions, 'core.Marks', vary_every=60 * 60 * 24)
+def view_profile(request, pk):
+    profile_user = get_object_or_404(User, pk=pk)
+
+    # Basic datasets
+    marks_qs = Marks.objects.filter(student=profile_user).order_by('created_at')
+    certs_qs = Certificate.objects.filter(student=profile_user, verified=True).order_by('uploaded_at')
+
+    # 1) GPA per semester (derive semester from month: Jan-Jun -> S1, Jul-Dec -> S2)
+    sem_buckets = OrderedDict()
+    for m in marks_qs:
+        dt = m.created_at
+        year = dt.year
+        sem = 1 if dt.month <= 6 else 2
+        key = f"{year} S{sem}"
+        sem_buckets.setdefault(key, []).append(m.percentage())
+
+    gpa_labels = []
+    gpa_data = []
+    for key, vals in sem_buckets.items():
+        gpa_labels.append(key)
+        try:
+            gpa_data.append(sum(vals) / len(vals))
+        except Exception:
+            gpa_data.append(0.0)
+
+    # 2) Certificates over time (monthly counts for last 12 months)
+    now = timezone.now()
+    cert_labels = []
+    cert_counts = []
+    # build last 12 months labels (oldest -> newest)
+    months = []
+    for i in range(11, -1, -1):
+        dt = now - timezone.timedelta(days=30 * i)
+        months.append((dt.year, dt.month))
+    def month_label(y, m):
+        return timezone.datetime(y, m, 1).strftime('%b %Y')
+    cumulative = 0
+    certs_by_month = {(c.uploaded_at.year, c.uploaded_at.month): 0 for c in certs_qs}
+    for c in certs_qs:
+        key = (c.uploaded_at.year, c.uploaded_at.month)
+        certs_by_month[key] = certs_by_month.get(key, 0) + 1
+
+    for (y, m) in months:
+        cert_labels.append(month_label(y, m))
+        cnt = certs_by_month.get((y, m), 0)
+        cert_counts.append(cnt)
+        cumulative += cnt
+
+    # NOTE: skill progress proxy removed per request — no skill timeline computed here
+
+    # 4) Leaderboard position history per semester (position among department students for each semester)
+    leaderboard_labels = gpa_labels[:]
+    leaderboard_positions = []
+    if profile_user.department_id:
+        dept_students = list(User.objects.filter(role='student', department_id=profile_user.department_id))
+        # One query for the whole department, bucketed by (student, year, semester)
+        # in local time, as the created_at__year/__month lookups did per student.
+        dept_percentages = defaultdict(list)
+        dept_marks = Marks.objects.filter(student__in=dept_students).only('student_id', 'marks_obtained', 'total_marks', 'created_at')
+        for m in dept_marks:
+            local = timezone.localtime(m.created_at)
+            dept_percentages[(m.student_id, local.year, 1 if local.month <= 6 else 2)].append(m.percentage())
+        for key in sem_buckets.keys():
+            # parse key like '2023 S1'
+            parts = key.split()
+            if len(parts) != 2:
+                leaderboard_positions.append(None)
+                continue
+            year = int(parts[0])
+            semnum = int(parts[1].lstrip('S'))
+            # compute avg for each student in dept during that semester
+            ranks = []
+            for s in dept_students:
+                vals = dept_percentages.get((s.pk, year, semnum), [])
+                avg = (sum(vals) / len(vals)) if vals else None
+                ranks.append((s, avg))
+            # sort by avg desc, treat None as -inf
+            ranks_sorted = sorted(ranks, key=lambda x: (x[1] is not None, x[1] or -1), reverse=True)
+            pos = None
+            for idx, (s, avg) in enumerate(ranks_sorted, start=1):
+                if s.pk == profile_user.pk:
+                    pos = idx
+                    break
+            leaderboard_positions.append(pos or None)
+    else:
+        leaderboard_positions = [None] * len(leaderboard_labels)
+
+    analytics = {
+        'gpa_labels': gpa_labels,
+        'gpa_data': [round(x, 2) for x in gpa_data],
+        'cert_labels': cert_labels,
+        'cert_data': cert_counts,
+        'leaderboard_labels': leaderboard_labels,
+        'leaderboard_positions': leaderboard_positions,
+    }
+
+    context = {
+        'profile_user': profile_user,
+        'marks': marks_qs,
+        'certs': certs_qs,
+        'analytics': analytics,
+    }
+    return render(request, 'profile.html', context)
+
+
+@login_required
+def college_activity(request):
+    events = Event.objects.select_related('created_by', 'department').order_by('-date_from')
+    certs = Certificate.objects.filter(verified=True).select_related('student', 'verified_by').order_by('-uploaded_at')
+    marks = Marks.objects.select_related('student').order_by('-created_at')
+    return render(request, 'college_activity.html', {'events': events, 'certs': certs, 'marks': marks})
+
+
+@login_required
+def edit_profile(request):
+    user: User = request.user
+    # Choose the appropriate profile form per role
+    if user.role == 'student':
+        profile_instance = getattr(user, 'student_profile', None)
+        profile_form_class = StudentProfileForm
+        profile_context_key = 'student_form'
+    else:
+        profile_instance = getattr(user, 'teacher_profile', None)
+        profile_form_class = TeacherProfileForm
+        profile_context_key = 'teacher_form'
+
+    # Ensure profile exists (signals should create, but be defensive)
+    if profile_instance is None:
+        if user.role == 'student':
+            from .models import StudentProfile
+            profile_instance = StudentProfile.objects.create(user=user)
+        else:
+            from .models import TeacherProfile
+            profile_instance = TeacherProfile.objects.create(user=user)
+
+    if request.method == 'POST':
+        uform = UserEditForm(request.POST, instance=user)
+        pform = profile_form_class(request.POST, request.FILES, instance=profile_instance)
+        if uform.is_valid() and pform.is_valid():
+            uform.save()
+            profile_obj = pform.save(commit=False)
+            # For StudentProfile, persist computed skills list from clean()
+            if hasattr(pform, 'cleaned_data') and 'skills' in pform.cleaned_data:
+                profile_obj.skills = pform.cleaned_data['skills']
+            profile_obj.save()
+            return redirect('core:view_profile', pk=user.pk)
+    else:
+        uform = UserEditForm(instance=user)
+        pform = profile_form_class(instance=profile_instance)
+
+    context = {
+        'user_form': uform,
+        profile_context_key: pform,
+    }
+    return render(request, 'profile_edit.html', context)
+
+
+@ratelimit('availability')
+@conditional_on('core.User', per_user=False)
+def check_username(request):
+    """AJAX endpoint to check whether a username is available.
+
+    Expects GET param 'username'. Returns JSON: {available: bool, message: str}
+    """
+    username = request.GET.get('username', '').strip()
+    if not username:
+        return JsonResponse({'available': False, 'message': 'Enter a username'})
+
+    # Basic validation: length and allowed characters
+    if len(username) < 3:
+        return JsonResponse({'available': False, 'message': 'Too short (min 3 chars)'})
+
+    if not re.match(r'^[A-Za-z0-9_.-]+$', username):
+        return JsonResponse({'available': False, 'message': 'Only letters, numbers, dot, underscore and dash allowed'})
+
+    if is_taken('username', username, request):
+        return JsonResponse({'available': False, 'message': 'Username already taken'})
+    return JsonResponse({'available': True, 'message': 'Username is available'})
+
+
+@ratelimit('availability')
+@conditional_on('core.User')
+def check_email(request):
+    """AJAX endpoint to validate an email address.
+
+    Checks:
+      - non-empty
+      - valid email format (using Django's validator)
+      - not already used by another user (case-insensitive)
+
+    GET param: 'email'
+    Response: { valid: bool, message: str }
+    """
+    email = request.GET.get('email', '').strip()
+    if not email:
+        return JsonResponse({'valid': False, 'message': 'Enter an email address'})
+
+    # validate format
+    try:
+        validate_email(email)
+    except ValidationError:
+        return JsonResponse({'valid': False, 'message': 'Invalid email format'})
+
+    # allow user's own email when editing profile
+    if request.user.is_authenticated and getattr(request.user, 'email', '').lower() == email.lower():
+        return JsonResponse({'valid': True, 'message': 'This is your current email'})
+
+    if is_taken('email', email, request):
+        return JsonResponse({'valid': False, 'message': 'Email already registered'})
+
+    return JsonResponse({'valid': True, 'message': 'Email looks good'})
+
+
+def heartbeat(request):
+    """Heartbeat endpoint that returns a stable reload token.
+
+    The endpoint prefers to return the current Git HEAD commit hash when a
+    `.git` directory exists. That makes it safe to poll: the token only
+    changes when the repository updates (e.g. during development). If Git is
+    unavailable, the endpoint falls back to a server timestamp string.
+
+    Clients should poll this endpoint and reload the page when the
+    `reload_token` value changes.
+    """
+    # Only enable auto-reload token in DEBUG/development to avoid reloads
+    # in production. When DEBUG is False return an empty token which the
+    # client treats as "no reload".
+    if not getattr(settings, 'DEBUG', False):
+        return JsonResponse({'reload_token': ''})
+    try:
+        token = _reload_token()
+    except Exception:
+        token = ''
+    return JsonResponse({'reload_token': token})
+
+
+def _reload_token():
+    """Git HEAD commit of the checkout, or the current time without Git."""
+    import os
+    base = getattr(settings, 'BASE_DIR', None)
+    token = None
+    if base:
+        git_head = os.path.join(base, '.git', 'HEAD')
+        if os.path.exists(git_head):
+            try:
+                with open(git_head, 'r', encoding='utf-8') as fh:
+                    head = fh.read().strip()
+                if head.startswith('ref:'):
+                    ref = head.split(':', 1)[1].strip()
+                    ref_path = os.path.join(base, '.git', ref)
+                    if os.path.exists(ref_path):
+                        with open(ref_path, 'r', encoding='utf-8') as rf:
+                            token = rf.read().strip()
+                else:
+                    token = head
+            except Exception:
+                token = None
+    # Fallback in development: use an ISO timestamp so the endpoint still
+    # returns a changing token when Git isn't available (e.g., simple
+    # deployments).
+    if not token:
+        token = timezone.now().isoformat()
+    return token
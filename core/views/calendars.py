@@ -0,0 +1,65 @@
+"""iCalendar event feeds for calendar apps (see core.ical)."""
+from functools import wraps
+
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404, redirect
+
+from .. import ical
+from ..conditional import conditional_on
+from ..departments import registry as department_registry
+from ..models import Department
+
+
+def _subscriber_required(view_func):
+    """404 unless the URL's token names an active user, who becomes `request.subscriber`."""
+    @wraps(view_func)
+    def _wrapped(request, token, *args, **kwargs):
+        request.subscriber = ical.subscriber(token)
+        if request.subscriber is None:
+            raise Http404('Unknown calendar feed')
+        return view_func(request, token, *args, **kwargs)
+    return _wrapped
+
+
+def _feed_version(request, *args, **kwargs):
+    # The personal feed also depends on which department the subscriber is in.
+    return f'{ical.feed_version()}:{request.subscriber.department_id}'
+
+
+def _ics(body):
+    response = HttpResponse(body, content_type='text/calendar; charset=utf-8')
+    response['Content-Disposition'] = 'inline; filename="events.ics"'
+    return response
+
+
+@_subscriber_required
+@conditional_on(per_user=False, extra=_feed_version)
+def calendar_college(request, token):
+    return _ics(ical.feed('college'))
+
+
+@_subscriber_required
+@conditional_on(per_user=False, extra=_feed_version)
+def calendar_department(request, token, pk):
+    if department_registry().name_of(pk) is None:
+        get_object_or_404(Department, pk=pk)  # added in another worker, not in this one's registry yet
+    return _ics(ical.feed('department', pk))
+
+
+@_subscriber_required
+@conditional_on(per_user=False, extra=_feed_version)
+def calendar_personal(request, token):
+    return _ics(ical.feed('personal', request.subscriber.department_id))
+
+
+@login_required
+def reset_calendar_feed(request):
+    """Revoke the user's calendar feed URLs and issue new ones (POST only)."""
+    if request.method != 'POST':
+        return redirect('dashboard')
+    request.user.feed_key += 1
+    request.user.save(update_fields=['feed_key'])
+    messages.success(request, 'Your calendar link has been reset; subscribe to the new one.')
+    return redirect('dashboard')
@@ -0,0 +1,54 @@
+"""Certificate upload and teacher verification."""
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.core.mail import send_mail
+from django.shortcuts import render, redirect, get_object_or_404
+
+from ..forms import CertificateForm
+from ..models import Certificate, Notification, User
+from .common import is_approved_teacher
+
+
+@login_required
+def upload_certificate(request):
+    if request.method == 'POST':
+        form = CertificateForm(request.POST, request.FILES)
+        if form.is_valid():
+            cert = form.save(commit=False)
+            cert.student = request.user
+            cert.save()
+            # Notify teachers that a new certificate has been uploaded for review
+            teachers = User.objects.filter(role='teacher')
+            content = f'Certificate uploaded by {request.user.get_full_name() or request.user.email}: "{cert.title}"'
+            for t in teachers:
+                Notification.objects.create(user=t, content=content)
+                try:
+                    if getattr(settings, 'EMAIL_HOST', None) and t.email:
+                        send_mail(f'Certificate Uploaded: {cert.title}', content, settings.DEFAULT_FROM_EMAIL, [t.email], fail_silently=True)
+                except Exception:
+                    pass
+            return redirect('dashboard')
+    else:
+        form = CertificateForm()
+    return render(request, 'upload_certificate.html', {'form': form})
+
+
+@login_required
+def verify_certificate(request, pk, action):
+    if not is_approved_teacher(request.user):
+        return redirect('dashboard')
+    cert = get_object_or_404(Certificate, pk=pk)
+    if action == 'approve':
+        cert.verified = True
+        cert.verified_by = request.user
+        cert.feedback = ''
+        cert.save()
+        Notification.objects.create(user=cert.student, content=f'Your certificate \"{cert.title}\" was approved.')
+    else:
+        feedback = request.POST.get('feedback','Rejected by teacher')
+        cert.verified = False
+        cert.feedback = feedback
+        cert.verified_by = request.user
+        cert.save()
+        Notification.objects.create(user=cert.student, content=f'Your certificate \"{cert.title}\" was rejected: {feedback}')
+    return redirect('dashboard')
@@ -0,0 +1,27 @@
+"""Helpers shared by the view modules."""
+from django.template.context_processors import csrf
+from django.template.loader import get_template
+
+
+def is_approved_teacher(user):
+    """Return True if the given user is an approved teacher or staff."""
+    try:
+        return user.is_staff or (getattr(user, 'role', None) == 'teacher' and bool(getattr(user, 'teacher_approved', False)))
+    except Exception:
+        return False
+
+
+def render_fragment(request, template_name, context):
+    """Render an include partial (a post, a comment) for an AJAX response.
+
+    Unlike render_to_string(..., request=request) no context processors run:
+    the partial gets `context` plus the user, the request and a CSRF token,
+    which is all the includes under templates/includes/ use. The template
+    comes from the cached loader, so this is a dict lookup and a render.
+    """
+    return get_template(template_name).render({
+        'user': request.user,
+        'request': request,
+        **csrf(request),
+        **context,
+    })
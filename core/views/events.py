@@ -0,0 +1,118 @@
+"""Events and their registrations."""
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.core.mail import send_mail
+from django.shortcuts import render, redirect, get_object_or_404
+from django.utils import timezone
+
+from ..conditional import conditional_on, requesting_user
+from ..forms import EventForm
+from ..models import Event, Notification, User
+from .common import is_approved_teacher
+
+
+@login_required
+def create_event(request):
+    if not is_approved_teacher(request.user):
+        return redirect('dashboard')
+    if request.method == 'POST':
+        form = EventForm(request.POST)
+        if form.is_valid():
+            ev = form.save(commit=False)
+            ev.created_by = request.user
+            ev.save()
+            # Notify relevant users about the new event
+            if ev.scope == 'college':
+                targets = User.objects.filter(role='student')
+            else:
+                targets = User.objects.filter(role='student', department_id=ev.department_id)
+            content = f'New event posted: "{ev.title}" on {ev.date_from.strftime("%b %d %Y %H:%M")}'
+            # create Notification objects and attempt to send email
+            for u in targets:
+                Notification.objects.create(user=u, content=content)
+                # send email if user has email and EMAIL settings present
+                try:
+                    if getattr(settings, 'EMAIL_HOST', None) and u.email:
+                        send_mail(f'New Event: {ev.title}', content, settings.DEFAULT_FROM_EMAIL, [u.email], fail_silently=True)
+                except Exception:
+                    pass
+            return redirect('dashboard')
+    else:
+        form = EventForm()
+    return render(request, 'events/create_event.html', {'form': form})
+
+
+@login_required
+def events_list(request):
+    """List events with edit/delete actions for teachers."""
+    if not is_approved_teacher(request.user):
+        return redirect('dashboard')
+    qs = Event.objects.order_by('-date_from')
+    return render(request, 'teachers/events_list.html', {'events': qs})
+
+
+@login_required
+def edit_event(request, pk):
+    if not is_approved_teacher(request.user):
+        return redirect('dashboard')
+    ev = get_object_or_404(Event, pk=pk)
+    if request.method == 'POST':
+        form = EventForm(request.POST, instance=ev)
+        if form.is_valid():
+            form.save()
+            # notify students about important changes
+            targets = User.objects.filter(role='student') if ev.scope == 'college' else User.objects.filter(role='student', department_id=ev.department_id)
+            content = f'Event updated: "{ev.title}" on {ev.date_from.strftime("%b %d %Y %H:%M")}'
+            for u in targets:
+                Notification.objects.create(user=u, content=content)
+                try:
+                    if getattr(settings, 'EMAIL_HOST', None) and u.email:
+                        send_mail(f'Updated Event: {ev.title}', content, settings.DEFAULT_FROM_EMAIL, [u.email], fail_silently=True)
+                except Exception:
+                    pass
+            return redirect('core:events_list')
+    else:
+        form = EventForm(instance=ev)
+    return render(request, 'teachers/edit_event.html', {'form': form, 'event': ev})
+
+
+@login_required
+def delete_event(request, pk):
+    if not is_approved_teacher(request.user):
+        return redirect('dashboard')
+    ev = get_object_or_404(Event, pk=pk)
+    if request.method == 'POST':
+        title = ev.title
+        ev.delete()
+        # notify students that the event was removed
+        targets = User.objects.filter(role='student') if ev.scope == 'college' else User.objects.filter(role='student', department_id=ev.department_id)
+        for u in targets:
+            Notification.objects.create(user=u, content=f'Event removed: "{title}"')
+            try:
+                if getattr(settings, 'EMAIL_HOST', None) and u.email:
+                    send_mail(f'Event Cancelled: {title}', f'The event "{title}" has been cancelled.', settings.DEFAULT_FROM_EMAIL, [u.email], fail_silently=True)
+            except Exception:
+                pass
+        return redirect('core:events_list')
+    return render(request, 'teachers/confirm_delete_event.html', {'event': ev})
+
+
+def _registration_state(request, pk):
+    """Whether registration is open changes with time, not with a save."""
+    date_from = Event.objects.filter(pk=pk).values_list('date_from', flat=True).first()
+    return bool(date_from and timezone.now() < date_from)
+
+
+@conditional_on('core.Event', requesting_user, extra=_registration_state)
+def event_registrations(request, pk):
+    """If an event has a registration_link redirect to it, otherwise show a simple page explaining no link is available.
+
+    This prevents 404s when users visit /core/events/<pk>/registrations/ and provides a place to implement registrations later.
+    """
+    ev = get_object_or_404(Event, pk=pk)
+    # Only redirect to the provided registration URL if registration is still open
+    if ev.registration_open:
+        # ensure we redirect to an absolute URL
+        return redirect(ev.registration_link)
+    # If registration is closed or no link provided, render a page explaining the state
+    return render(request, 'events/registrations.html', {'event': ev})
@@ -0,0 +1,161 @@
+"""Posts, likes and comments on the student feed."""
+import re
+from datetime import timedelta
+
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.db import transaction
+from django.http import JsonResponse
+from django.shortcuts import render, redirect, get_object_or_404
+from django.utils import timezone
+
+from ..forms import PostForm, CommentForm
+from ..models import Comment, Notification, Post
+from .common import render_fragment
+
+
+@login_required
+def create_post(request):
+    if request.method == 'POST':
+        form = PostForm(request.POST, request.FILES)
+        if form.is_valid():
+            p = form.save(commit=False)
+            p.author = request.user
+            p.save()
+            return redirect('dashboard')
+    else:
+        form = PostForm()
+    return render(request, 'create_post.html', {'form': form})
+
+
+@login_required
+def edit_post(request, pk):
+    p = get_object_or_404(Post, pk=pk)
+    # Only author or staff can edit
+    if not (request.user == p.author or request.user.is_staff):
+        if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+            return JsonResponse({'ok': False, 'error': 'permission denied'}, status=403)
+        return redirect('dashboard')
+    if request.method == 'POST':
+        content = request.POST.get('content', '').strip()
+        if not content:
+            if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+                return JsonResponse({'ok': False, 'error': 'empty content'}, status=400)
+            messages.error(request, 'Content cannot be empty.')
+            return redirect('dashboard')
+        p.content = content
+        p.save()
+        if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+            html = render_fragment(request, 'includes/post_item.html', {'post': p})
+            return JsonResponse({'ok': True, 'html': html, 'pk': p.pk})
+        return redirect('dashboard')
+    # GET fallback: redirect to dashboard (or show an edit page if desired)
+    return redirect('dashboard')
+
+
+@login_required
+def delete_post(request, pk):
+    p = get_object_or_404(Post, pk=pk)
+    # Only author or staff can delete
+    if not (request.user == p.author or request.user.is_staff):
+        if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+            return JsonResponse({'ok': False, 'error': 'permission denied'}, status=403)
+        return redirect('dashboard')
+    if request.method == 'POST':
+        p.delete()
+        if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+            return JsonResponse({'ok': True, 'deleted_pk': pk})
+        return redirect('dashboard')
+    return render(request, 'teachers/confirm_delete_event.html', {'event': p})
+
+
+@login_required
+def toggle_like(request, pk):
+    post = get_object_or_404(Post, pk=pk)
+    user = request.user
+    if user in post.likes.all():
+        post.likes.remove(user)
+    else:
+        post.likes.add(user)
+        # Notify the post author (but not if they liked their own post)
+        try:
+            if post.author and post.author != user:
+                preview = (post.content[:30] + '...') if post.content and len(post.content) > 30 else (post.content or '')
+                Notification.objects.create(user=post.author, content=f'{user.get_full_name() or user.username} liked your post "{preview}"')
+        except Exception:
+            # ensure like still succeeds even if notification fails
+            pass
+    return redirect('dashboard')
+
+
+@login_required
+def add_comment(request, pk):
+    post = get_object_or_404(Post, pk=pk)
+    if request.method == 'POST':
+        form = CommentForm(request.POST)
+        if form.is_valid():
+            c = form.save(commit=False)
+            c.post = post
+            c.author = request.user
+            # Normalize whitespace for duplicate detection
+            norm_content = re.sub(r"\s+", " ", (c.content or '').strip())
+            # Use a DB transaction and select_for_update on the post to avoid race conditions
+            try:
+                with transaction.atomic():
+                    # lock the post row so concurrent comment submissions serialize
+                    _ = Post.objects.select_for_update().get(pk=post.pk)
+                    recent_window = timezone.now() - timedelta(seconds=30)
+                    dup_exists = Comment.objects.filter(post=post, author=request.user).filter(created_at__gte=recent_window).filter(content__iregex=r"^%s$" % re.escape(norm_content)).exists()
+                    if dup_exists:
+                        if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+                            return JsonResponse({'ok': True, 'html': ''})
+                        return redirect('dashboard')
+                    # assign normalized content before saving
+                    c.content = norm_content
+                    c.save()
+            except Exception:
+                # fallback to naive save if locking/checking fails for some reason
+                c.content = norm_content
+                c.save()
+                
+            # Notify the post author about the new comment (don't notify self)
+            try:
+                if post.author and post.author != request.user:
+                    Notification.objects.create(user=post.author, content=f'{request.user.get_full_name() or request.user.username} commented on your post')
+            except Exception:
+                pass
+            # If AJAX request, return rendered HTML for the single comment
+            if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+                html = render_fragment(request, 'includes/comment_item.html', {'comment': c})
+                return JsonResponse({'ok': True, 'html': html, 'id': c.id})
+    return redirect('dashboard')
+
+
+@login_required
+def edit_comment(request, pk):
+    c = get_object_or_404(Comment, pk=pk)
+    # only author or staff can edit
+    if not (request.user == c.author or request.user.is_staff):
+        return JsonResponse({'ok': False, 'error': 'permission denied'}, status=403)
+    if request.method == 'POST':
+        content = request.POST.get('content', '').strip()
+        if not content:
+            return JsonResponse({'ok': False, 'error': 'Empty content'}, status=400)
+        c.content = content
+        c.save()
+        if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+            html = render_fragment(request, 'includes/comment_item.html', {'comment': c})
+            return JsonResponse({'ok': True, 'html': html, 'id': c.id})
+    return JsonResponse({'ok': False, 'error': 'POST required'}, status=400)
+
+
+@login_required
+def delete_comment(request, pk):
+    c = get_object_or_404(Comment, pk=pk)
+    if not (request.user == c.author or request.user.is_staff):
+        return JsonResponse({'ok': False, 'error': 'permission denied'}, status=403)
+    if request.method == 'POST':
+        cid = c.id
+        c.delete()
+        return JsonResponse({'ok': True, 'deleted_id': cid})
+    return JsonResponse({'ok': False, 'error': 'POST required'}, status=400)
@@ -0,0 +1,299 @@
+"""Marks entry, spreadsheet uploads and student insights."""
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth import get_user_model
+from django.contrib.auth.decorators import login_required
+from django.core.mail import send_mail
+from django.db.models import Q
+from django.shortcuts import render, redirect, get_object_or_404
+
+from ..forms import MarksForm
+from ..insights import get_student_summary, get_student_summaries
+from ..models import Comment, Marks, Notification, Post, User
+from .common import is_approved_teacher
+
+
+@login_required
+def bulk_upload_marks(request):
+    # Only approved teachers may use this
+    if not is_approved_teacher(request.user):
+        return redirect('dashboard')
+
+    results = []
+    if request.method == 'POST' and request.FILES.get('file'):
+        f = request.FILES['file']
+        try:
+            import openpyxl  # only the spreadsheet views need it; kept out of worker start-up
+            wb = openpyxl.load_workbook(filename=BytesIO(f.read()), data_only=True)
+            ws = wb.active
+            # Expect header row: Student ID | Subject | Marks
+            for idx, row in enumerate(ws.iter_rows(values_only=True), start=1):
+                if idx == 1:
+                    # skip header
+                    continue
+                if not row or all([c is None for c in row]):
+                    continue
+                sid = str(row[0]).strip() if row[0] is not None else ''
+                subject = str(row[1]).strip() if len(row) > 1 and row[1] is not None else ''
+                marks_val = row[2] if len(row) > 2 else None
+
+                entry = {'student_id': sid, 'exists': False, 'message': ''}
+
+                # Try matching by username or email, then by numeric pk
+                student = None
+                if sid:
+                    student = User.objects.filter(role='student').filter(Q(username=sid) | Q(email=sid)).first()
+                    if not student:
+                        if sid.isdigit():
+                            try:
+                                student = User.objects.get(pk=int(sid), role='student')
+                            except Exception:
+                                student = None
+
+                if not student:
+                    entry['message'] = 'Student not found'
+                    results.append(entry)
+                    continue
+
+                entry['exists'] = True
+
+                # Parse marks
+                try:
+                    marks_float = float(marks_val) if marks_val is not None and str(marks_val).strip() != '' else None
+                except Exception:
+                    marks_float = None
+
+                if subject and marks_float is not None:
+                    try:
+                        Marks.objects.create(student=student, subject=subject, marks_obtained=marks_float, total_marks=100)
+                        entry['message'] = 'Imported'
+                    except Exception as e:
+                        entry['message'] = f'Error saving mark: {str(e)}'
+                else:
+                    entry['message'] = 'Missing subject or marks'
+
+                results.append(entry)
+        except Exception as e:
+            results = [{'student_id': '', 'exists': False, 'message': f'Failed to parse file: {str(e)}'}]
+
+    return render(request, 'teachers/bulk_marks_upload.html', {'results': results})
+
+
+@login_required
+def student_availability(request):
+    if not is_approved_teacher(request.user):
+        return redirect('dashboard')
+
+    results = []
+    if request.method == 'POST' and request.FILES.get('file'):
+        f = request.FILES['file']
+        try:
+            import openpyxl  # only the spreadsheet views need it; kept out of worker start-up
+            wb = openpyxl.load_workbook(filename=BytesIO(f.read()), data_only=True)
+            ws = wb.active
+            for idx, row in enumerate(ws.iter_rows(values_only=True), start=1):
+                if idx == 1:
+                    continue
+                if not row or all([c is None for c in row]):
+                    continue
+                sid = str(row[0]).strip() if row[0] is not None else ''
+                entry = {'student_id': sid, 'name': '', 'exists': False}
+                if sid:
+                    student = User.objects.filter(role='student').filter(Q(username=sid) | Q(email=sid)).first()
+                    if not student and sid.isdigit():
+                        try:
+                            student = User.objects.get(pk=int(sid), role='student')
+                        except Exception:
+                            student = None
+                    if student:
+                        entry['exists'] = True
+                        entry['name'] = student.get_full_name() or student.username
+                    else:
+                        entry['name'] = ''
+                results.append(entry)
+        except Exception as e:
+            results = [{'student_id': '', 'name': '', 'exists': False, 'error': f'Failed to parse file: {str(e)}'}]
+
+    return render(request, 'teachers/student_availability.html', {'results': results})
+
+
+@login_required
+def add_marks(request):
+    if not is_approved_teacher(request.user):
+        return redirect('dashboard')
+    if request.method == 'POST':
+        form = MarksForm(request.POST)
+        # restrict selection server-side as well: ensure chosen student belongs to teacher's department
+        if form.is_valid():
+            student = form.cleaned_data.get('student')
+            if student and student.department_id != request.user.department_id and not request.user.is_staff:
+                messages.error(request, 'You may only add marks for students in your department.')
+                return redirect('core:add_marks')
+            saved = form.save()
+            Notification.objects.create(user=saved.student, content=f'New marks added for {saved.subject}')
+            # send email to the student if possible
+            try:
+                if getattr(settings, 'EMAIL_HOST', None) and saved.student.email:
+                    send_mail(f'New Marks: {saved.subject}', f'New marks were added for {saved.subject}. Check your profile for details.', settings.DEFAULT_FROM_EMAIL, [saved.student.email], fail_silently=True)
+            except Exception:
+                pass
+            return redirect('dashboard')
+    else:
+        form = MarksForm()
+        # Restrict selectable students to those in the teacher's department
+        form.fields['student'].queryset = User.objects.filter(role='student', is_active=True, department_id=request.user.department_id).order_by('first_name', 'last_name', 'email')
+    return render(request, 'teachers/add_marks.html', {'form': form})
+
+
+@login_required
+def marks_list(request):
+    """List all marks for teachers with edit/delete actions."""
+    if not is_approved_teacher(request.user):
+        return redirect('dashboard')
+    # Only show marks for students in this teacher's department (unless staff)
+    if request.user.is_staff:
+        qs = Marks.objects.select_related('student').order_by('-created_at')
+    else:
+        qs = Marks.objects.select_related('student').filter(student__department_id=request.user.department_id).order_by('-created_at')
+    return render(request, 'teachers/marks_list.html', {'marks': qs})
+
+
+@login_required
+def edit_mark(request, pk):
+    if not is_approved_teacher(request.user):
+        return redirect('dashboard')
+    mark = get_object_or_404(Marks, pk=pk)
+    # Only allow teachers to edit marks for students in their department
+    if not request.user.is_staff and mark.student.department_id != request.user.department_id:
+        messages.error(request, 'You do not have permission to edit this record.')
+        return redirect('dashboard')
+    if request.method == 'POST':
+        form = MarksForm(request.POST, instance=mark)
+        if form.is_valid():
+            saved = form.save()
+            Notification.objects.create(user=saved.student, content=f'Marks updated for {saved.subject}')
+            try:
+                if getattr(settings, 'EMAIL_HOST', None) and saved.student.email:
+                    send_mail(f'Marks Updated: {saved.subject}', f'Your marks for {saved.subject} were updated.', settings.DEFAULT_FROM_EMAIL, [saved.student.email], fail_silently=True)
+            except Exception:
+                pass
+            return redirect('core:marks_list')
+    else:
+        form = MarksForm(instance=mark)
+        # Ensure the student's own record is selectable even if inactive, and
+        # restrict selectable students to the teacher's department.
+        dept_qs = User.objects.filter(role='student', is_active=True, department_id=request.user.department_id)
+        # Allow the specific student to appear even if they are inactive or outside the department
+        form.fields['student'].queryset = User.objects.filter(Q(pk=mark.student.pk) | Q(pk__in=dept_qs.values_list('pk', flat=True))).order_by('first_name', 'last_name', 'email')
+    return render(request, 'teachers/edit_mark.html', {'form': form, 'mark': mark})
+
+
+@login_required
+def delete_mark(request, pk):
+    if not is_approved_teacher(request.user):
+        return redirect('dashboard')
+    mark = get_object_or_404(Marks, pk=pk)
+    # Ensure teacher can only delete marks for students in their department
+    if not request.user.is_staff and mark.student.department_id != request.user.department_id:
+        messages.error(request, 'You do not have permission to delete this record.')
+        return redirect('dashboard')
+    if request.method == 'POST':
+        student = mark.student
+        subject = mark.subject
+        mark.delete()
+        Notification.objects.create(user=student, content=f'Marks removed for {subject}')
+        try:
+            if getattr(settings, 'EMAIL_HOST', None) and student.email:
+                send_mail(f'Marks Deleted: {subject}', f'Your marks for {subject} were deleted by a teacher.', settings.DEFAULT_FROM_EMAIL, [student.email], fail_silently=True)
+        except Exception:
+            pass
+        return redirect('core:marks_list')
+    return render(request, 'teachers/confirm_delete_mark.html', {'mark': mark})
+
+
+def student_insights(request, pk):
+    """Teacher-only view: aggregated insights about a student."""
+    if not is_approved_teacher(request.user):
+        return redirect('dashboard')
+
+    User = get_user_model()
+    student = get_object_or_404(User.objects.select_related('student_profile'), pk=pk)
+    if student.role != 'student':
+        return redirect('dashboard')
+
+    # Numeric overview (averages, certificate and activity counts) is cached
+    # per student and invalidated by signals when the underlying rows change.
+    summary = get_student_summary(student.pk)
+    subject_avgs = summary['subject_avgs']
+
+    # Recent posts and comments
+    recent_posts = Post.objects.filter(author=student).order_by('-created_at')[:6]
+    recent_comments = Comment.objects.filter(author=student).order_by('-created_at')[:6]
+
+    profile = getattr(student, 'student_profile', None)
+
+    context = {
+        'student': student,
+        'profile': profile,
+        'summary': summary,
+        'overall_avg': summary['overall_avg'],
+        'subject_avgs': subject_avgs,
+        # Serialized subject averages for safe JSON embedding in templates (avoids template tags inside JS)
+        'subject_avgs_json': subject_avgs,
+        'total_certs': summary['total_certs'],
+        'verified_certs': summary['verified_certs'],
+        'recent_posts': recent_posts,
+        'recent_comments': recent_comments,
+    }
+    return render(request, 'teachers/student_insights.html', context)
+
+
+@login_required
+def student_insights_compare(request):
+    """Teacher-only view: side-by-side summaries for several students.
+
+    GET param 'ids' is a comma-separated list of student pks. Summaries for the
+    whole batch are fetched from the cache with a single lookup and any misses
+    are computed together.
+    """
+    if not is_approved_teacher(request.user):
+        return redirect('dashboard')
+
+    ids = []
+    for raw in request.GET.get('ids', '').split(','):
+        raw = raw.strip()
+        if raw.isdigit() and int(raw) not in ids:
+            ids.append(int(raw))
+    ids = ids[:50]
+
+    students = User.objects.filter(pk__in=ids, role='student')
+    if not request.user.is_staff:
+        students = students.filter(department_id=request.user.department_id)
+    students = list(students.order_by('first_name', 'last_name', 'email'))
+    summaries = get_student_summaries([s.pk for s in students])
+    rows = [(s, summaries.get(s.pk)) for s in students]
+    return render(request, 'teachers/student_compare.html', {'rows': rows})
+
+
+@login_required
+def toggle_student_active(request, pk):
+    """Toggle a student's active state (soft-delete). Teachers can mark students inactive so records are preserved.
+
+    Note: this does NOT hard-delete the User; it flips the built-in `is_active` flag.
+    """
+    # Limit to teachers (or staff). Adjust if you prefer admins only.
+    if not is_approved_teacher(request.user):
+        return redirect('dashboard')
+
+    student = get_object_or_404(User, pk=pk, role='student')
+    # toggle
+    student.is_active = not student.is_active
+    student.save()
+    if student.is_active:
+        messages.success(request, f"Student {student.get_full_name() or student.username} reactivated.")
+    else:
+        messages.warning(request, f"Student {student.get_full_name() or student.username} deactivated (soft-delete).")
+    # Redirect back to teacher dashboard
+    return redirect('dashboard')
@@ -0,0 +1,104 @@
+"""Public news pages and their management."""
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.core.paginator import Paginator
+from django.http import HttpResponse
+from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import render_to_string
+
+from ..caching import get_or_set_locked
+from ..conditional import conditional_on
+from ..forms import NewsForm
+from ..models import News
+from ..news_cache import (
+    NEWS_CACHE_TIMEOUT, NEWS_PAGE_SIZE, news_list_cache_key, news_detail_cache_key, news_page_count,
+)
+
+
+def _serve_cached_page(request, key, render_page):
+    """Serve anonymous GETs from the page cache; render normally otherwise.
+
+    Only anonymous requests without pending flash messages are cached, so the
+    stored HTML never contains per-user navigation or messages.
+    """
+    if request.method != 'GET' or request.user.is_authenticated or len(messages.get_messages(request)):
+        return HttpResponse(render_page())
+    return HttpResponse(get_or_set_locked(key(), render_page, NEWS_CACHE_TIMEOUT))
+
+
+@conditional_on('core.News')
+def news_list(request):
+    # Publicly visible list of news articles, newest first
+    page = request.GET.get('page', '1')
+    page = int(page) if page.isdigit() and int(page) > 0 else 1
+    if page > 1:
+        # Out-of-range pages show the last one; share its cache entry.
+        page = min(page, news_page_count())
+
+    def render_page():
+        items = Paginator(News.objects.all().order_by('-created_at'), NEWS_PAGE_SIZE).get_page(page)
+        return render_to_string('news/news_list.html', {'news_list': items, 'page_obj': items}, request=request)
+
+    return _serve_cached_page(request, lambda: news_list_cache_key(page), render_page)
+
+
+@conditional_on('core.News')
+def news_detail(request, id):
+    def render_page():
+        n = get_object_or_404(News, pk=id)
+        return render_to_string('news/news_detail.html', {'news': n}, request=request)
+
+    return _serve_cached_page(request, lambda: news_detail_cache_key(id), render_page)
+
+
+@login_required
+def add_news(request):
+    # Only logged-in users can add news (students, teachers, admins)
+    if request.method == 'POST':
+        form = NewsForm(request.POST, request.FILES)
+        if form.is_valid():
+            news = form.save(commit=False)
+            news.author = request.user
+            # author_role will be set in model.save()
+            news.save()
+            messages.success(request, 'News posted successfully.')
+            return redirect('core:news_list')
+    else:
+        form = NewsForm()
+    return render(request, 'news/add_news.html', {'form': form})
+
+
+@login_required
+def edit_news(request, id):
+    n = get_object_or_404(News, pk=id)
+    # Only author or staff may edit
+    if not (request.user.is_staff or n.author_id == request.user.id):
+        return redirect('core:news_detail', id=n.pk)
+
+    if request.method == 'POST':
+        form = NewsForm(request.POST, request.FILES, instance=n)
+        if form.is_valid():
+            news = form.save(commit=False)
+            # keep original author
+            news.author = n.author
+            news.save()
+            messages.success(request, 'News updated successfully.')
+            return redirect('core:news_detail', id=news.pk)
+    else:
+        form = NewsForm(instance=n)
+    return render(request, 'news/edit_news.html', {'form': form, 'news': n})
+
+
+@login_required
+def delete_news(request, id):
+    n = get_object_or_404(News, pk=id)
+    # Only author or staff may delete
+    if not (request.user.is_staff or n.author_id == request.user.id):
+        return redirect('core:news_detail', id=n.pk)
+
+    if request.method == 'POST':
+        n.delete()
+        messages.success(request, 'News deleted.')
+        return redirect('core:news_list')
+
+    return render(request, 'news/confirm_delete.html', {'news': n})
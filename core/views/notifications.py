@@ -0,0 +1,75 @@
+"""Notification pages and AJAX endpoints."""
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.shortcuts import render, redirect
+
+from ..conditional import conditional_on, requesting_user, user_notifications, bump_model_version
+from ..models import Notification
+
+
+@login_required
+@conditional_on(user_notifications, requesting_user, vary_every=60)
+def notifications(request):
+    notes = Notification.objects.filter(user=request.user).order_by('-created_at')
+    return render(request, 'notifications.html', {'notes': notes})
+
+
+@login_required
+def clear_read_notifications(request):
+    """Delete all notifications for the current user that are marked read.
+
+    This endpoint expects a POST request. After deleting, redirects back to
+    the notifications page.
+    """
+    if request.method != 'POST':
+        return redirect('core:notifications')
+    Notification.objects.filter(user=request.user, read=True).delete()
+    bump_model_version('core.Notification', request.user.pk)
+    messages.success(request, 'Cleared all read notifications.')
+    return redirect('core:notifications')
+
+
+@login_required
+@conditional_on(user_notifications)
+def unread_notifications_json(request):
+    """Return unread notifications (or notifications after a given id).
+
+    GET params:
+      - last_id (optional): only return notifications with id > last_id
+    Response: { notifications: [{id, content, created_at}], unread_count: int }
+    """
+    last_id = request.GET.get('last_id')
+    qs = Notification.objects.filter(user=request.user).order_by('created_at')
+    if last_id:
+        try:
+            last_id = int(last_id)
+            qs = qs.filter(id__gt=last_id)
+        except Exception:
+            pass
+    # only unread notifications by default
+    qs = qs.filter(read=False)
+    data = []
+    for n in qs:
+        data.append({'id': n.id, 'content': n.content, 'created_at': n.created_at.isoformat()})
+    unread_count = Notification.objects.filter(user=request.user, read=False).count()
+    return JsonResponse({'notifications': data, 'unread_count': unread_count})
+
+
+@login_required
+def mark_notification_read(request):
+    """Mark a notification (or all) as read. Expects POST with 'id' or 'all'=1."""
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error', 'message': 'POST required'}, status=400)
+    nid = request.POST.get('id')
+    if nid == 'all' or request.POST.get('all') == '1':
+        Notification.objects.filter(user=request.user, read=False).update(read=True)
+        bump_model_version('core.Notification', request.user.pk)
+        return JsonResponse({'status': 'ok', 'marked': 'all'})
+    try:
+        nid = int(nid)
+    except Exception:
+        return JsonResponse({'status': 'error', 'message': 'invalid id'}, status=400)
+    Notification.objects.filter(user=request.user, id=nid).update(read=True)
+    bump_model_version('core.Notification', request.user.pk)
+    return JsonResponse({'status': 'ok', 'marked': nid})
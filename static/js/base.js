@@ -0,0 +1,165 @@
+// Site-wide behaviour for templates/base.html.
+
+// Password show/hide toggle: adds an eye button to password inputs
+(function(){
+  function createBtn(){
+    const btn = document.createElement('button');
+    btn.type = 'button';
+    btn.className = 'toggle-btn';
+    btn.setAttribute('aria-pressed','false');
+    btn.setAttribute('aria-label','Show password');
+    btn.innerHTML = '\u{1F441}'; // simple eye emoji fallback
+    return btn;
+  }
+
+  function setIcon(btn, visible){
+    // Use SVG for crispness when possible
+    if(visible){
+      btn.innerHTML = '<svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" fill="currentColor" viewBox="0 0 16 16"><path d="M13.359 8.238C12.52 6.896 10.972 5.5 8 5.5c-2.972 0-4.52 1.396-5.359 2.738a.5.5 0 0 0 0 .524C3.48 9.104 4.999 10.5 8 10.5c3.001 0 4.52-1.396 5.359-2.738a.5.5 0 0 0 0-.524z"/><path d="M8 4.5a3.5 3.5 0 1 1 0 7 3.5 3.5 0 0 1 0-7z"/></svg>';
+      btn.setAttribute('aria-label','Hide password');
+      btn.setAttribute('aria-pressed','true');
+    } else {
+      btn.innerHTML = '<svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" fill="currentColor" viewBox="0 0 16 16"><path d="M13.359 8.238C12.52 6.896 10.972 5.5 8 5.5c-2.972 0-4.52 1.396-5.359 2.738a.5.5 0 0 0 0 .524C3.48 9.104 4.999 10.5 8 10.5c3.001 0 4.52-1.396 5.359-2.738a.5.5 0 0 0 0-.524z"/><path d="M8 3a5 5 0 0 0-4.546 2.916.5.5 0 1 0 .912.41A4 4 0 1 1 8 12a3.99 3.99 0 0 1-2.828-1.172.5.5 0 0 0-.707.707A4.99 4.99 0 1 0 8 3z"/></svg>';
+      btn.setAttribute('aria-label','Show password');
+      btn.setAttribute('aria-pressed','false');
+    }
+  }
+
+  // initialize on DOMContentLoaded
+  document.addEventListener('DOMContentLoaded', function(){
+    const pwdInputs = Array.from(document.querySelectorAll('input[type="password"]'));
+    pwdInputs.forEach(function(input){
+      // avoid duplicating if already wrapped
+      if(input.closest('.password-toggle')) return;
+      const wrapper = document.createElement('div');
+      wrapper.className = 'password-toggle';
+      input.parentNode.insertBefore(wrapper, input);
+      wrapper.appendChild(input);
+
+      const btn = createBtn();
+      setIcon(btn, false);
+      btn.classList.add('toggle-btn');
+      btn.addEventListener('click', function(){
+        const isPwd = input.getAttribute('type') === 'password';
+        if(isPwd){
+          input.setAttribute('type','text');
+          setIcon(btn, true);
+        } else {
+          input.setAttribute('type','password');
+          setIcon(btn, false);
+        }
+        input.focus();
+      });
+      wrapper.appendChild(btn);
+    });
+  });
+})();
+
+// Polling for unread notifications and toast display
+(function(){
+  // Simple polling for unread notifications and toast display
+  let lastSeenId = 0;
+  const badge = document.getElementById('notif-badge');
+  const toastContainer = document.getElementById('toast-container');
+
+  function getCookie(name) {
+    const v = document.cookie.match('(^|;)\\s*' + name + '\\s*=\\s*([^;]+)');
+    return v ? v.pop() : '';
+  }
+
+  function updateBadge(count){
+    if(!badge) return;
+    if(count && count > 0){
+      badge.style.display = 'inline-block';
+      badge.textContent = count;
+    } else {
+      badge.style.display = 'none';
+    }
+  }
+
+  function showToast(n){
+    const toastId = 'notif-toast-' + n.id;
+    if(document.getElementById(toastId)) return; // already shown
+    const wrapper = document.createElement('div');
+    wrapper.innerHTML = `
+<div id="${toastId}" class="toast fade poda-toast shadow-lg" role="alert" aria-live="assertive" aria-atomic="true" data-autohide="true" data-delay="8000" style="pointer-events:auto; border-radius:12px; overflow:hidden;">
+  <div class="d-flex align-items-start p-3" style="gap:.75rem;">
+    <div style="flex:0 0:auto; width:44px; height:44px; border-radius:8px; background:linear-gradient(90deg,#0d6efd,#6f42c1); display:flex; align-items:center; justify-content:center; color:#fff; font-weight:700;">
+      <svg xmlns="http://www.w3.org/2000/svg" width="20" height="20" fill="currentColor" viewBox="0 0 16 16"><path d="M8 16a2 2 0 0 0 1.985-1.75H6.015A2 2 0 0 0 8 16z"/><path d="M8 1a4 4 0 0 0-4 4v2.086l-.707.707A1 1 0 0 0 3 10h10a1 1 0 0 0 .707-1.707L13 7.086V5a4 4 0 0 0-4-4z"/></svg>
+    </div>
+    <div style="flex:1 1 auto; min-width:0;">
+      <div class="d-flex justify-content-between align-items-start">
+        <div style="min-width:0;">
+          <div style="font-weight:700; color:#0f172a;">Notification</div>
+          <div style="font-size:.85rem; color:#6b7280;">now</div>
+        </div>
+        <div style="margin-left:8px; flex:0 0:auto;">
+          <button type="button" class="btn btn-sm btn-light" data-dismiss="toast" aria-label="Close" style="font-weight:600; padding:.25rem .5rem;">×</button>
+        </div>
+      </div>
+      <div style="margin-top:.5rem; color:#111827;">${n.content}</div>
+    </div>
+  </div>
+</div>
+    `;
+    const el = wrapper.firstElementChild;
+    toastContainer.appendChild(el);
+    // when clicked, mark as read and redirect to notifications page
+    el.addEventListener('click', function(){
+      markRead(n.id);
+    });
+    // initialize bootstrap toast via jQuery
+    $(el).toast('show');
+  }
+
+  function markRead(id){
+    const url = '/core/ajax/notifications/mark-read/';
+    const csrftoken = getCookie('csrftoken');
+    const form = new FormData();
+    form.append('id', id);
+    fetch(url, {method: 'POST', body: form, headers: {'X-CSRFToken': csrftoken}})
+      .then(r=>r.json()).then(d=>{
+        // refresh badge
+        fetchUnread();
+      }).catch(()=>{});
+  }
+
+  function fetchUnread(){
+    const url = '/core/ajax/notifications/unread/?last_id=' + encodeURIComponent(lastSeenId || '');
+    fetch(url, {credentials: 'same-origin'})
+      .then(r=>r.json())
+      .then(data=>{
+        if(!data) return;
+        const arr = data.notifications || [];
+        if(arr.length){
+          arr.forEach(n => {
+            showToast(n);
+            if(n.id && n.id > lastSeenId) lastSeenId = n.id;
+          });
+        }
+        updateBadge(data.unread_count || 0);
+      }).catch(()=>{});
+  }
+
+  document.addEventListener('DOMContentLoaded', function(){
+    // Only start polling if the notification badge exists (i.e. user is authenticated)
+    if(badge){
+      // initial fetch to seed lastSeenId and badge
+      fetchUnread();
+      // poll every 5 seconds while the page is visible
+      let notifInterval = setInterval(fetchUnread, 5000);
+
+      // Pause polling when the page is hidden to avoid background noise and
+      // unnecessary server requests; resume when visible again.
+      document.addEventListener('visibilitychange', function(){
+        if(document.hidden){
+          clearInterval(notifInterval);
+          notifInterval = null;
+        } else if(!notifInterval){
+          fetchUnread();
+          notifInterval = setInterval(fetchUnread, 5000);
+        }
+      });
+    }
+  });
+})();
@@ -0,0 +1,41 @@
+// Simple client-side filters for each tab
+function filterTable(inputEl, tableId) {
+  const q = inputEl.value.toLowerCase();
+  document.querySelectorAll(`#${tableId} tbody tr`).forEach(tr => {
+    const text = tr.innerText.toLowerCase();
+    tr.style.display = text.includes(q) ? '' : 'none';
+  });
+}
+
+// Events: search + scope + department
+const eventSearch = document.getElementById('eventSearch');
+const eventScope = document.getElementById('eventScope');
+const eventDept  = document.getElementById('eventDept');
+const eventsRows = () => Array.from(document.querySelectorAll('#eventsTable tbody tr'));
+
+function applyEventFilters() {
+  const q = (eventSearch?.value || '').toLowerCase();
+  const scope = (eventScope?.value || '').toLowerCase();
+  const dept = (eventDept?.value || '').toLowerCase();
+  eventsRows().forEach(tr => {
+    const text = tr.innerText.toLowerCase();
+    const rowScope = (tr.getAttribute('data-scope') || '').toLowerCase();
+    const rowDept  = (tr.getAttribute('data-dept') || '').toLowerCase();
+    const matchQ = q ? text.includes(q) : true;
+    const matchScope = scope ? (rowScope === scope) : true;
+    const matchDept = dept ? rowDept.includes(dept) : true;
+    tr.style.display = (matchQ && matchScope && matchDept) ? '' : 'none';
+  });
+}
+
+eventSearch?.addEventListener('input', applyEventFilters);
+eventScope?.addEventListener('change', applyEventFilters);
+eventDept?.addEventListener('input', applyEventFilters);
+
+// Certificates search
+const certSearch = document.getElementById('certSearch');
+certSearch?.addEventListener('input', () => filterTable(certSearch, 'certsTable'));
+
+// Marks search
+const marksSearch = document.getElementById('marksSearch');
+marksSearch?.addEventListener('input', () => filterTable(marksSearch, 'marksTable'));
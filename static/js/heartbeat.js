@@ -0,0 +1,36 @@
+// Development only: reload the page when the heartbeat reload token changes.
+(function(){
+  const hbUrl = '/core/ajax/heartbeat/';
+  let lastToken = null;
+  let hbInterval = null;
+
+  function checkHeartbeat(){
+    fetch(hbUrl, {credentials: 'same-origin'})
+      .then(r => r.json())
+      .then(data => {
+        if(!data || !data.reload_token) return;
+        if(!lastToken){
+          lastToken = data.reload_token;
+          return;
+        }
+        if(data.reload_token !== lastToken){
+          // token changed (e.g. new commit or update) -> reload to pick up changes
+          location.reload();
+        }
+      }).catch(()=>{});
+  }
+
+  document.addEventListener('DOMContentLoaded', function(){
+    // only poll while the page is visible
+    checkHeartbeat();
+    hbInterval = setInterval(checkHeartbeat, 5000);
+    document.addEventListener('visibilitychange', function(){
+      if(document.hidden){
+        if(hbInterval){ clearInterval(hbInterval); hbInterval = null; }
+      } else if(!hbInterval){
+        checkHeartbeat();
+        hbInterval = setInterval(checkHeartbeat, 5000);
+      }
+    });
+  });
+})();
@@ -0,0 +1,85 @@
+// Edit/delete actions on feed posts (templates/includes/post_item.html).
+// Loaded once per page; handlers are delegated from document, so posts
+// replaced after an AJAX edit need no re-binding.
+if (!window.postItemEventsBound) {
+  window.postItemEventsBound = true;
+  function getCookie(name) {
+    var cookieValue = null;
+    if (document.cookie && document.cookie !== '') {
+      var cookies = document.cookie.split(';');
+      for (var i = 0; i < cookies.length; i++) {
+        var cookie = cookies[i].trim();
+        if (cookie.substring(0, name.length + 1) === (name + '=')) {
+          cookieValue = decodeURIComponent(cookie.substring(name.length + 1));
+          break;
+        }
+      }
+    }
+    return cookieValue;
+  }
+
+  document.addEventListener('click', function (ev) {
+    var editBtn = ev.target.closest && ev.target.closest('.js-edit-post');
+    if (editBtn) {
+      var postId = editBtn.getAttribute('data-post-id');
+      var article = document.getElementById('post-' + postId);
+      if (!article) return;
+      var contentEl = article.querySelector('.post-content');
+      if (!contentEl) return;
+      if (article.querySelector('.post-edit-area')) return; // already editing
+      var original = (contentEl.textContent || contentEl.innerText || '').trim();
+      var textarea = document.createElement('textarea');
+      textarea.className = 'form-control post-edit-area';
+      textarea.value = original;
+      textarea.rows = 4;
+      contentEl.style.display = 'none';
+      contentEl.parentNode.insertBefore(textarea, contentEl);
+      var saveBtn = document.createElement('button'); saveBtn.className = 'btn btn-primary btn-sm mt-2 me-2'; saveBtn.textContent = 'Save';
+      var cancelBtn = document.createElement('button'); cancelBtn.className = 'btn btn-secondary btn-sm mt-2'; cancelBtn.textContent = 'Cancel';
+      var btnWrap = document.createElement('div'); btnWrap.className = 'mt-2'; btnWrap.appendChild(saveBtn); btnWrap.appendChild(cancelBtn);
+      textarea.parentNode.insertBefore(btnWrap, textarea.nextSibling);
+
+      cancelBtn.addEventListener('click', function () { textarea.remove(); btnWrap.remove(); contentEl.style.display = ''; });
+
+      saveBtn.addEventListener('click', function () {
+        var csrftoken = getCookie('csrftoken');
+        var url = editBtn.getAttribute('data-url');
+        fetch(url, {
+          method: 'POST',
+          headers: {
+            'X-CSRFToken': csrftoken,
+            'X-Requested-With': 'XMLHttpRequest',
+            'Content-Type': 'application/x-www-form-urlencoded; charset=UTF-8'
+          },
+          body: new URLSearchParams({content: textarea.value})
+        }).then(function(r){ return r.json(); }).then(function(data){
+          if (data && data.ok && data.html) {
+            var wrapper = document.createElement('div'); wrapper.innerHTML = data.html;
+            var newArticle = wrapper.querySelector('#post-' + postId);
+            if (newArticle) article.replaceWith(newArticle);
+          } else {
+            alert((data && data.error) ? data.error : 'Failed to save post');
+          }
+        }).catch(function(){ alert('Network error'); });
+      });
+      ev.preventDefault();
+    }
+
+    var delBtn = ev.target.closest && ev.target.closest('.js-delete-post');
+    if (delBtn) {
+      var postId = delBtn.getAttribute('data-post-id');
+      if (!confirm('Delete this post? This cannot be undone.')) return;
+      var csrftoken = getCookie('csrftoken');
+      var delUrl = delBtn.getAttribute('data-url');
+      fetch(delUrl, { method: 'POST', headers: { 'X-CSRFToken': csrftoken, 'X-Requested-With': 'XMLHttpRequest' } })
+        .then(function(r){ return r.json(); }).then(function(data){
+          if (data && data.ok) {
+            var article = document.getElementById('post-' + postId); if (article) article.remove();
+          } else {
+            alert((data && data.error) ? data.error : 'Failed to delete post');
+          }
+        }).catch(function(){ alert('Network error'); });
+      ev.preventDefault();
+    }
+  }, false);
+}
@@ -0,0 +1,158 @@
+// Student dashboard feed: AJAX comment posting, editing and deleting.
+(function(){
+  function getCookie(name) {
+    const v = document.cookie.match('(^|;)\\s*' + name + '\\s*=\\s*([^;]+)');
+    return v ? v.pop() : '';
+  }
+
+  // AJAX comment submission
+  document.addEventListener('submit', function(e){
+    const form = e.target;
+    if(form && form.id && form.id.startsWith('comment-')){
+      e.preventDefault();
+      // Prevent double submissions by marking the form as posting
+      if(form.dataset.posting === '1') return; // already posting
+      const submitBtn = form.querySelector('button[type="submit"]');
+      const textarea = form.querySelector('textarea[name="content"]');
+      if(!textarea) return;
+      const val = textarea.value.trim();
+      if(!val) return;
+      form.dataset.posting = '1';
+      if(submitBtn) submitBtn.disabled = true;
+      const url = form.action;
+      const csrftoken = getCookie('csrftoken');
+      const fd = new FormData(form);
+      fetch(url, {method: 'POST', body: fd, headers: {'X-CSRFToken': csrftoken, 'X-Requested-With':'XMLHttpRequest'}, credentials: 'same-origin'})
+        .then(r=>r.json())
+        .then(data=>{
+          if(data && data.ok && data.html){
+            // insert the returned comment HTML into the comments container for this post
+            const postId = form.id.replace('comment-','');
+            let container = document.getElementById('post-comments-' + postId);
+            if(!container){
+              // create container
+              container = document.createElement('div');
+              container.id = 'post-comments-' + postId;
+              container.className = 'mt-3 pt-3 border-top';
+              form.parentNode.insertBefore(container, form);
+            }
+            // append the new comment HTML
+            container.insertAdjacentHTML('beforeend', data.html);
+            // clear textarea
+            textarea.value = '';
+          }
+        }).catch(err=>{ console.error(err); })
+        .finally(()=>{
+          // release posting lock
+          form.dataset.posting = '0';
+          if(submitBtn) submitBtn.disabled = false;
+        });
+    }
+  });
+
+  // autofocus when clicking comment icon (anchor to '#comment-<id>')
+  document.addEventListener('click', function(e){
+    const a = e.target.closest('a[href^="#comment-"]');
+    if(a){
+      const href = a.getAttribute('href');
+      const id = href.replace('#comment-','');
+      const form = document.getElementById('comment-' + id);
+      if(form){
+        const ta = form.querySelector('.js-comment-input');
+        if(ta){ ta.focus(); }
+      }
+    }
+  });
+
+  // delegate edit/delete clicks
+  document.addEventListener('click', function(e){
+    const editBtn = e.target.closest('.js-edit-comment');
+    if (editBtn) {
+      const cid = editBtn.getAttribute('data-comment-id');
+      const commentEl = document.getElementById('comment-' + cid);
+      if (!commentEl) return;
+      const contentEl = commentEl.querySelector('.comment-content');
+      if (!contentEl) return;
+      // guard: don't create another editor if one already exists
+      if (contentEl.querySelector('textarea')) return;
+      // preserve original HTML so we can restore it (keeps formatting)
+      const originalHTML = contentEl.innerHTML;
+      const originalText = (contentEl.textContent || '').trim();
+      // replace with textarea + save/cancel
+      const ta = document.createElement('textarea');
+      ta.className = 'form-control mb-2';
+      ta.value = originalText;
+      contentEl.innerHTML = '';
+      contentEl.appendChild(ta);
+
+      const saveBtn = document.createElement('button');
+      saveBtn.type = 'button';
+      saveBtn.className = 'btn btn-sm btn-primary me-2';
+      saveBtn.textContent = 'Save';
+
+      const cancelBtn = document.createElement('button');
+      cancelBtn.type = 'button';
+      cancelBtn.className = 'btn btn-sm btn-outline-secondary';
+      cancelBtn.textContent = 'Cancel';
+
+      const controls = document.createElement('div');
+      controls.className = 'mt-2 d-flex';
+      controls.style.gap = '0.5rem';
+      controls.appendChild(saveBtn);
+      controls.appendChild(cancelBtn);
+      contentEl.appendChild(controls);
+
+      cancelBtn.addEventListener('click', function (ev) {
+        ev.preventDefault();
+        // restore original HTML (preserves any markup)
+        contentEl.innerHTML = originalHTML;
+      });
+
+      saveBtn.addEventListener('click', function (ev) {
+        ev.preventDefault();
+        const newVal = ta.value.trim();
+        if (!newVal) return;
+        const csrftoken = getCookie('csrftoken');
+        fetch(editBtn.getAttribute('data-url'), {
+          method: 'POST',
+          headers: { 'X-CSRFToken': csrftoken, 'X-Requested-With': 'XMLHttpRequest' },
+          body: new URLSearchParams({ 'content': newVal }),
+          credentials: 'same-origin'
+        }).then(r => r.json()).then(data => {
+          if (data && data.ok && data.html) {
+            // replace comment element with new HTML
+            commentEl.outerHTML = data.html;
+          }
+        }).catch(err => console.error(err));
+      });
+    }
+
+    const delBtn = e.target.closest('.js-delete-comment');
+    if(delBtn){
+      // prevent multiple handlers from asking twice: set a confirming flag
+      if(delBtn.dataset.confirming === '1') return;
+      delBtn.dataset.confirming = '1';
+      const cid = delBtn.getAttribute('data-comment-id');
+      const proceed = confirm('Delete this comment?');
+      if(!proceed){
+        // reset flag and exit
+        delBtn.dataset.confirming = '0';
+        return;
+      }
+      // disable button to give visual feedback
+      delBtn.disabled = true;
+      const csrftoken = getCookie('csrftoken');
+      fetch(delBtn.getAttribute('data-url'), {method:'POST', headers:{'X-CSRFToken': csrftoken, 'X-Requested-With':'XMLHttpRequest'}, credentials:'same-origin'})
+        .then(r=>r.json()).then(data=>{
+          if(data && data.ok && data.deleted_id){
+            const el = document.getElementById('comment-' + data.deleted_id);
+            if(el) el.remove();
+          }
+        }).catch(err=>console.error(err))
+        .finally(()=>{
+          delBtn.dataset.confirming = '0';
+          delBtn.disabled = false;
+        });
+    }
+  });
+})();